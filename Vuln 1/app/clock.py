@@ -0,0 +1,29 @@
+import time
+
+
+class SystemClock:
+    """Реальний час — годинник DeviceManager за замовчуванням."""
+
+    def time(self) -> float:
+        return time.time()
+
+    def ctime(self) -> str:
+        return time.ctime(self.time())
+
+
+class SimulatedClock(SystemClock):
+    """Годинник симуляції: час рухається лише через advance(), а не разом із реальним.
+
+    Прогін з таким годинником і сталим seed відтворюваний і йде так швидко,
+    як дозволяє CPU, — година симуляції не чекає години реального часу.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self.now = float(start)
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> float:
+        self.now += seconds
+        return self.now
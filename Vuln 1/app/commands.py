@@ -0,0 +1,213 @@
+import asyncio
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from devices import DeviceManager
+from journal import acting_as, origin
+
+# Черга команд керування. Ендпоінт лише ставить команду і не стає в чергу на DeviceManager.lock;
+# окремий потік (applier) забирає накопичене пакетами до batch команд і застосовує поодинокі
+# команди пакета за одне захоплення блокування на запис (DeviceManager.apply_commands),
+# тож сплеск команд не перемежовується з читаннями дашборда по одній.
+# Коалесценція: поки команда чекає в черзі, повторна з тим самим ключем (дія, пристрій) не додає
+# нової — значення оновлюється (перемагає останнє), а новий id вказує на ту саму команду;
+# злита команда переходить у кінець черги, тож відносно інших дій над пристроєм теж діє остання.
+# Черга обмежена: коли bound різних команд уже чекають, submit() кидає QueueFull (ендпоінт — 429).
+# У режимі кількох воркерів черга й id — свої в кожному процесі (id починається з pid).
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Command:
+    __slots__ = ("id", "action", "device_id", "value", "fn", "origin", "status", "ok", "result", "error",
+                 "submitted", "applied", "coalesced", "_callbacks")
+
+    def __init__(self, command_id: str, action: str, device_id: Optional[str], value, fn: Optional[Callable],
+                 source: dict, submitted: float):
+        self.id = command_id
+        self.action = action
+        self.device_id = device_id
+        self.value = value
+        # команда над усім флотом (адмінські) — функція без аргументів, що повертає dict
+        self.fn = fn
+        self.origin = source
+        self.status = "queued"
+        self.ok = None
+        self.result = None
+        self.error = None
+        self.submitted = submitted
+        self.applied = None
+        self.coalesced = 0
+        self._callbacks: Optional[List[Callable[[], None]]] = []
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "action": self.action,
+            "device_id": self.device_id,
+            "value": self.value,
+            "status": self.status,
+            "ok": self.ok,
+            "result": self.result,
+            "error": self.error,
+            "coalesced": self.coalesced,
+            "submitted": self.submitted,
+            "applied": self.applied,
+        }
+
+
+class CommandQueue:
+    def __init__(self, manager: DeviceManager, bound: int = 1000, batch: int = 256, retain: int = 10000):
+        self.manager = manager
+        self.bound = bound
+        self.batch = batch
+        # скільки останніх id пам'ятати для опитування
+        self.retain = retain
+        self.stats = {"submitted": 0, "coalesced": 0, "rejected": 0, "applied": 0, "failed": 0,
+                      "batches": 0, "max_batch": 0}
+        self._cond = threading.Condition()
+        # ключ (дія, пристрій) -> команда, що чекає; порядок — порядок останньої постановки
+        self._queue: "OrderedDict[Tuple[str, Optional[str]], Command]" = OrderedDict()
+        self._commands: "OrderedDict[str, Command]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._prefix = f"{os.getpid()}-"
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="commands", daemon=True)
+        self._thread.start()
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def submit(self, action: str, device_id: Optional[str] = None, value=None,
+               fn: Optional[Callable[[], dict]] = None) -> Tuple[str, Command]:
+        """
+        Ставить команду в чергу й одразу повертає (id, команда). Поодинокі команди — дія з
+        DeviceManager.BULK_ACTIONS над device_id; fn — команда над усім флотом (виконується як є).
+        Ініціатор для журналу (journal.origin()) береться з поточного запиту.
+        """
+        if fn is None and action not in self.manager.BULK_ACTIONS:
+            raise ValueError(f"Невідома дія {action}")
+        key = (action, device_id)
+        source = dict(origin())
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Чергу команд закрито")
+            command_id = f"{self._prefix}{next(self._ids)}"
+            cmd = self._queue.get(key)
+            if cmd is not None:
+                cmd.value, cmd.fn, cmd.origin = value, fn, source
+                cmd.coalesced += 1
+                self._queue.move_to_end(key)
+                self.stats["coalesced"] += 1
+            elif len(self._queue) >= self.bound:
+                self.stats["rejected"] += 1
+                raise QueueFull(f"Черга команд переповнена ({self.bound})")
+            else:
+                cmd = Command(command_id, action, device_id, value, fn, source, self.manager.clock.time())
+                self._queue[key] = cmd
+                self._cond.notify()
+            self.stats["submitted"] += 1
+            self._commands[command_id] = cmd
+            while len(self._commands) > self.retain:
+                self._commands.popitem(last=False)
+            return command_id, cmd
+
+    def get(self, command_id: str) -> Optional[Command]:
+        with self._cond:
+            return self._commands.get(command_id)
+
+    def wait(self, cmd: Command, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: cmd._callbacks is None, timeout)
+
+    async def wait_async(self, cmd: Command, timeout: float) -> bool:
+        """Як wait(), але не займає потік: True, якщо команду застосовано за timeout секунд."""
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(lambda: done.done() or done.set_result(None))
+            except RuntimeError:
+                # event loop уже закрито — чекати нікому
+                pass
+        with self._cond:
+            if cmd._callbacks is None:
+                return True
+            cmd._callbacks.append(wake)
+        try:
+            await asyncio.wait_for(done, timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def close(self):
+        # застосовує те, що вже в черзі, і зупиняє applier
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return
+                batch = [self._queue.popitem(last=False)[1] for _ in range(min(self.batch, len(self._queue)))]
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            i = 0
+            while i < len(batch):
+                if batch[i].fn is not None:
+                    self._apply_fn(batch[i])
+                    i += 1
+                    continue
+                # поспіль поодинокі команди — одним викликом apply_commands
+                j = i
+                while j < len(batch) and batch[j].fn is None:
+                    j += 1
+                self._apply_group(batch[i:j])
+                i = j
+
+    def _apply_group(self, group: List[Command]):
+        try:
+            oks = self.manager.apply_commands([(c.action, c.device_id, c.value, c.origin) for c in group])
+        except Exception as e:
+            for cmd in group:
+                self._finish(cmd, False, error=str(e))
+            return
+        for cmd, ok in zip(group, oks):
+            if isinstance(ok, Exception):
+                self._finish(cmd, False, error=str(ok))
+            else:
+                self._finish(cmd, ok, error=None if ok else "Пристрій не знайдено")
+
+    def _apply_fn(self, cmd: Command):
+        try:
+            with acting_as(cmd.origin):
+                result = cmd.fn()
+        except Exception as e:
+            self._finish(cmd, False, error=str(e))
+            return
+        ok = result.get("status") == "ok"
+        self._finish(cmd, ok, result=result, error=None if ok else result.get("message"))
+
+    def _finish(self, cmd: Command, ok: bool, result: Optional[dict] = None, error: Optional[str] = None):
+        with self._cond:
+            cmd.status = "done" if ok else "failed"
+            cmd.ok = ok
+            cmd.result = result
+            cmd.error = error
+            cmd.applied = self.manager.clock.time()
+            callbacks, cmd._callbacks = cmd._callbacks, None
+            self.stats["applied" if ok else "failed"] += 1
+            self._cond.notify_all()
+        for callback in callbacks:
+            callback()
@@ -1,22 +1,180 @@
-import time
+import sys
 import threading
-from typing import Dict, List
-import random
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from clock import SystemClock
+from encoding import dumps, join_array
+from feed import ChangeFeed
+from grid import GridTopology, TRIP_THRESHOLD, WARNING_THRESHOLD, cascade
+from history import TelemetryHistory
+from index import CategoryIndex
+from ingest import SampleBatch, latest_per_key
+from journal import Journal, acting_as, origin
+from rules import RuleEngine
+from rwlock import RWLock
+from store import COLUMNS, ColumnarStore, PULSE_PERIOD, STATUSES, STATUS_CODES
+
+# зв'язки мережі демонстраційного флоту: генерація живить підстанцію
+SAMPLE_LINKS = (("pp-1", "ss-1"),)
+
+# поля пристрою, значення яких до і після команди потрапляють у журнал
+AUDIT_FIELDS = ("status", "load", "power_level", "voltage")
+
+class _Column:
+    """Поле пристрою, що зберігається в рядку ColumnarStore (або локально до додавання в менеджер)."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        if obj._store is None:
+            return obj._local[self.name]
+        return getattr(obj._store, self.name)[obj._row].item()
+
+    def __set__(self, obj, value):
+        if obj._store is None:
+            obj._local[self.name] = value
+        else:
+            getattr(obj._store, self.name)[obj._row] = value
+
+class _StatusColumn(_Column):
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        if obj._store is None:
+            return obj._local[self.name]
+        return STATUSES[obj._store.status[obj._row]]
+
+    def __set__(self, obj, value):
+        if obj._store is None:
+            obj._local[self.name] = value
+        else:
+            obj._store.status[obj._row] = STATUS_CODES[value]
+
+# Спільна таблиця видів пристроїв: у Device лежить малий int-код, рядок виду — один на процес
+KINDS: List[str] = []
+_KIND_CODES: Dict[str, int] = {}
+_KIND_LOCK = threading.Lock()
+
+def kind_code(kind: str) -> int:
+    code = _KIND_CODES.get(kind)
+    if code is None:
+        with _KIND_LOCK:
+            code = _KIND_CODES.get(kind)
+            if code is None:
+                code = len(KINDS)
+                KINDS.append(sys.intern(kind))
+                _KIND_CODES[KINDS[code]] = code
+    return code
 
 class Device:
+    # поля, що живуть у рядку ColumnarStore
+    _FIELDS = ("status", "load", "last_seen", "power_level", "voltage", "temperature", "version")
+
+    # без __dict__: при мільйоні пристроїв словник атрибутів і порожній extra на кожен
+    # важать більше, ніж усі колонки сховища разом
+    __slots__ = ("id", "name", "_kind", "_location", "_role", "_extra", "_store", "_row", "_local")
+
+    status = _StatusColumn()  # OK | WARNING | OFFLINE | DEGRADED | COMPROMISED
+    load = _Column()
+    last_seen = _Column()
+    power_level = _Column()  # Додано: рівень потужності
+    voltage = _Column()      # Додано: рівень напруги
+    temperature = _Column()  # Додано: температура
+    version = _Column()      # версія менеджера при останній зміні
+
     def __init__(self, id: str, kind: str, name: str, location: str, role: str):
         self.id = id
         self.kind = kind
         self.name = name
         self.location = location
         self.role = role
-        self.status = "OK"  # OK | WARNING | OFFLINE | DEGRADED | COMPROMISED
-        self.load = 10.0
-        self.last_seen = time.time()
-        self.extra = {}
-        self.power_level = 75  # Додано: рівень потужності
-        self.voltage = 50      # Додано: рівень напруги
-        self.temperature = 35  # Додано: температура
+        # extra створюється при першому записі (див. властивість extra)
+        self._extra = None
+        # до додавання в DeviceManager значення живуть тут, після — у рядку сховища
+        self._store = None
+        self._row = -1
+        self._local = {
+            "status": "OK",
+            "load": 10.0,
+            "last_seen": time.time(),
+            "power_level": 75,
+            "voltage": 50,
+            "temperature": 35,
+            "version": 0,
+        }
+
+    @property
+    def kind(self) -> str:
+        return KINDS[self._kind]
+
+    @kind.setter
+    def kind(self, value: str):
+        self._kind = kind_code(value)
+
+    # локація й роль повторюються в тисячах пристроїв — зберігаємо один інтернований рядок
+    @property
+    def location(self) -> str:
+        return self._location
+
+    @location.setter
+    def location(self, value: str):
+        self._location = sys.intern(value)
+
+    @property
+    def role(self) -> str:
+        return self._role
+
+    @role.setter
+    def role(self, value: str):
+        self._role = sys.intern(value)
+
+    @property
+    def extra(self) -> dict:
+        # звернення через d.extra — це запис (d.extra[k] = v), тож словник створюється тут;
+        # читачі, яким досить порожнього значення, беруть extra_view
+        if self._extra is None:
+            self._extra = {}
+        return self._extra
+
+    @extra.setter
+    def extra(self, value: dict):
+        self._extra = value
+
+    @property
+    def extra_view(self) -> dict:
+        """extra лише для читання: для пристрою без extra — новий порожній словник, що не зберігається."""
+        return {} if self._extra is None else self._extra
+
+    def _bind(self, store: ColumnarStore, row: int):
+        values = self._local
+        self._store = store
+        self._row = row
+        for name, value in values.items():
+            setattr(self, name, value)
+        self._local = None
+
+    @classmethod
+    def _restored(cls, store: ColumnarStore, row: int, id: str, kind: str, name: str, location: str, role: str,
+                  extra: dict):
+        # пристрій, чиї значення вже лежать у рядку сховища (відновлення зі знімка)
+        d = cls.__new__(cls)
+        d.id, d.kind, d.name, d.location, d.role = id, kind, name, location, role
+        d._extra = extra or None
+        d._store, d._row, d._local = store, row, None
+        return d
+
+    def _unbind(self):
+        self._local = {name: getattr(self, name) for name in self._FIELDS}
+        self._store = None
+        self._row = -1
 
     def to_dict(self):
         return {
@@ -31,13 +189,82 @@ class Device:
             "power_level": self.power_level,
             "voltage": self.voltage,
             "temperature": self.temperature,
-            "extra": self.extra
+            "version": self.version,
+            "extra": self.extra_view
         }
 
 class DeviceManager:
-    def __init__(self):
+    # скільки останніх видалень пам'ятаємо для ?since=
+    TOMBSTONE_LIMIT = 10000
+    UNKNOWN_LIMIT = 100
+
+    def __init__(self, history_retention: int = 900, history_max_bytes: int = 256 * 1024 * 1024,
+                 store: Optional[ColumnarStore] = None, history: Optional[TelemetryHistory] = None,
+                 clock: Optional[SystemClock] = None, seed: Optional[int] = None):
         self.devices: Dict[str, Device] = {}
-        self.lock = threading.Lock()
+        # `with self.lock:` — запис; `with self.lock.read():` — знімок для читачів
+        self.lock = RWLock()
+        # гарячі поля телеметрії всіх пристроїв — у суцільних масивах
+        self.store = store if store is not None else ColumnarStore()
+        self._by_row: List[Device] = []
+        # останні history_retention тіків телеметрії кожного пристрою
+        self.history = history if history is not None else TelemetryHistory(
+            retention=history_retention, max_bytes=history_max_bytes)
+        # годинник і генератор симуляції: SimulatedClock і сталий seed роблять прогін відтворюваним
+        self.clock = clock if clock is not None else SystemClock()
+        self.rng = np.random.default_rng(seed)
+        self.tombstones: "OrderedDict[str, int]" = OrderedDict()
+        self._tombstone_floor = 0
+        # сповіщення для push-клієнтів (SSE)
+        self.feed = ChangeFeed()
+        # id -> (версія, закодований JSON пристрою); перекодовуються лише пристрої з новою версією
+        self._encoded: Dict[str, Tuple[int, bytes]] = {}
+        # топологія мережі для каскадів; ребра в координатах рядків кешуються до зміни графа чи рядків
+        self.grid = GridTopology()
+        self._layout = 0
+        self._grid_rows = (None, None, None)
+        # вторинні індекси за видом і локацією; лічильники статусів — з колонки, кеш до нової версії
+        self.kinds = CategoryIndex()
+        self.locations = CategoryIndex()
+        self._status_counts = (None, None)
+        # скільки секунд після польового зразка пристрій не чіпає симуляція телеметрії
+        self.field_hold = 30.0
+        # правила статусів/алертів; оцінюються на базовому тіку
+        self.rules = RuleEngine()
+        # журнал команд (None — вимкнено); записи додаються через journaled()
+        self.journal: Optional[Journal] = None
+
+    @property
+    def version(self) -> int:
+        # монотонний лічильник змін; кожен змінений пристрій отримує його значення як свою версію.
+        # Живе у сховищі поруч з рядками, тож у спільному режимі він спільний для всіх воркерів
+        return self.store.revision
+
+    @contextmanager
+    def journaled(self, action: str, rows=None, extra: Optional[dict] = None, **params):
+        """
+        Під self.lock: один запис журналу на блок — хто і через який ендпоінт (journal.origin()),
+        значення AUDIT_FIELDS рядків rows до і після блоку, extra і params.
+        rows=None — увесь флот, і в запис потрапляють лише пристрої, що змінились.
+        Блок може доповнити запис через повернутий словник. Без журналу — нічого не робить.
+        """
+        if self.journal is None:
+            yield {}
+            return
+        sparse = rows is None
+        rows = np.arange(self.store.size) if sparse else np.asarray(rows, dtype=np.int64)
+        before = {name: self.store.column(name)[rows] for name in AUDIT_FIELDS}
+        entry = {"action": action, "extra": extra, "params": params}
+        yield entry
+        entry.update(origin())
+        # id пристроїв і різниця до/після рахуються вже у фоновому потоці журналу
+        if sparse or rows.size > 1024:
+            entry["devices"], entry["rows"] = self._by_row[:], rows
+        else:
+            entry["devices"], entry["rows"] = [self._by_row[row] for row in rows.tolist()], np.arange(rows.size)
+        entry.update(ts=self.clock.time(), before=before, sparse=sparse,
+                     after={name: self.store.column(name)[rows] for name in AUDIT_FIELDS})
+        self.journal.append(entry)
 
     def seed_sample(self):
         # реалістичні об'єкти в доменах: енергетика, транспорт, оборона
@@ -45,114 +272,720 @@ class DeviceManager:
         self.add(Device("ss-1", "substation", "Підстанція Північ", "Район Північ-2", "Розподіл"))
         self.add(Device("th-1", "transport", "Хаб поїздів Центр", "Станція Центр", "Транспортний вузол"))
         self.add(Device("rad-1", "defense", "РЛС Схід", "Гора Східна", "Спостереження"))
-        t = threading.Thread(target=self._telemetry_pulse, daemon=True)
-        t.start()
+        self.grid.add_links(SAMPLE_LINKS)
 
     def add(self, device: Device):
         with self.lock:
-            self.devices[device.id] = device
+            self._add_locked(device)
+
+    def _add_locked(self, device: Device):
+        existing = self.devices.get(device.id)
+        if existing is not None:
+            row = existing._row
+            existing._unbind()
+        else:
+            row = self.store.append()
+            self._by_row.append(device)
+            self.history.reset_row(row)
+        self._layout += 1
+        device._bind(self.store, row)
+        self.kinds.set(row, device.kind)
+        self.locations.set(row, device.location)
+        self.rules.reset_row(row)
+        self._by_row[row] = device
+        self.devices[device.id] = device
+        self.tombstones.pop(device.id, None)
+        self._mark_changed([device.id])
+
+    def remove(self, device_id: str):
+        with self.lock:
+            return self._remove_locked(device_id)
+
+    def _remove_locked(self, device_id: str) -> bool:
+        d = self.devices.pop(device_id, None)
+        if d is None:
+            return False
+        row = d._row
+        d._unbind()
+        moved = self.store.swap_remove(row)
+        self.kinds.swap_remove(row)
+        self.locations.swap_remove(row)
+        self.rules.swap_remove(row)
+        self._layout += 1
+        self.grid.remove_node(device_id)
+        last = self._by_row.pop()
+        if moved >= 0:
+            last._row = row
+            self._by_row[row] = last
+            self.history.move_row(moved, row)
+        else:
+            self.history.reset_row(row)
+        self._mark_changed([])
+        self._forget(device_id)
+        return True
+
+    def export_state(self):
+        """Узгоджена копія стану для знімка: (версія, колонки, метадані пристроїв, зв'язки мережі)."""
+        with self.lock.read():
+            version = self.version
+            devs = self._by_row[:]
+            cols = {name: self.store.column(name).copy() for name in COLUMNS}
+            meta = [(d.id, d.kind, d.name, d.location, d.role, dict(d.extra_view)) for d in devs]
+        return version, cols, meta, self.grid.links()
+
+    def restore_state(self, version: int, columns, meta, links=()):
+        """Замінює флот станом зі знімка; версії рядків і менеджера зберігаються."""
+        with self.lock:
+            self._restore_locked(version, columns, meta)
+        self.grid.add_links(links)
+
+    def _restore_locked(self, version: int, columns, meta):
+        for d in self._by_row:
+            d._unbind()
+        s = self.store
+        s.restore(columns, len(meta))
+        s.revision = max(s.revision, version)
+        self._by_row = [Device._restored(s, row, *m) for row, m in enumerate(meta)]
+        self.devices = {d.id: d for d in self._by_row}
+        self._reindex()
+        self.history.clear()
+        self._encoded.clear()
+        self.tombstones.clear()
+        # видалення до знімка невідомі: старші since отримають повний флот
+        self._tombstone_floor = self.version
+        self._layout += 1
+        self.feed.publish(self.version)
+
+    def _reindex(self):
+        # повна перебудова вторинних індексів з _by_row (відновлення, синхронізація воркерів)
+        self.kinds.load(d.kind for d in self._by_row)
+        self.locations.load(d.location for d in self._by_row)
+        self.rules.reset(len(self._by_row))
+
+    def _forget(self, device_id: str):
+        # пристрій зник з флоту: tombstone для ?since= і без кешованого JSON
+        self._encoded.pop(device_id, None)
+        self.tombstones[device_id] = self.version
+        if len(self.tombstones) > self.TOMBSTONE_LIMIT:
+            _, self._tombstone_floor = self.tombstones.popitem(last=False)
+
+    def _mark_changed(self, ids=None, rows=None):
+        # викликається під self.lock: нова версія менеджера, штамп змінених рядків, сповіщення
+        self.store.revision += 1
+        version = self.store.revision
+        if rows is not None:
+            self.store.version[rows] = version
+        elif ids is None:
+            self.store.version[:self.store.size] = version
+        else:
+            for device_id in ids:
+                d = self.devices.get(device_id)
+                if d is not None:
+                    self.store.version[d._row] = version
+        self.feed.publish(version)
+        return version
+
+    def _read_rows(self, rows=None):
+        # під self.lock.read(): копіюємо колонки і посилання на пристрої без Python-циклу по флоту
+        if rows is None:
+            return self._by_row[:], {name: self.store.column(name).copy() for name in Device._FIELDS}
+        return [self._by_row[row] for row in rows], {name: self.store.column(name)[rows] for name in Device._FIELDS}
+
+    @staticmethod
+    def _rows_to_dicts(devs, cols) -> List[dict]:
+        # поза блокуванням: збираємо dict з уже скопійованих значень (той самий формат, що Device.to_dict)
+        values = zip(
+            devs,
+            [STATUSES[code] for code in cols["status"].tolist()],
+            np.round(cols["load"], 2).tolist(),
+            cols["last_seen"].astype(np.int64).tolist(),
+            cols["power_level"].tolist(),
+            cols["voltage"].tolist(),
+            cols["temperature"].tolist(),
+            cols["version"].tolist(),
+        )
+        return [{
+            "id": d.id,
+            "kind": d.kind,
+            "name": d.name,
+            "location": d.location,
+            "role": d.role,
+            "status": status,
+            "load": load,
+            "last_seen": last_seen,
+            "power_level": power_level,
+            "voltage": voltage,
+            "temperature": temperature,
+            "version": version,
+            "extra": d.extra_view
+        } for d, status, load, last_seen, power_level, voltage, temperature, version in values]
+
+    def _encode_rows(self, devs, cols) -> List[bytes]:
+        # поза блокуванням: байти з кешу, якщо версія пристрою не змінилась, інакше — кодуємо і кешуємо
+        cache = self._encoded
+        parts = [None] * len(devs)
+        dirty = []
+        for i, (d, version) in enumerate(zip(devs, cols["version"].tolist())):
+            hit = cache.get(d.id)
+            if hit is not None and hit[0] == version:
+                parts[i] = hit[1]
+            else:
+                dirty.append(i)
+        if dirty:
+            idx = np.asarray(dirty)
+            dicts = self._rows_to_dicts([devs[i] for i in dirty], {name: col[idx] for name, col in cols.items()})
+            for i, data in zip(dirty, dicts):
+                encoded = dumps(data)
+                cache[data["id"]] = (data["version"], encoded)
+                parts[i] = encoded
+        return parts
 
     def list_devices(self) -> List[dict]:
+        with self.lock.read():
+            devs, cols = self._read_rows()
+        return self._rows_to_dicts(devs, cols)
+
+    def notify_changed(self, ids=None):
+        # викликати після змін пристроїв поза методами менеджера (None — весь флот)
         with self.lock:
-            return [d.to_dict() for d in self.devices.values()]
+            return self._mark_changed(ids)
+
+    def snapshot(self):
+        """Повний список пристроїв разом з поточною версією."""
+        with self.lock.read():
+            version = self.version
+            devs, cols = self._read_rows()
+        return version, self._rows_to_dicts(devs, cols)
+
+    def devices_json(self) -> Tuple[int, bytes]:
+        """Те саме, що snapshot, але готовим JSON {"version", "devices"} з кешу закодованих пристроїв."""
+        with self.lock.read():
+            version = self.version
+            devs, cols = self._read_rows()
+        payload = b'{"version":%d,"devices":%s}' % (version, join_array(self._encode_rows(devs, cols)))
+        return version, payload
+
+    def query_json(self, kind=None, status=None, location=None, limit=None, offset: int = 0) -> Tuple[int, int, bytes]:
+        """
+        Відфільтрована сторінка флоту готовим JSON {"version", "total", "offset", "devices"}:
+        (версія, total, payload). Умови поєднуються через AND; total — кількість до пагінації.
+        """
+        if status is not None and status not in STATUS_CODES:
+            raise ValueError(f"Невідомий статус {status}")
+        with self.lock.read():
+            version = self.version
+            rows = self.select_rows(kind=kind, status=status, location=location)
+            total = int(rows.size)
+            rows = rows[offset:None if limit is None else offset + limit]
+            devs, cols = self._read_rows(rows)
+        payload = b'{"version":%d,"total":%d,"offset":%d,"devices":%s}' % (
+            version, total, offset, join_array(self._encode_rows(devs, cols)))
+        return version, total, payload
+
+    def summary(self) -> dict:
+        """Лічильники флоту за статусом, видом і локацією — без обходу пристроїв."""
+        with self.lock.read():
+            version = self.version
+            total = self.store.size
+            cached_version, status = self._status_counts
+            if cached_version != version:
+                status = np.bincount(self.store.column("status"), minlength=len(STATUSES)).tolist()
+                self._status_counts = (version, status)
+            kinds = self.kinds.counts()
+            locations = self.locations.counts()
+        return {
+            "version": version,
+            "total": total,
+            "status": dict(zip(STATUSES, status)),
+            "kind": kinds,
+            "location": locations,
+        }
+
+    def _read_changes(self, since: int):
+        with self.lock.read():
+            version = self.version
+            # since з майбутнього (напр. виданий до перезапуску зі старого знімка) — теж повний флот
+            full = since < self._tombstone_floor or since > version
+            if full:
+                devs, cols = self._read_rows()
+                deleted = []
+            else:
+                devs, cols = self._read_rows(np.flatnonzero(self.store.column("version") > since))
+                deleted = [device_id for device_id, v in self.tombstones.items() if v > since]
+        return version, devs, cols, deleted, full
+
+    def changes_since(self, since: int):
+        """
+        Зміни після версії since: (версія, змінені пристрої, видалені id, full).
+        full=True — since старіший за збережені tombstones, тож повертається весь флот.
+        """
+        version, devs, cols, deleted, full = self._read_changes(since)
+        return version, self._rows_to_dicts(devs, cols), deleted, full
+
+    def changes_json(self, since: int) -> Tuple[int, bool, bool, bytes]:
+        """
+        Зміни після since готовим JSON {"version", "since", "full", "devices", "deleted"}:
+        (версія, full, чи є зміни, payload).
+        """
+        version, devs, cols, deleted, full = self._read_changes(since)
+        payload = b'{"version":%d,"since":%d,"full":%s,"devices":%s,"deleted":%s}' % (
+            version, since, b"true" if full else b"false",
+            join_array(self._encode_rows(devs, cols)), dumps(deleted))
+        return version, full, bool(devs or deleted), payload
+
+    def history_of(self, device_id: str, start=None, end=None):
+        """Історія пристрою (ts, {метрика: значення}) або None, якщо пристрою немає."""
+        with self.lock.read():
+            d = self.devices.get(device_id)
+            if d is None:
+                return None
+            return self.history.read(d._row, start, end)
 
     def get(self, device_id: str):
         return self.devices.get(device_id)
 
     def restart_device(self, device_id: str):
-        d = self.get(device_id)
-        if not d:
-            return False
-        with self.lock:
-            d.status = "OK"
-            d.load = max(5.0, d.load * 0.6)
-            d.last_seen = time.time()
-            d.extra["note"] = "Перезапущено оператором (симуляція)"
-        return True
+        return self._apply_one(("restart", device_id))
 
     def isolate_device(self, device_id: str):
-        d = self.get(device_id)
-        if not d:
-            return False
-        with self.lock:
-            d.status = "DEGRADED"
-            d.extra["note"] = "Ізольовано для розслідування (симуляція)"
-        return True
+        return self._apply_one(("isolate", device_id))
 
     def mark_compromised(self, device_id: str, note: str = ""):
-        d = self.get(device_id)
-        if not d:
-            return False
-        with self.lock:
-            d.status = "COMPROMISED"
-            d.extra["compromise_note"] = note
-            d.last_seen = time.time()
-        return True
+        return self._apply_one(("compromise", device_id, note))
 
     # Новий метод: регулювання потужності
     def adjust_power(self, device_id: str, power_level: int):
-        d = self.get(device_id)
-        if not d:
-            return False
-        with self.lock:
-            d.power_level = power_level
-            d.extra["power_adjusted"] = f"Потужність змінена на {power_level}%"
-            # Вплив на навантаження
-            d.load = max(5, min(120, d.load + (power_level - 75) / 10))
-        return True
+        return self._apply_one(("set_power", device_id, power_level))
 
     # Новий метод: регулювання напруги
     def adjust_voltage(self, device_id: str, voltage: int):
-        d = self.get(device_id)
-        if not d:
-            return False
+        return self._apply_one(("set_voltage", device_id, voltage))
+
+    def _apply_one(self, command: tuple) -> bool:
+        result = self.apply_commands([command])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def apply_commands(self, commands: Sequence[tuple]) -> List[Union[bool, Exception]]:
+        """
+        Поодинокі команди пакетом: одне захоплення self.lock на запис і одна нова версія на весь пакет.
+        commands — [(дія, id пристрою[, value[, origin]])], дія — одна з BULK_ACTIONS; origin — ініціатор
+        для журналу, якщо команду застосовують поза її запитом (див. commands.py).
+        Повертає по команді: True, False, якщо пристрою немає, або виняток, з яким команда впала, —
+        помилка однієї команди не зупиняє решту пакета, а застосовані все одно отримують нову версію.
+        """
+        for command in commands:
+            if command[0] not in self.BULK_ACTIONS:
+                raise ValueError(f"Невідома дія {command[0]}")
+        results = []
+        rows = []
         with self.lock:
-            d.voltage = voltage
-            d.extra["voltage_adjusted"] = f"Напруга змінена на {voltage}%"
-        return True
+            try:
+                for action, device_id, *rest in commands:
+                    value = rest[0] if rest else None
+                    d = self.devices.get(device_id)
+                    if d is None:
+                        results.append(False)
+                        continue
+                    params = {"value": value} if action in ("set_power", "set_voltage") else {}
+                    try:
+                        with acting_as(rest[1] if len(rest) > 1 else None), \
+                                self.journaled(action, [d._row], **params) as entry:
+                            entry["extra"] = self._command_locked(action, d, value)
+                    except Exception as e:
+                        results.append(e)
+                        continue
+                    rows.append(d._row)
+                    results.append(True)
+            finally:
+                if rows:
+                    self._mark_changed(rows=np.asarray(rows, dtype=np.int64))
+        return results
+
+    def _command_locked(self, action: str, d: Device, value) -> dict:
+        # під self.lock: ефект однієї команди на пристрій; повертає дописане в extra
+        self._check_value(action, value)
+        if action in self.STATUS_ACTIONS:
+            # статус виставив оператор — зняття правила його не скасує
+            self.rules.disown(d._row)
+        if action == "restart":
+            d.status = "OK"
+            d.load = max(5.0, d.load * 0.6)
+            d.last_seen = self.clock.time()
+            extra = {"note": "Перезапущено оператором (симуляція)"}
+        elif action == "isolate":
+            d.status = "DEGRADED"
+            extra = {"note": "Ізольовано для розслідування (симуляція)"}
+        elif action == "compromise":
+            d.status = "COMPROMISED"
+            d.last_seen = self.clock.time()
+            extra = {"compromise_note": value or ""}
+        elif action == "shutdown":
+            # екстрене відключення: пристрій в OFFLINE, навантаження скидається
+            d.status = "OFFLINE"
+            d.load = max(0.0, d.load - 30.0)
+            d.last_seen = self.clock.time()
+            extra = {"shutdown_note": value or ""}
+        elif action == "set_power":
+            d.power_level = value
+            # Вплив на навантаження
+            d.load = max(5, min(120, d.load + (value - 75) / 10))
+            extra = {"power_adjusted": f"Потужність змінена на {value}%"}
+        else:
+            d.voltage = value
+            extra = {"voltage_adjusted": f"Напруга змінена на {value}%"}
+        d.extra.update(extra)
+        return extra
+
+    # Масові команди: вибірка + дія за один прохід і одне захоплення блокування
+    BULK_ACTIONS = ("restart", "isolate", "compromise", "shutdown", "set_power", "set_voltage")
+    # дії, що виставляють статус пристрою напряму
+    STATUS_ACTIONS = ("restart", "isolate", "compromise", "shutdown")
+
+    @staticmethod
+    def _check_value(action: str, value):
+        # power_level і voltage — колонки int32 (як і в ingest): більше значення numpy 2 відкидає
+        # з OverflowError, а numpy 1 мовчки загортає
+        if action in ("set_power", "set_voltage") and not -2 ** 31 <= value < 2 ** 31:
+            raise ValueError(f"Значення {value} для {action} поза межами int32")
+
+    def select_rows(self, ids=None, kind=None, status=None, location=None, min_load=None, max_load=None) -> np.ndarray:
+        """Рядки сховища, що відповідають усім заданим умовам (None — умова не застосовується). Під self.lock."""
+        n = self.store.size
+        mask = np.ones(n, dtype=bool)
+        if ids is not None:
+            picked = np.zeros(n, dtype=bool)
+            picked[[self.devices[i]._row for i in ids if i in self.devices]] = True
+            mask &= picked
+        if status is not None:
+            mask &= self.store.column("status") == STATUS_CODES[status]
+        if min_load is not None:
+            mask &= self.store.column("load") >= min_load
+        if max_load is not None:
+            mask &= self.store.column("load") <= max_load
+        if kind is not None:
+            mask &= self.kinds.mask([kind])
+        if location is not None:
+            mask &= self.locations.mask([location])
+        return np.flatnonzero(mask)
+
+    def bulk_command(self, action: str, value=None, note: str = "", **selector) -> List[dict]:
+        """
+        Застосовує action до всіх пристроїв, що відповідають selector (див. select_rows),
+        і повертає результат по кожному пристрою. Ті самі ефекти, що й поодинокі команди.
+        """
+        if action not in self.BULK_ACTIONS:
+            raise ValueError(f"Невідома дія {action}")
+        if action in ("set_power", "set_voltage") and value is None:
+            raise ValueError(f"Дія {action} потребує value")
+        self._check_value(action, value)
+        if selector.get("status") is not None and selector["status"] not in STATUS_CODES:
+            raise ValueError(f"Невідомий статус {selector['status']}")
+        now = self.clock.time()
+        s = self.store
+        with self.lock:
+            rows = self.select_rows(**selector)
+            with self.journaled(f"bulk_{action}", rows, value=value,
+                                selector={k: v for k, v in selector.items() if v is not None}) as entry:
+                if action in self.STATUS_ACTIONS:
+                    self.rules.disown(rows)
+                if action == "restart":
+                    s.status[rows] = STATUS_CODES["OK"]
+                    s.load[rows] = np.maximum(5.0, s.load[rows] * 0.6)
+                    s.last_seen[rows] = now
+                    extra = ("note", "Перезапущено оператором (симуляція)")
+                elif action == "isolate":
+                    s.status[rows] = STATUS_CODES["DEGRADED"]
+                    extra = ("note", "Ізольовано для розслідування (симуляція)")
+                elif action == "compromise":
+                    s.status[rows] = STATUS_CODES["COMPROMISED"]
+                    s.last_seen[rows] = now
+                    extra = ("compromise_note", note)
+                elif action == "shutdown":
+                    s.status[rows] = STATUS_CODES["OFFLINE"]
+                    s.load[rows] = np.maximum(0.0, s.load[rows] - 30.0)
+                    s.last_seen[rows] = now
+                    extra = ("shutdown_note", note)
+                elif action == "set_power":
+                    s.power_level[rows] = value
+                    s.load[rows] = np.clip(s.load[rows] + (value - 75) / 10, 5, 120)
+                    extra = ("power_adjusted", f"Потужність змінена на {value}%")
+                else:
+                    s.voltage[rows] = value
+                    extra = ("voltage_adjusted", f"Напруга змінена на {value}%")
+                entry["extra"] = {extra[0]: extra[1]}
+                devs = [self._by_row[row] for row in rows]
+                for d in devs:
+                    d.extra[extra[0]] = extra[1]
+                if len(rows):
+                    self._mark_changed(rows=rows)
+            statuses = s.status[rows].tolist()
+            loads = np.round(s.load[rows], 2).tolist()
+        results = [{"id": d.id, "ok": True, "status": STATUSES[code], "load": load}
+                   for d, code, load in zip(devs, statuses, loads)]
+        found = {d.id for d in devs}
+        for device_id in selector.get("ids") or ():
+            if device_id not in found and device_id not in self.devices:
+                results.append({"id": device_id, "ok": False, "error": "Пристрій не знайдено"})
+        return results
+
+    # Каскад по топології мережі
+    def _grid_edges(self):
+        # під self.lock (читання або запис)
+        key = (self.grid.version, self._layout)
+        if self._grid_rows[0] != key:
+            row_of = {d.id: row for row, d in enumerate(self._by_row)}
+            self._grid_rows = (key, *self.grid.to_rows(row_of))
+        return self._grid_rows[1], self._grid_rows[2]
+
+    def _rows_of(self, ids) -> List[int]:
+        return [self.devices[i]._row for i in ids if i in self.devices]
+
+    def _cascade_locked(self, forced_rows, seed_rows, extra_load, apply: bool, threshold: float) -> dict:
+        n = self.store.size
+        load = self.store.column("load").copy()
+        forced = np.zeros(n, dtype=bool)
+        forced[forced_rows] = True
+        seeds = forced.copy()
+        seeds[seed_rows] = True
+        load[seed_rows] += extra_load
+        src, dst = self._grid_edges()
+        res = cascade(load, src, dst, forced, threshold)
+        tripped = res["tripped"]
+        warned = (seeds | (res["received"] & (res["load"] > WARNING_THRESHOLD))) & ~tripped
+        affected = np.flatnonzero(tripped | res["received"] | seeds)
+        if apply and affected.size:
+            s = self.store
+            s.load[:n] = res["load"]
+            s.status[:n][tripped] = STATUS_CODES["OFFLINE"]
+            s.status[:n][warned] = STATUS_CODES["WARNING"]
+            s.last_seen[affected] = self.clock.time()
+            self._mark_changed(rows=affected)
+        return {
+            "rounds": res["rounds"],
+            "stable": res["stable"],
+            "applied": apply,
+            "shed_load": round(res["shed"], 2),
+            "tripped": [self._by_row[row].id for row in np.flatnonzero(tripped)],
+            "affected": [self._by_row[row].id for row in affected],
+        }
+
+    def run_cascade(self, trip=(), add_load=None, apply: bool = False, threshold: float = TRIP_THRESHOLD) -> dict:
+        """
+        What-if каскад: trip — примусово вимкнені пристрої, add_load — {id: додаткове навантаження}.
+        apply=False лише рахує; apply=True записує навантаження та статуси (OFFLINE/WARNING).
+        """
+        add_load = add_load or {}
+
+        def run():
+            ids = [i for i in add_load if i in self.devices]
+            return self._cascade_locked(self._rows_of(trip), self._rows_of(ids),
+                                        np.array([add_load[i] for i in ids], dtype=np.float64), apply, threshold)
+        if not apply:
+            with self.lock.read():
+                return run()
+        with self.lock, self.journaled("cascade", trip=list(trip), add_load=add_load, threshold=threshold):
+            return run()
 
     # simulations
     def simulate_grid_cascade(self):
-        with self.lock:
-            for d in self.devices.values():
-                if d.kind in ("power", "substation"):
-                    d.load += random.uniform(15.0, 40.0)
-                    d.status = "WARNING" if d.load < 90 else "OFFLINE"
-                    d.last_seen = time.time()
+        with self.lock, self.journaled("simulate_grid_cascade"):
+            rows = np.flatnonzero(self.kinds.mask(("power", "substation")))
+            self._cascade_locked([], rows, self.rng.uniform(15.0, 40.0, rows.size), True, TRIP_THRESHOLD)
             if "pp-1" in self.devices:
-                self.devices["pp-1"].extra["cascade_note"] = "Перевантаження розпочато " + time.ctime()
+                self.devices["pp-1"].extra["cascade_note"] = "Перевантаження розпочато " + self.clock.ctime()
+                self._mark_changed(["pp-1"])
         return True
 
     def simulate_spoof_telemetry(self):
         with self.lock:
-            if "th-1" in self.devices:
-                d = self.devices["th-1"]
-                d.extra["spoofed_route"] = True
-                d.status = "WARNING"
-                d.last_seen = time.time()
+            d = self.devices.get("th-1")
+            if d is not None:
+                with self.journaled("simulate_spoof_telemetry", [d._row], extra={"spoofed_route": True}):
+                    d.extra["spoofed_route"] = True
+                    d.status = "WARNING"
+                    d.last_seen = self.clock.time()
+                    self._mark_changed(["th-1"])
         return True
 
     def simulate_transport_deadlock(self):
+        note = "Конфлікт міжсистемних interlock-правил"
         with self.lock:
-            if "th-1" in self.devices:
-                d = self.devices["th-1"]
-                d.status = "OFFLINE"
-                d.extra["deadlock_note"] = "Конфлікт міжсистемних interlock-правил"
-                d.last_seen = time.time()
+            d = self.devices.get("th-1")
+            if d is not None:
+                with self.journaled("simulate_transport_deadlock", [d._row], extra={"deadlock_note": note}):
+                    d.status = "OFFLINE"
+                    d.extra["deadlock_note"] = note
+                    d.last_seen = self.clock.time()
+                    self._mark_changed(["th-1"])
         return True
 
-    def _telemetry_pulse(self):
-        while True:
-            with self.lock:
-                for d in self.devices.values():
-                    # Змінюємо параметри з урахуванням встановлених значень
-                    d.load += random.uniform(-3.0, 3.0)
-                    d.load = max(0.0, min(120.0, d.load))
-                    
-                    # Температура залежить від навантаження
-                    d.temperature = 20 + (d.load / 120 * 40) + random.uniform(-2, 2)
-                    
-                    if random.random() < 0.02:
-                        d.status = random.choice(["OK", "WARNING", "DEGRADED"])
-                    d.last_seen = time.time()
-            time.sleep(2.0)
\ No newline at end of file
+    def _kind_rows(self, kinds, exclude_kinds, field) -> np.ndarray:
+        # під self.lock
+        mask = np.ones(self.store.size, dtype=bool) if kinds is None else self.kinds.mask(kinds)
+        if exclude_kinds:
+            mask &= ~self.kinds.mask(exclude_kinds)
+        if field is not None:
+            mask &= ~field
+        return np.flatnonzero(mask)
+
+    def _field_rows(self, now: float) -> Optional[np.ndarray]:
+        # під self.lock: маска пристроїв з живою польовою телеметрією або None, якщо таких немає
+        field = self.store.column("field_ts") > now - self.field_hold
+        return field if field.any() else None
+
+    def _tick_values(self, kinds, exclude_kinds, now: float, dt: float, flip_status: bool):
+        # під self.lock (читання достатньо): рядки тіку (None — весь флот) і їхні нові значення
+        field = self._field_rows(now)
+        if kinds is None and not exclude_kinds and field is None:
+            rows = None
+        else:
+            rows = self._kind_rows(kinds, exclude_kinds, field)
+        return rows, self.store.tick_values(self.rng, rows, dt, flip_status)
+
+    def telemetry_tick(self, kinds=None, exclude_kinds=(), dt: float = PULSE_PERIOD):
+        """
+        Один крок телеметрії: весь флот або лише пристрої видів kinds (за винятком exclude_kinds).
+        Тік без kinds — базовий: саме він пише зріз флоту в історію і запускає правила.
+        Пристрої з польовою телеметрією за останні field_hold секунд симуляція не змінює.
+        Якщо правила задано, статуси змінюють лише вони, а не випадкові перемикання.
+        """
+        now = self.clock.time()
+        kinds = None if kinds is None else frozenset(kinds)
+        exclude_kinds = frozenset(exclude_kinds)
+        flip_status = not self.rules.rules
+        # Нові значення рахуємо під блокуванням читання, поряд з читачами; під записом лише копіюємо
+        # їх у колонки. Якщо між двома захопленнями флот змінився (команда, ingest, інший тік),
+        # порахованого вже не досить — рахуємо заново під записом, як раніше
+        with self.lock.read():
+            seen = (self.store.revision, self._layout)
+            rows, values = self._tick_values(kinds, exclude_kinds, now, dt, flip_status)
+        with self.lock:
+            if (self.store.revision, self._layout) != seen:
+                rows, values = self._tick_values(kinds, exclude_kinds, now, dt, flip_status)
+            self.store.apply_tick(values, now, rows)
+            # rows=None — увесь флот
+            self._mark_changed(rows=rows)
+            if kinds is None:
+                self.history.append(now, self.store)
+                self._apply_rules(now)
+
+    def _apply_rules(self, now: float):
+        # під self.lock: крок правил і нові статуси пристроїв, чий набір активних правил змінився
+        rows, codes = self.rules.evaluate(self.store, self.kinds, self.locations, self._by_row, now)
+        differ = self.store.status[rows] != codes
+        if differ.any():
+            self.store.status[rows[differ]] = codes[differ]
+            self._mark_changed(rows=rows[differ])
+        # власні зміни статусів не мають запускати повторне оцінювання
+        self.rules.version = self.version
+
+    def set_rules(self, rules):
+        """Замінює набір правил (список Rule); перше оцінювання — на наступному базовому тіку."""
+        with self.lock, self.journaled("set_rules", [], rules=[r.to_dict() for r in rules]):
+            self.rules.load(rules)
+
+    def rules_state(self) -> dict:
+        with self.lock.read():
+            engine = self.rules
+            return {"rules": [r.to_dict() for r in engine.rules], "active": engine.active_count(),
+                    "stats": dict(engine.stats)}
+
+    def alerts_since(self, seq: int = 0, limit: int = 1000) -> Tuple[int, List[dict]]:
+        """Події правил після seq: (останній seq, події)."""
+        with self.lock.read():
+            return self.rules.seq, self.rules.alerts_since(seq, limit)
+
+    def frame_since(self, version: int, names) -> Tuple[int, np.ndarray, Dict[str, np.ndarray], Dict[int, dict]]:
+        """
+        Рядки, змінені після version: (поточна версія, рядки, колонки names цих рядків,
+        {рядок: extra} для змінених рядків з непорожнім extra). Кадр для запису таймлайну.
+        """
+        with self.lock.read():
+            current = self.version
+            rows = np.flatnonzero(self.store.column("version") > version)
+            cols = {name: self.store.column(name)[rows] for name in names}
+            by_row = self._by_row
+            extras = {row: dict(by_row[row]._extra) for row in rows.tolist() if by_row[row]._extra}
+        return current, rows, cols, extras
+
+    def apply_frame(self, ts: float, rows: np.ndarray, columns: Dict[str, np.ndarray], extras: Dict[int, dict]):
+        """Записує кадр таймлайну (див. frame_since) як один тік: значення, extra, last_seen = ts, історія."""
+        with self.lock:
+            n = self.store.size
+            keep = rows < n
+            rows = rows[keep]
+            for name, values in columns.items():
+                getattr(self.store, name)[rows] = values[keep]
+            for row, extra in extras.items():
+                if row < n:
+                    d = self._by_row[row]
+                    d.extra.clear()
+                    d.extra.update(extra)
+            self.store.last_seen[rows] = ts
+            self._mark_changed(rows=rows)
+            self.history.append(ts, self.store)
+
+    def _rows_for(self, ids) -> np.ndarray:
+        # під self.lock (читання або запис): рядки пристроїв за id, -1 — невідомий
+        get = self.devices.get
+        return np.fromiter((-1 if d is None else d._row for d in map(get, ids)), dtype=np.int64, count=len(ids))
+
+    def ingest(self, batch: SampleBatch) -> dict:
+        """
+        Застосовує пакет польових зразків за одне захоплення блокування на запис і повертає підтвердження.
+
+        Для кожного пристрою береться найновіший зразок пакета; непередані поля (NaN, status -1)
+        не змінюються. last_seen — мітка ts зразка (не пізніша за поточний час сервера).
+        Зразки невідомих пристроїв і з некоректними значеннями відкидаються.
+        """
+        samples = batch.samples
+        now = self.clock.time()
+        # усе, що залежить лише від пакета, — поза блокуванням
+        device = samples["device"].astype(np.int64)
+        status = samples["status"]
+        valid = (device < len(batch.ids)) & (status >= -1) & (status < len(STATUSES))
+        # NaN — «не передано» і допустиме; нескінченності й цілі поза int32 — ні
+        for name, limit in (("load", np.inf), ("temperature", np.inf), ("power_level", 2 ** 31), ("voltage", 2 ** 31)):
+            valid &= ~(np.abs(samples[name]) >= limit)
+        picked = np.flatnonzero(valid)
+        targets, latest = latest_per_key(device[picked], samples["ts"][picked])
+        latest = picked[latest]
+        ts = samples["ts"][latest]
+        last_seen = np.where(np.isnan(ts), now, np.minimum(ts, now))
+        s = self.store
+        # id -> рядок під читанням; під записом перераховуємо, лише якщо розкладка рядків змінилась
+        with self.lock.read():
+            layout = self._layout
+            rows_of = self._rows_for(batch.ids)
+        with self.lock:
+            if self._layout != layout:
+                rows_of = self._rows_for(batch.ids)
+            rows = rows_of[targets]
+            known = rows >= 0
+            applied = rows[known]
+            if applied.size:
+                for name in ("load", "temperature", "power_level", "voltage"):
+                    values = samples[name][latest[known]]
+                    given = ~np.isnan(values)
+                    getattr(s, name)[applied[given]] = values[given]
+                codes = status[latest[known]]
+                given = codes >= 0
+                s.status[applied[given]] = codes[given]
+                s.last_seen[applied] = last_seen[known]
+                s.field_ts[applied] = now
+                version = self._mark_changed(rows=applied)
+            else:
+                version = self.version
+        accepted = int(np.count_nonzero(rows_of[device[picked]] >= 0))
+        # у підтвердженні — не більше UNKNOWN_LIMIT id невідомих пристроїв
+        unknown = [batch.ids[i] for i in targets[~known][:self.UNKNOWN_LIMIT].tolist()]
+        return {
+            "version": version,
+            "received": len(batch),
+            "accepted": accepted,
+            "applied": int(applied.size),
+            "rejected": len(batch) - accepted,
+            "unknown": unknown,
+        }
@@ -0,0 +1,26 @@
+import json
+
+# orjson — необов'язковий швидкий кодувальник; без нього працює стандартний json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj) -> bytes:
+    """Компактний UTF-8 JSON у байтах."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    """JSON з bytes/memoryview/str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+
+def join_array(parts) -> bytes:
+    """Збирає JSON-масив з уже закодованих елементів без повторного кодування."""
+    return b"[" + b",".join(parts) + b"]"
@@ -0,0 +1,30 @@
+import threading
+from typing import Callable
+
+
+class ChangeFeed:
+    """Сповіщення про зміни флоту для push-клієнтів.
+
+    Самі зміни клієнт забирає через DeviceManager.changes_since(version) —
+    стрічка лише будить очікувачів після кожної нової версії.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._lock = threading.Lock()
+        self._waiters = set()
+
+    def publish(self, version: int):
+        with self._lock:
+            self.version = version
+            waiters = list(self._waiters)
+        for wake in waiters:
+            wake()
+
+    def add_waiter(self, wake: Callable[[], None]):
+        with self._lock:
+            self._waiters.add(wake)
+
+    def remove_waiter(self, wake: Callable[[], None]):
+        with self._lock:
+            self._waiters.discard(wake)
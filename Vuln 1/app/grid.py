@@ -0,0 +1,106 @@
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+
+# Навантаження (%), вище якого вузол вимикається захистом
+TRIP_THRESHOLD = 90.0
+# Вузол, що отримав навантаження, але не вимкнувся, — WARNING, якщо вище цього рівня
+WARNING_THRESHOLD = 75.0
+
+
+class GridTopology:
+    """Неорієнтований граф зв'язків між пристроями (лінії живлення).
+
+    Зберігається як множини сусідів за id; для розрахунку перетворюється на
+    CSR-подібні масиви (src, dst) у координатах рядків ColumnarStore.
+    """
+
+    def __init__(self):
+        self._adj: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def add_link(self, a: str, b: str):
+        if a == b:
+            return
+        with self._lock:
+            self._adj.setdefault(a, set()).add(b)
+            self._adj.setdefault(b, set()).add(a)
+            self.version += 1
+
+    def add_links(self, links: Iterable[Tuple[str, str]]):
+        with self._lock:
+            for a, b in links:
+                if a == b:
+                    continue
+                self._adj.setdefault(a, set()).add(b)
+                self._adj.setdefault(b, set()).add(a)
+            self.version += 1
+
+    def remove_node(self, node: str):
+        with self._lock:
+            for other in self._adj.pop(node, ()):
+                self._adj.get(other, set()).discard(node)
+            self.version += 1
+
+    def neighbours(self, node: str) -> Set[str]:
+        with self._lock:
+            return set(self._adj.get(node, ()))
+
+    def links(self) -> List[Tuple[str, str]]:
+        """Кожен зв'язок один раз, як пара (a, b)."""
+        with self._lock:
+            return [(a, b) for a, ns in self._adj.items() for b in ns if a < b]
+
+    def edge_count(self) -> int:
+        with self._lock:
+            return sum(len(v) for v in self._adj.values()) // 2
+
+    def to_rows(self, row_of: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Орієнтовані ребра (обидва напрямки) у вигляді масивів рядків src -> dst."""
+        with self._lock:
+            pairs = [(row_of[a], row_of[b]) for a, ns in self._adj.items() if a in row_of
+                     for b in ns if b in row_of]
+        if not pairs:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        edges = np.asarray(pairs, dtype=np.int64)
+        return edges[:, 0], edges[:, 1]
+
+
+def cascade(load: np.ndarray, src: np.ndarray, dst: np.ndarray, forced: np.ndarray,
+            threshold: float = TRIP_THRESHOLD, max_rounds: int = 100) -> dict:
+    """
+    Ітеративний каскад: у кожному раунді вимкнені вузли віддають своє навантаження
+    порівну живим сусідам (одне bincount по ребрах), доки нові вузли не перестануть
+    перевищувати threshold. Вузол без живих сусідів скидає навантаження (shed).
+    """
+    n = load.size
+    load = load.astype(np.float64, copy=True)
+    tripped = np.zeros(n, dtype=bool)
+    received = np.zeros(n, dtype=bool)
+    new = forced | (load > threshold)
+    rounds = 0
+    shed = 0.0
+    while new.any() and rounds < max_rounds:
+        rounds += 1
+        tripped |= new
+        live = new[src] & ~tripped[dst]
+        e_src, e_dst = src[live], dst[live]
+        degree = np.bincount(e_src, minlength=n)
+        share = np.divide(load, degree, out=np.zeros(n), where=degree > 0)
+        transfer = np.bincount(e_dst, weights=share[e_src], minlength=n)
+        shed += float(load[new & (degree == 0)].sum())
+        load[new] = 0.0
+        load += transfer
+        received |= transfer > 0
+        new = (load > threshold) & ~tripped
+    return {
+        "rounds": rounds,
+        "stable": not new.any(),
+        "tripped": tripped,
+        "received": received & ~tripped,
+        "load": load,
+        "shed": shed,
+    }
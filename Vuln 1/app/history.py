@@ -0,0 +1,152 @@
+from typing import Dict, Optional
+
+import numpy as np
+
+# Метрики, що потрапляють в історію на кожному тіку пульсу
+METRICS = ("load", "temperature", "power_level", "voltage")
+
+
+class TelemetryHistory:
+    """Кільцевий буфер телеметрії для всіх пристроїв.
+
+    Один тік — один рядок буфера (retention, capacity): запис усього флоту
+    суцільний, а пристрій читає свій стовпчик. Пам'ять — retention * capacity *
+    4 метрики * float32 — не росте з часом; якщо флот росте понад max_bytes,
+    retention зменшується, зберігаючи найновіші тіки.
+    """
+
+    def __init__(self, retention: int = 900, capacity: int = 1024, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.capacity = max(1, capacity)
+        self.retention = max(1, min(retention, self._fit(self.capacity)))
+        self.head = 0  # слот, куди піде наступний тік
+        self.ts = np.zeros(self.retention, dtype=np.float64)
+        self.count = np.zeros(self.capacity, dtype=np.int32)
+        self.values = {name: np.zeros((self.retention, self.capacity), dtype=np.float32) for name in METRICS}
+
+    @property
+    def nbytes(self) -> int:
+        return self.ts.nbytes + self.count.nbytes + sum(v.nbytes for v in self.values.values())
+
+    def _fit(self, capacity: int) -> int:
+        # найбільший retention, що вміщається в max_bytes для такої кількості рядків
+        return max(1, self.max_bytes // (capacity * len(METRICS) * 4))
+
+    def _grow(self, min_capacity: int):
+        capacity = self.capacity
+        while capacity < min_capacity:
+            capacity *= 2
+        retention = min(self.retention, self._fit(capacity))
+        # слоти у хронологічному порядку, залишаємо найновіші retention
+        order = ((self.head + np.arange(self.retention)) % self.retention)[-retention:]
+        count = np.zeros(capacity, dtype=np.int32)
+        count[:self.capacity] = np.minimum(self.count, retention)
+        self.count = count
+        self.ts = self.ts[order]
+        for name, old in self.values.items():
+            new = np.zeros((retention, capacity), dtype=np.float32)
+            new[:, :self.capacity] = old[order]
+            self.values[name] = new
+        self.head = 0
+        self.retention = retention
+        self.capacity = capacity
+
+    def append(self, ts: float, store):
+        """Записує поточні значення всіх n рядків сховища як один тік."""
+        n = store.size
+        if n > self.capacity:
+            self._grow(n)
+        slot = self.head
+        self.ts[slot] = ts
+        for name, buf in self.values.items():
+            buf[slot, :n] = store.column(name)
+        np.minimum(self.count[:n] + 1, self.retention, out=self.count[:n])
+        self.head = (slot + 1) % self.retention
+
+    def clear(self):
+        self.count[:] = 0
+        self.head = 0
+
+    def reset_row(self, row: int):
+        # новий пристрій у рядку — стара історія рядка більше не його
+        if row < self.capacity:
+            self.count[row] = 0
+
+    def move_row(self, src: int, dst: int):
+        # дзеркало ColumnarStore.swap_remove; рядок поза capacity ще не має історії
+        if src >= self.capacity or dst >= self.capacity:
+            self.reset_row(dst)
+            self.reset_row(src)
+            return
+        for buf in self.values.values():
+            buf[:, dst] = buf[:, src]
+        self.count[dst] = self.count[src]
+        self.count[src] = 0
+
+    def read(self, row: int, start: Optional[float] = None, end: Optional[float] = None):
+        """Копія історії рядка у хронологічному порядку: (ts, {метрика: значення})."""
+        total = int(self.count[row]) if row < self.capacity else 0
+        idx = (self.head - total + np.arange(total)) % self.retention
+        ts = self.ts[idx]
+        mask = np.ones(total, dtype=bool)
+        if start is not None:
+            mask &= ts >= start
+        if end is not None:
+            mask &= ts <= end
+        idx = idx[mask]
+        return self.ts[idx], {name: buf[idx, row].astype(np.float64) for name, buf in self.values.items()}
+
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: індекси точок, що зберігають форму ряду."""
+    n = len(x)
+    if points >= n:
+        return np.arange(n)
+    if points < 3:
+        return np.linspace(0, n - 1, max(points, 1)).astype(np.int64)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    picked = np.empty(points, dtype=np.int64)
+    picked[0] = 0
+    picked[-1] = n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        # середня точка наступного кошика (для останнього — остання точка)
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        if nhi <= nlo:
+            nhi = nlo + 1
+        avg_x = x[nlo:nhi].mean()
+        avg_y = y[nlo:nhi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def minmax(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """Мін/макс у кожному з points/2 кошиків — піки не губляться."""
+    n = len(x)
+    if points >= n:
+        return np.arange(n)
+    buckets = max(1, points // 2)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    picked = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi <= lo:
+            continue
+        seg = y[lo:hi]
+        picked.extend(sorted({lo + int(np.argmin(seg)), lo + int(np.argmax(seg))}))
+    return np.asarray(picked, dtype=np.int64)
+
+
+DOWNSAMPLERS = {"lttb": lttb, "minmax": minmax}
+
+
+def downsample(ts: np.ndarray, values: Dict[str, np.ndarray], points: int, method: str = "lttb") -> Dict[str, list]:
+    """Кожна метрика окремо проріджується до ~points пар [ts, value]."""
+    pick = DOWNSAMPLERS[method]
+    series = {}
+    for name, y in values.items():
+        idx = pick(ts, y, points)
+        series[name] = np.column_stack((ts[idx], np.round(y[idx], 2))).tolist()
+    return series
@@ -0,0 +1,77 @@
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+
+class CategoryIndex:
+    """Індекс категоріального поля пристроїв (kind, location) у координатах рядків ColumnarStore.
+
+    Значення кодуються за словником у масив int32 паралельно рядкам сховища і
+    підтримуються інкрементально разом з add/remove; лічильники на значення —
+    теж. Вибірка за значенням — одне векторне порівняння кодів без обходу Device.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.codes = np.full(max(1, capacity), -1, dtype=np.int32)
+        self.size = 0
+        self.values: List[str] = []
+        self._code: Dict[str, int] = {}
+        self._counts = np.zeros(0, dtype=np.int64)
+
+    def _code_of(self, value: str) -> int:
+        code = self._code.get(value)
+        if code is None:
+            code = len(self.values)
+            self._code[value] = code
+            self.values.append(value)
+            self._counts = np.append(self._counts, 0)
+        return code
+
+    def _ensure(self, rows: int):
+        if rows > self.codes.size:
+            capacity = self.codes.size
+            while capacity < rows:
+                capacity *= 2
+            codes = np.full(capacity, -1, dtype=np.int32)
+            codes[:self.codes.size] = self.codes
+            self.codes = codes
+
+    def set(self, row: int, value: str):
+        """Значення рядка row (новий рядок у кінці або заміна наявного)."""
+        self._ensure(row + 1)
+        old = self.codes[row]
+        if old >= 0 and row < self.size:
+            self._counts[old] -= 1
+        code = self._code_of(value)
+        self.codes[row] = code
+        self._counts[code] += 1
+        self.size = max(self.size, row + 1)
+
+    def swap_remove(self, row: int):
+        # дзеркало ColumnarStore.swap_remove
+        last = self.size - 1
+        self._counts[self.codes[row]] -= 1
+        self.codes[row] = self.codes[last]
+        self.codes[last] = -1
+        self.size = last
+
+    def load(self, values: Iterable[str]):
+        """Перебудова з нуля: значення рядків 0..n-1 по порядку."""
+        values = list(values)
+        for value in set(values):
+            self._code_of(value)
+        code = self._code
+        codes = np.array([code[v] for v in values], dtype=np.int32)
+        self._ensure(codes.size)
+        self.codes[:codes.size] = codes
+        self.codes[codes.size:] = -1
+        self.size = codes.size
+        self._counts = np.bincount(codes, minlength=len(self.values)).astype(np.int64)
+
+    def mask(self, values: Iterable[str]) -> np.ndarray:
+        """Булева маска рядків, чиє значення входить у values."""
+        codes = [self._code[v] for v in values if v in self._code]
+        return np.isin(self.codes[:self.size], codes)
+
+    def counts(self) -> Dict[str, int]:
+        return {value: int(n) for value, n in zip(self.values, self._counts.tolist()) if n}
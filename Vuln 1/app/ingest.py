@@ -0,0 +1,216 @@
+import struct
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from encoding import loads
+from store import STATUS_CODES
+
+# Пакет зразків телеметрії у пам'яті й на дроті — та сама розмітка:
+# device — індекс у таблиці id пакета; NaN у числових полях і -1 у status — «не передано»
+SAMPLE = np.dtype([
+    ("device", "<u4"),
+    ("ts", "<f8"),
+    ("load", "<f8"),
+    ("temperature", "<f8"),
+    ("power_level", "<f8"),
+    ("voltage", "<f8"),
+    ("status", "i1"),
+])
+FIELDS = ("ts", "load", "temperature", "power_level", "voltage")
+
+# Бінарний формат (Content-Type: application/x-hmi-telemetry) — послідовність кадрів,
+# кожен кадр — окремий пакет і окреме підтвердження:
+#   MAGIC | u32 кількість id | u32 кількість зразків |
+#   id: u16 довжина + UTF-8, по черзі | зразки: масив SAMPLE (little-endian, без вирівнювання)
+# Зразки читаються через np.frombuffer без розбору по одному.
+MAGIC = b"HMIT"
+BINARY_TYPE = "application/x-hmi-telemetry"
+NDJSON_TYPE = "application/x-ndjson"
+
+_FRAME = struct.Struct("<4sII")
+_ID_LEN = struct.Struct("<H")
+
+# порядок полів рядка NDJSON у вигляді масиву
+NDJSON_ARRAY = ("device_id", "ts", "load", "temperature", "power_level", "voltage", "status")
+
+
+class IngestError(ValueError):
+    pass
+
+
+class SampleBatch:
+    """Пакет зразків: таблиця id пристроїв і масив SAMPLE, що на неї посилається."""
+
+    def __init__(self, ids: List[str], samples: np.ndarray, invalid: int = 0):
+        self.ids = ids
+        self.samples = samples
+        # рядки, відкинуті ще під час розбору (зіпсований JSON, невідомий статус)
+        self.invalid = invalid
+
+    def __len__(self) -> int:
+        return len(self.samples) + self.invalid
+
+
+def encode_frame(ids: Sequence[str], samples: np.ndarray) -> bytes:
+    """Кадр бінарного формату; samples — масив SAMPLE з індексами в ids."""
+    parts = [_FRAME.pack(MAGIC, len(ids), len(samples))]
+    for device_id in ids:
+        raw = device_id.encode("utf-8")
+        parts.append(_ID_LEN.pack(len(raw)))
+        parts.append(raw)
+    parts.append(np.ascontiguousarray(samples, dtype=SAMPLE).tobytes())
+    return b"".join(parts)
+
+
+class FrameDecoder:
+    """Інкрементальний розбір бінарного потоку: feed() повертає кадри, що вже прийшли повністю."""
+
+    def __init__(self, max_frame: int = 64 * 1024 * 1024):
+        self.max_frame = max_frame
+        self._buf = bytearray()
+
+    def feed(self, chunk: bytes) -> List[SampleBatch]:
+        self._buf += chunk
+        batches = []
+        while True:
+            batch = self._next()
+            if batch is None:
+                return batches
+            batches.append(batch)
+
+    def close(self) -> List[SampleBatch]:
+        if self._buf:
+            raise IngestError(f"Обірваний кадр: {len(self._buf)} байт у кінці потоку")
+        return []
+
+    def _next(self) -> Optional[SampleBatch]:
+        buf = self._buf
+        if len(buf) < _FRAME.size:
+            return None
+        magic, n_ids, n_samples = _FRAME.unpack_from(buf)
+        if magic != MAGIC:
+            raise IngestError("Невідома сигнатура кадру")
+        pos = _FRAME.size
+        ids = []
+        for _ in range(n_ids):
+            if len(buf) < pos + _ID_LEN.size:
+                return None
+            (size,) = _ID_LEN.unpack_from(buf, pos)
+            pos += _ID_LEN.size
+            if len(buf) < pos + size:
+                return None
+            ids.append(bytes(buf[pos:pos + size]).decode("utf-8"))
+            pos += size
+        end = pos + n_samples * SAMPLE.itemsize
+        if end > self.max_frame:
+            raise IngestError(f"Кадр більший за {self.max_frame} байт")
+        if len(buf) < end:
+            return None
+        samples = np.frombuffer(bytes(buf[pos:end]), dtype=SAMPLE)
+        del buf[:end]
+        return SampleBatch(ids, samples)
+
+
+def _number(value) -> float:
+    if value is None:
+        return np.nan
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # без orjson json приймає цілі будь-якої довжини: завеликі тут дають OverflowError
+        return float(value)
+    raise TypeError(value)
+
+
+def _status(value) -> int:
+    if value is None:
+        return -1
+    return STATUS_CODES[value]
+
+
+def parse_lines(lines: Sequence[bytes]) -> SampleBatch:
+    """
+    Пакет з рядків NDJSON. Рядок — об'єкт {"device_id", "ts", "load", "temperature",
+    "power_level", "voltage", "status"} або масив у тому ж порядку; поля, крім device_id,
+    можна пропускати. Зіпсовані рядки не валять пакет, а рахуються в invalid.
+    """
+    try:
+        records = loads(b"[" + b",".join(lines) + b"]")
+        if len(records) != len(lines):
+            # рядок на кшталт {..},{..} у спільному масиві розпався б на кілька записів
+            raise ValueError("кількість записів не збігається з кількістю рядків")
+    except ValueError:
+        # рідкісний випадок — шукаємо зіпсовані рядки по одному
+        records = []
+        for line in lines:
+            try:
+                records.append(loads(line))
+            except ValueError:
+                records.append(None)
+    table = {}
+    rows = []
+    invalid = 0
+    for record in records:
+        try:
+            if isinstance(record, dict):
+                device_id = record["device_id"]
+                values = [_number(record.get(name)) for name in FIELDS]
+                status = _status(record.get("status"))
+            elif isinstance(record, list) and 1 <= len(record) <= len(NDJSON_ARRAY):
+                record = record + [None] * (len(NDJSON_ARRAY) - len(record))
+                device_id = record[0]
+                values = [_number(v) for v in record[1:6]]
+                status = _status(record[6])
+            else:
+                raise TypeError(record)
+            if not isinstance(device_id, str):
+                raise TypeError(device_id)
+        except (KeyError, TypeError, OverflowError):
+            invalid += 1
+            continue
+        rows.append((table.setdefault(device_id, len(table)), *values, status))
+    return SampleBatch(list(table), np.array(rows, dtype=SAMPLE), invalid)
+
+
+class LineDecoder:
+    """Інкрементальний розбір NDJSON: пакет — кожні batch_size непорожніх рядків."""
+
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = max(1, batch_size)
+        self._tail = b""
+        self._lines: List[bytes] = []
+
+    def feed(self, chunk: bytes) -> List[SampleBatch]:
+        data = self._tail + chunk
+        *complete, self._tail = data.split(b"\n")
+        self._lines.extend(line for line in complete if line.strip())
+        batches = []
+        while len(self._lines) >= self.batch_size:
+            batches.append(parse_lines(self._lines[:self.batch_size]))
+            del self._lines[:self.batch_size]
+        return batches
+
+    def close(self) -> List[SampleBatch]:
+        if self._tail.strip():
+            self._lines.append(self._tail)
+        self._tail = b""
+        lines, self._lines = self._lines, []
+        return [parse_lines(lines)] if lines else []
+
+
+def decoder_for(content_type: Optional[str], batch_size: int):
+    kind = (content_type or "").split(";", 1)[0].strip().lower()
+    if kind == BINARY_TYPE:
+        return FrameDecoder()
+    if kind in (NDJSON_TYPE, "application/jsonl", "application/json", ""):
+        return LineDecoder(batch_size)
+    raise IngestError(f"Непідтримуваний Content-Type {content_type}; очікується {NDJSON_TYPE} або {BINARY_TYPE}")
+
+
+def latest_per_key(rows: np.ndarray, ts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Для кожного ключа (напр. індексу пристрою) — індекс його найновішого зразка: (унікальні ключі, індекси зразків)."""
+    # NaN-мітки сортуються в кінець групи, тож зразок без ts вважається найновішим
+    order = np.lexsort((ts, rows))
+    sorted_rows = rows[order]
+    last = np.ones(order.size, dtype=bool)
+    last[:-1] = sorted_rows[1:] != sorted_rows[:-1]
+    return sorted_rows[last], order[last]
@@ -0,0 +1,330 @@
+import fcntl
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from encoding import dumps, loads
+from store import STATUSES
+
+# Журнал команд: NDJSON, один запис на рядок, файл лише дописується.
+#   {"seq", "ts", "actor", "endpoint", "client", "action", "extra", "params",
+#    "devices": [{"id", "before": {поле: значення}, "after": {...}}]}
+# Записи пише фоновий потік групами: усе, що накопичилось за час попереднього fsync,
+# іде одним write і одним fsync (group commit), тож запит не чекає на диск.
+# Кілька процесів (воркери uvicorn) пишуть у той самий файл під flock; seq і ts
+# присвоюються під ним, тож вони монотонні в межах файлу.
+# Кожен INDEX_EVERY-й запис — точка розрідженого індексу (ts, зсув): вибірка за
+# часом починає читати файл з найближчої точки, а не з початку.
+INDEX_EVERY = 64
+
+# ініціатор поточного запиту: ставить OriginMiddleware, уточнює set_actor після перевірки ключа
+_ORIGIN: ContextVar[Optional[dict]] = ContextVar("journal_origin", default=None)
+
+
+def origin() -> dict:
+    current = _ORIGIN.get()
+    if current is None:
+        return {"actor": "system", "endpoint": None, "client": None}
+    return current
+
+
+def set_actor(actor: str):
+    # словник спільний для контексту запиту і його потоку з пулу — міняємо на місці
+    current = _ORIGIN.get()
+    if current is not None:
+        current["actor"] = actor
+
+
+@contextmanager
+def acting_as(source: Optional[dict]):
+    # команда застосовується поза своїм запитом (черга команд): ініціатор, збережений при постановці
+    if source is None:
+        yield
+        return
+    token = _ORIGIN.set(source)
+    try:
+        yield
+    finally:
+        _ORIGIN.reset(token)
+
+
+class OriginMiddleware:
+    """ASGI-middleware: ендпоінт і адреса клієнта запиту для записів журналу."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        client = scope.get("client")
+        token = _ORIGIN.set({"actor": "anonymous", "endpoint": f"{scope['method']} {scope['path']}",
+                             "client": client[0] if client else None})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _ORIGIN.reset(token)
+
+
+def _values(name: str, values: np.ndarray) -> list:
+    if name == "status":
+        return [STATUSES[v] for v in values.tolist()]
+    if name == "load":
+        return np.round(values, 3).tolist()
+    return values.tolist()
+
+
+def _encode(entry: dict, seq: int, ts: float) -> bytes:
+    # виконується у фоновому потоці: масиви до/після -> зміни по пристроях
+    before, after = entry["before"], entry["after"]
+    changed = np.zeros(entry["rows"].size, dtype=bool)
+    for name in before:
+        changed |= before[name] != after[name]
+    # для команд над усім флотом — лише пристрої, які справді змінились
+    picked = np.flatnonzero(changed) if entry["sparse"] else np.arange(changed.size)
+    devs = entry["devices"]
+    ids = [devs[i].id for i in entry["rows"][picked].tolist()]
+    diff = {name: (_values(name, before[name][picked]), _values(name, after[name][picked]),
+                   (before[name][picked] != after[name][picked]).tolist()) for name in before}
+    changes = []
+    for i, device_id in enumerate(ids):
+        b = {}
+        a = {}
+        for name, (old, new, differs) in diff.items():
+            if differs[i]:
+                b[name] = old[i]
+                a[name] = new[i]
+        changes.append({"id": device_id, "before": b, "after": a})
+    record = {
+        "seq": seq,
+        "ts": ts,
+        "actor": entry["actor"],
+        "endpoint": entry["endpoint"],
+        "client": entry["client"],
+        "action": entry["action"],
+        "extra": entry["extra"],
+        "params": entry["params"],
+        "devices": changes,
+    }
+    return dumps(record) + b"\n"
+
+
+class Journal:
+    def __init__(self, path: str, fsync: bool = True, commit_delay: float = 0.0):
+        self.path = path
+        self.fsync = fsync
+        # скільки чекати перед комітом, щоб зібрати більшу групу (0 — одразу)
+        self.commit_delay = commit_delay
+        # observer(записів у групі, секунд на write + fsync) — для метрик
+        self.observer: Optional[Callable[[int, float], None]] = None
+        self.stats = {"records": 0, "commits": 0, "max_batch": 0, "errors": 0}
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        # стан файлу, відомий цьому процесу: розмір, останні seq/ts, розріджений індекс
+        self._lock = threading.Lock()
+        self._size = 0
+        self._count = 0
+        self.seq = 0
+        self._last_ts = 0.0
+        self._index_ts: List[float] = []
+        self._index_off: List[int] = []
+        # черга фонового запису; accepted/done — лічильники цього процесу (done — закомічені або
+        # відкинуті); квитки груп, що не дійшли до диска, — діапазони [first, last]
+        self._cond = threading.Condition()
+        self._pending: List[dict] = []
+        self._accepted = 0
+        self._done = 0
+        self._failed_first: List[int] = []
+        self._failed_last: List[int] = []
+        self._closed = False
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                self._catch_up()
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._thread = threading.Thread(target=self._run, name="journal", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        return self._accepted - self._done
+
+    def append(self, entry: dict) -> int:
+        """
+        Ставить запис у чергу й одразу повертається; повертає квиток для wait().
+        entry — {"ts", "actor", "endpoint", "client", "action", "extra", "params", "devices", "rows",
+        "before", "after", "sparse"}: before/after — колонки {поле: масив} для пристроїв devices[rows]
+        (див. DeviceManager.journaled); id і різниця рахуються вже у фоновому потоці.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Журнал закрито")
+            self._pending.append(entry)
+            self._accepted += 1
+            self._cond.notify()
+            return self._accepted
+
+    def wait(self, ticket: int, timeout: Optional[float] = None) -> bool:
+        """
+        Чекає, доки групу з записом ticket не буде закомічено (fsync). True — запис на диску;
+        False — час вийшов або групу відкинуто через помилку диска (див. stats["errors"]).
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._done >= ticket, timeout):
+                return False
+            i = bisect_right(self._failed_first, ticket) - 1
+            return i < 0 or ticket > self._failed_last[i]
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        os.close(self._fd)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+            if self.commit_delay:
+                time.sleep(self.commit_delay)
+            with self._cond:
+                batch, self._pending = self._pending, []
+            t0 = time.perf_counter()
+            failed = False
+            try:
+                self._commit(batch)
+            except Exception:
+                # диск недоступний: записи цієї групи втрачено, журнал продовжує працювати
+                self.stats["errors"] += 1
+                failed = True
+            elapsed = time.perf_counter() - t0
+            self.stats["commits"] += 1
+            self.stats["records"] += len(batch)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            if self.observer is not None:
+                self.observer(len(batch), elapsed)
+            with self._cond:
+                if failed:
+                    self._failed_first.append(self._done + 1)
+                    self._failed_last.append(self._done + len(batch))
+                self._done += len(batch)
+                self._cond.notify_all()
+
+    def _commit(self, batch: List[dict]):
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                # спершу — записи інших процесів, щоб продовжити їхні seq і ts
+                self._catch_up()
+                seq, last_ts = self.seq, self._last_ts
+                lines = []
+                for entry in batch:
+                    seq += 1
+                    last_ts = max(last_ts, entry["ts"])
+                    lines.append((_encode(entry, seq, last_ts), last_ts))
+                try:
+                    view = memoryview(b"".join(line for line, _ in lines))
+                    while view:
+                        view = view[os.write(self._fd, view):]
+                    if self.fsync:
+                        os.fsync(self._fd)
+                except OSError:
+                    # група або вся, або ніяка: недописаний хвіст прибираємо
+                    os.ftruncate(self._fd, self._size)
+                    raise
+                self.seq, self._last_ts = seq, last_ts
+                offset = self._size
+                for line, ts in lines:
+                    self._index(ts, offset)
+                    offset += len(line)
+                self._size = offset
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _index(self, ts: float, offset: int):
+        # під self._lock: ще один запис за зсувом offset; кожен INDEX_EVERY-й — точка індексу
+        if self._count % INDEX_EVERY == 0:
+            self._index_ts.append(ts)
+            self._index_off.append(offset)
+        self._count += 1
+
+    def _catch_up(self, exclusive: bool = True):
+        # під self._lock і flock: індексує рядки, дописані після відомого нам розміру
+        end = os.fstat(self._fd).st_size
+        offset = self._size
+        tail = b""
+        last = None
+        while offset + len(tail) < end:
+            chunk = os.pread(self._fd, min(1 << 20, end - offset - len(tail)), offset + len(tail))
+            if not chunk:
+                break
+            data = tail + chunk
+            pos = 0
+            while True:
+                newline = data.find(b"\n", pos)
+                if newline < 0:
+                    break
+                line = data[pos:newline]
+                # ts розбираємо лише для точок індексу
+                self._index(loads(line)["ts"] if self._count % INDEX_EVERY == 0 else 0.0, offset + pos)
+                last = line
+                pos = newline + 1
+            offset += pos
+            tail = data[pos:]
+        self._size = offset
+        if last is not None:
+            record = loads(last)
+            self.seq = record["seq"]
+            self._last_ts = max(self._last_ts, record["ts"])
+        if tail and exclusive:
+            # недописаний рядок у кінці — слід процесу, що впав посеред write
+            os.ftruncate(self._fd, offset)
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None, after: int = 0,
+              limit: int = 1000, device: Optional[str] = None, action: Optional[str] = None) -> List[dict]:
+        """
+        Записи з ts у [start, end] і seq > after (пагінація), найстаріші першими, не більше limit.
+        Читання починається з точки розрідженого індексу перед start.
+        """
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_SH)
+            try:
+                self._catch_up(exclusive=False)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            size = self._size
+            i = bisect_left(self._index_ts, start) - 1 if start is not None else -1
+            offset = self._index_off[i] if i >= 0 else 0
+        records = []
+        tail = b""
+        while offset < size and len(records) < limit:
+            chunk = os.pread(self._fd, min(1 << 20, size - offset), offset)
+            if not chunk:
+                break
+            offset += len(chunk)
+            lines = (tail + chunk).split(b"\n")
+            tail = lines.pop()
+            for line in lines:
+                record = loads(line)
+                if start is not None and record["ts"] < start or record["seq"] <= after:
+                    continue
+                if end is not None and record["ts"] > end:
+                    return records
+                if action is not None and record["action"] != action:
+                    continue
+                if device is not None and not any(d["id"] == device for d in record["devices"]):
+                    continue
+                records.append(record)
+                if len(records) >= limit:
+                    return records
+        return records
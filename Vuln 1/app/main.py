@@ -1,28 +1,213 @@
 import os
-import time
 import json
-from fastapi import FastAPI, Request, Header, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
+import asyncio
+from contextlib import asynccontextmanager
+from functools import partial
+from fastapi import FastAPI, Request, Response, Header, HTTPException, Query
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+from commands import CommandQueue, QueueFull
 from devices import DeviceManager
+from grid import TRIP_THRESHOLD
+from history import DOWNSAMPLERS, downsample
+from ingest import IngestError, decoder_for
+from journal import Journal, OriginMiddleware, set_actor
+from rules import Rule
+from metrics import (CONTENT_TYPE, LOCK_BUCKETS, REGISTRY, CallbackMetric, Counter, Histogram, MetricsMiddleware,
+                     lock_observer)
+from scheduler import TickScheduler
+from shared import SharedDeviceManager
+from snapshot import SnapshotWriter
+from timeline import TimelinePlayer
 
 APP_ENV = os.getenv("APP_ENV", "development")
 API_TOKEN = os.getenv("API_TOKEN", "changeme_local_token_please_change")
 SIMULATION_MODE = os.getenv("SIMULATION_MODE", "1") == "1"
 WEAK_LEGACY_KEY = os.getenv("WEAK_LEGACY_KEY", "weak-legacy-key-for-lab")
 ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "super_secret_admin_token_123")
-
-app = FastAPI(title="Оперативний Центр Енергетики та Транспорту - Симуляція", docs_url=None, redoc_url=None, openapi_url=None)
+STREAM_KEEPALIVE = float(os.getenv("STREAM_KEEPALIVE", "15"))
+# скільки тіків пульсу зберігати в історії кожного пристрою (900 × 2 с = 30 хв)
+HISTORY_RETENTION = int(os.getenv("HISTORY_RETENTION", "900"))
+# стеля пам'яті історії: при великому флоті retention автоматично зменшується
+HISTORY_MAX_MB = int(os.getenv("HISTORY_MAX_MB", "256"))
+HISTORY_MAX_POINTS = 2000
+# базовий період телеметрії (с) та окремі частоти для видів пристроїв (Гц), напр. "transport=10,defense=10"
+TELEMETRY_PERIOD = float(os.getenv("TELEMETRY_PERIOD", "2.0"))
+TELEMETRY_TICK_RATES = {
+    kind.strip(): float(hz)
+    for kind, hz in (item.split("=", 1) for item in os.getenv("TELEMETRY_TICK_RATES", "").split(",") if "=" in item)
+}
+# skip | catch_up — що робити з тіками, пропущеними через перевищення дедлайну
+TELEMETRY_TICK_POLICY = os.getenv("TELEMETRY_TICK_POLICY", "skip")
+# спільний флот для кількох воркерів uvicorn: файл сегмента (напр. /dev/shm/hmi-devices);
+# порожньо — флот у пам'яті процесу
+DEVICE_STATE_PATH = os.getenv("DEVICE_STATE_PATH", "")
+# ємність сегмента (пристроїв) — фіксується при його створенні
+DEVICE_STATE_CAPACITY = int(os.getenv("DEVICE_STATE_CAPACITY", "16384"))
+# як часто воркер перевіряє, чи не змінив флот інший процес (для SSE-клієнтів), с
+DEVICE_STATE_POLL = float(os.getenv("DEVICE_STATE_POLL", "0.25"))
+# знімок флоту для теплого перезапуску (порожньо — вимкнено) і як часто його оновлювати, с
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "")
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "30"))
+# скільки секунд після польового зразка (/api/telemetry/ingest) симуляція не чіпає пристрій
+INGEST_FIELD_HOLD = float(os.getenv("INGEST_FIELD_HOLD", "30"))
+# рядків NDJSON в одному пакеті інгесту за замовчуванням
+INGEST_BATCH = int(os.getenv("INGEST_BATCH", "5000"))
+# JSON-файл зі списком правил статусів/алертів (порожньо — статуси перемикаються випадково, як раніше)
+RULES_PATH = os.getenv("RULES_PATH", "")
+# seed генератора симуляції (порожньо — випадковий, як раніше)
+SIMULATION_SEED = int(os.getenv("SIMULATION_SEED")) if os.getenv("SIMULATION_SEED") else None
+# таймлайн, записаний `python timeline.py --out ...`, відтворюється замість симуляції (порожньо — вимкнено);
+# REPLAY_SPEED — у скільки разів швидше за записаний темп
+REPLAY_PATH = os.getenv("REPLAY_PATH", "")
+REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", "1.0"))
+# журнал команд операторів і адмінів (NDJSON, лише дописування; порожньо — вимкнено);
+# JOURNAL_FSYNC=0 — без fsync, JOURNAL_COMMIT_DELAY — очікування перед груповим комітом, с
+JOURNAL_PATH = os.getenv("JOURNAL_PATH", "")
+JOURNAL_FSYNC = os.getenv("JOURNAL_FSYNC", "1") == "1"
+JOURNAL_COMMIT_DELAY = float(os.getenv("JOURNAL_COMMIT_DELAY", "0"))
+# черга команд керування: скільки різних команд може чекати (далі — 429), скільки застосовується
+# за одне захоплення блокування, і скільки ендпоінт чекає на застосування, перш ніж відповісти 202, с
+COMMAND_QUEUE_BOUND = int(os.getenv("COMMAND_QUEUE_BOUND", "1000"))
+COMMAND_BATCH = int(os.getenv("COMMAND_BATCH", "256"))
+COMMAND_WAIT = float(os.getenv("COMMAND_WAIT", "1.0"))
+
+@asynccontextmanager
+async def lifespan(app):
+    # тіки телеметрії живуть на event loop застосунку і зупиняються разом з ним
+    await scheduler.start()
+    try:
+        yield
+    finally:
+        await scheduler.stop()
+        # команди, що вже в черзі, застосовуються до знімка і журналу
+        await asyncio.to_thread(commands.close)
+        if snapshots is not None:
+            # останній знімок — щоб --reload і перезапуск нічого не втратили
+            await asyncio.to_thread(write_snapshot)
+        if journal is not None:
+            # дописує чергу і закриває файл
+            await asyncio.to_thread(journal.close)
+
+app = FastAPI(title="Оперативний Центр Енергетики та Транспорту - Симуляція", docs_url=None, redoc_url=None, openapi_url=None, lifespan=lifespan)
 
 templates = Jinja2Templates(directory="templates")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# in-memory manager
-devices = DeviceManager()
-devices.seed_sample()
+if DEVICE_STATE_PATH:
+    # флот у спільній пам'яті; тіки веде лише один воркер
+    devices = SharedDeviceManager(DEVICE_STATE_PATH, capacity=DEVICE_STATE_CAPACITY,
+                                  history_retention=HISTORY_RETENTION, history_max_bytes=HISTORY_MAX_MB * 1024 * 1024,
+                                  seed=SIMULATION_SEED)
+else:
+    # in-memory manager
+    devices = DeviceManager(history_retention=HISTORY_RETENTION, history_max_bytes=HISTORY_MAX_MB * 1024 * 1024,
+                            seed=SIMULATION_SEED)
+
+devices.field_hold = INGEST_FIELD_HOLD
+journal = Journal(JOURNAL_PATH, fsync=JOURNAL_FSYNC, commit_delay=JOURNAL_COMMIT_DELAY) if JOURNAL_PATH else None
+devices.journal = journal
+commands = CommandQueue(devices, bound=COMMAND_QUEUE_BOUND, batch=COMMAND_BATCH)
+
+def load_rules(path: str) -> List[Rule]:
+    with open(path, encoding="utf-8") as f:
+        return [Rule.from_dict(item) for item in json.load(f)]
+
+# до відновлення знімка: відновлений стан правил підхоплюється з поточних значень
+if RULES_PATH:
+    devices.set_rules(load_rules(RULES_PATH))
+
+snapshots = SnapshotWriter(devices, SNAPSHOT_PATH) if SNAPSHOT_PATH and not REPLAY_PATH else None
+replay = TimelinePlayer(devices, REPLAY_PATH) if REPLAY_PATH else None
+if replay is not None:
+    replay.start()
+elif snapshots is None or snapshots.restore() is None:
+    devices.seed_sample()
+
+def write_snapshot():
+    # у спільному режимі знімок пише лише лідер
+    if isinstance(devices, SharedDeviceManager) and not devices.lease.acquire():
+        return
+    snapshots.write()
+
+def build_scheduler() -> TickScheduler:
+    sched = TickScheduler()
+    if replay is not None:
+        # кадри таймлайну замість тіків телеметрії
+        sched.add("replay", replay.period / REPLAY_SPEED, replay.step, policy=TELEMETRY_TICK_POLICY)
+        if isinstance(devices, SharedDeviceManager):
+            sched.add("shared-poll", DEVICE_STATE_POLL, devices.poll)
+        return sched
+    # базовий тік — усі види, крім тих, що мають власну частоту
+    sched.add("telemetry", TELEMETRY_PERIOD,
+              partial(devices.telemetry_tick, exclude_kinds=TELEMETRY_TICK_RATES.keys(), dt=TELEMETRY_PERIOD),
+              policy=TELEMETRY_TICK_POLICY)
+    for kind, hz in TELEMETRY_TICK_RATES.items():
+        sched.add(f"telemetry:{kind}", 1.0 / hz,
+                  partial(devices.telemetry_tick, kinds=[kind], dt=1.0 / hz),
+                  policy=TELEMETRY_TICK_POLICY)
+    if isinstance(devices, SharedDeviceManager):
+        sched.add("shared-poll", DEVICE_STATE_POLL, devices.poll)
+    if snapshots is not None:
+        # запис знімка з fsync — у власному потоці, щоб не спричиняти перевищень тіку телеметрії
+        sched.add("snapshot", SNAPSHOT_INTERVAL, write_snapshot, own_thread=True)
+    return sched
+
+scheduler = build_scheduler()
+
+# Метрики /metrics: спостереження дешеві (кошик + інкремент), агрегація — лише під час scrape.
+# У режимі кількох воркерів кожен процес віддає власні лічильники.
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "hmi_http_request_duration_seconds", "Час обробки запиту до заголовків відповіді",
+    ("method", "route", "status")))
+LOCK_WAIT = REGISTRY.register(Histogram(
+    "hmi_device_lock_wait_seconds", "Очікування блокування DeviceManager.lock", ("mode",), LOCK_BUCKETS))
+LOCK_HOLD = REGISTRY.register(Histogram(
+    "hmi_device_lock_hold_seconds", "Утримання блокування DeviceManager.lock", ("mode",), LOCK_BUCKETS))
+TICK_DURATION = REGISTRY.register(Histogram(
+    "hmi_tick_duration_seconds", "Тривалість тіку планувальника", ("job",)))
+devices.lock.observer = lock_observer(LOCK_WAIT, LOCK_HOLD)
+scheduler.observer = lambda job, seconds: TICK_DURATION.observe(seconds, job)
+
+def _tick_counter(field: str):
+    return lambda: {(job.name,): getattr(job.stats, field) for job in scheduler.jobs}
+
+REGISTRY.register(CallbackMetric("hmi_tick_overruns_total", "Тіки, що перевищили дедлайн", "counter",
+                                 ("job",), _tick_counter("overruns")))
+REGISTRY.register(CallbackMetric("hmi_tick_skipped_total", "Пропущені тіки", "counter",
+                                 ("job",), _tick_counter("skipped")))
+REGISTRY.register(CallbackMetric("hmi_tick_errors_total", "Тіки, що завершилися помилкою", "counter",
+                                 ("job",), _tick_counter("errors")))
+INGEST_SAMPLES = REGISTRY.register(Counter(
+    "hmi_ingest_samples_total", "Польові зразки телеметрії за результатом", ("result",)))
+REGISTRY.register(CallbackMetric("hmi_rule_alerts_total", "Переходи правил за станом", "counter",
+                                 ("state",), lambda: {(state,): devices.rules.stats[state]
+                                                      for state in ("firing", "resolved")}))
+REGISTRY.register(CallbackMetric("hmi_devices", "Пристроїв у флоті", "gauge",
+                                 (), lambda: {(): len(devices.devices)}))
+REGISTRY.register(CallbackMetric("hmi_fleet_version", "Версія стану флоту", "gauge",
+                                 (), lambda: {(): devices.version}))
+if journal is not None:
+    JOURNAL_COMMIT = REGISTRY.register(Histogram(
+        "hmi_journal_commit_seconds", "Груповий коміт журналу: write + fsync", (), LOCK_BUCKETS))
+    JOURNAL_RECORDS = REGISTRY.register(Counter("hmi_journal_records_total", "Записи журналу команд"))
+
+    def _journal_observer(records: int, seconds: float):
+        JOURNAL_COMMIT.observe(seconds)
+        JOURNAL_RECORDS.inc(amount=records)
+    journal.observer = _journal_observer
+    REGISTRY.register(CallbackMetric("hmi_journal_pending", "Записи журналу, що чекають на коміт", "gauge",
+                                     (), lambda: {(): journal.pending}))
+REGISTRY.register(CallbackMetric("hmi_command_queue_depth", "Команди керування, що чекають у черзі", "gauge",
+                                 (), lambda: {(): commands.depth}))
+REGISTRY.register(CallbackMetric("hmi_commands_total", "Команди керування за результатом", "counter",
+                                 ("result",), lambda: {(result,): commands.stats[result]
+                                                       for result in ("applied", "failed", "coalesced", "rejected")}))
+app.add_middleware(MetricsMiddleware, histogram=REQUEST_LATENCY)
+app.add_middleware(OriginMiddleware)
 
 # Pydantic models (приймаємо JSON щоб не вимагати python-multipart)
 class CommandIn(BaseModel):
@@ -45,6 +230,27 @@ class VoltageAdjustIn(BaseModel):
     device_id: str
     voltage: int
 
+class BulkCommandIn(BaseModel):
+    action: str  # restart | isolate | compromise | shutdown | set_power | set_voltage
+    value: Optional[int] = None
+    # селектор: умови поєднуються через AND; all=True — явно весь флот
+    ids: Optional[List[str]] = None
+    kind: Optional[str] = None
+    status: Optional[str] = None
+    location: Optional[str] = None
+    min_load: Optional[float] = None
+    max_load: Optional[float] = None
+    all: bool = False
+
+class CascadeIn(BaseModel):
+    trip: List[str] = []
+    add_load: Dict[str, float] = {}
+    apply: bool = False
+    threshold: float = TRIP_THRESHOLD
+
+class GridLinksIn(BaseModel):
+    links: List[Tuple[str, str]]
+
 class AdminControlIn(BaseModel):
     command: str
     admin_token: str
@@ -61,6 +267,7 @@ def check_token(auth: Optional[str]):
     token = parts[1]
     if token != API_TOKEN:
         raise HTTPException(status_code=403, detail="Невірний токен")
+    set_actor("operator")
     return True
 
 def read_flag():
@@ -78,21 +285,121 @@ def mark_system_compromised():
 @app.get("/", response_class=HTMLResponse)
 def index(request: Request):
     devices_data = devices.list_devices()
-    devices_json = json.dumps(devices_data)
+    # {"version", "devices"} з кешу закодованих пристроїв — без повторного json.dumps
+    _, devices_json = devices.devices_json()
     flag = read_flag() if hasattr(devices, 'system_compromised') and devices.system_compromised else None
     return templates.TemplateResponse("index.html", {
         "request": request,
         "devices": devices_data,
-        "devices_json": devices_json,
+        "devices_json": devices_json.decode("utf-8"),
         "simulate_allowed": SIMULATION_MODE,
         "api_token": API_TOKEN,
         "system_compromised": hasattr(devices, 'system_compromised') and devices.system_compromised,
         "flag": flag,
     })
 
+def version_etag(version: int) -> str:
+    return f'"v{version}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or ("W/" + etag) in tags
+
 @app.get("/api/devices")
-def api_devices():
-    return JSONResponse(content={"devices": devices.list_devices()})
+def api_devices(since: Optional[int] = None, kind: Optional[str] = None, status: Optional[str] = None,
+                location: Optional[str] = None, limit: Optional[int] = Query(None, ge=0),
+                offset: int = Query(0, ge=0), if_none_match: Optional[str] = Header(None)):
+    """
+    Повний список пристроїв або, з ?since=<version>, лише змінені після цієї версії
+    та видалені (deleted). kind/status/location/limit/offset — відфільтрована сторінка
+    з total до пагінації. ETag — поточна версія менеджера; If-None-Match дає 304.
+    """
+    filtered = kind is not None or status is not None or location is not None or limit is not None or offset
+    if filtered and since is not None:
+        raise HTTPException(status_code=400, detail="since не поєднується з фільтрами")
+    etag = version_etag(devices.version)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    if filtered:
+        try:
+            version, _, payload = devices.query_json(kind=kind, status=status, location=location,
+                                                     limit=limit, offset=offset)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    elif since is None:
+        version, payload = devices.devices_json()
+    else:
+        version, _, _, payload = devices.changes_json(since)
+    # payload вже закодований — віддаємо байти як є
+    return Response(content=payload, media_type="application/json", headers={"ETag": version_etag(version)})
+
+@app.get("/api/devices/summary")
+def api_devices_summary():
+    """Кількість пристроїв за статусом, видом і локацією — без передачі списку."""
+    return devices.summary()
+
+@app.get("/api/devices/{device_id}/history")
+def api_device_history(device_id: str, start: Optional[float] = None, end: Optional[float] = None,
+                       points: int = 300, method: str = "lttb"):
+    """
+    Історія телеметрії пристрою за [start, end] (unix-час), проріджена на сервері
+    до ~points точок на метрику (lttb або minmax).
+    """
+    if method not in DOWNSAMPLERS:
+        raise HTTPException(status_code=400, detail=f"Невідомий метод {method}")
+    points = max(1, min(points, HISTORY_MAX_POINTS))
+    history = devices.history_of(device_id, start, end)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Пристрій не знайдено")
+    ts, values = history
+    return {
+        "id": device_id,
+        "samples": int(ts.size),
+        "method": method,
+        "series": downsample(ts, values, points, method),
+    }
+
+def sse_event(event: bytes, payload: bytes) -> bytes:
+    return b"event: " + event + b"\ndata: " + payload + b"\n\n"
+
+@app.get("/api/devices/stream")
+async def api_devices_stream():
+    """
+    Server-Sent Events: спершу весь флот (snapshot), далі лише пристрої,
+    змінені після попереднього повідомлення (devices) — після кожного пульсу або команди.
+    """
+    loop = asyncio.get_running_loop()
+    wakeup = asyncio.Event()
+
+    def wake():
+        loop.call_soon_threadsafe(wakeup.set)
+
+    async def events():
+        devices.feed.add_waiter(wake)
+        try:
+            # кодування великого флоту — у пулі потоків, щоб не блокувати event loop
+            version, payload = await asyncio.to_thread(devices.devices_json)
+            yield sse_event(b"snapshot", payload)
+            # розрив з'єднання скасовує генератор (StreamingResponse слухає disconnect)
+            while True:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                wakeup.clear()
+                since = version
+                version, full, has_changes, payload = await asyncio.to_thread(devices.changes_json, since)
+                if full:
+                    yield sse_event(b"snapshot", payload)
+                elif has_changes:
+                    yield sse_event(b"devices", payload)
+        finally:
+            devices.feed.remove_waiter(wake)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @app.get("/api/validate_token")
 def api_validate_token(authorization: Optional[str] = Header(None)):
@@ -100,18 +407,137 @@ def api_validate_token(authorization: Optional[str] = Header(None)):
     check_token(authorization)
     return {"status": "ok", "message": "token valid"}
 
+def enqueue(action: str, device_id: Optional[str] = None, value=None, fn=None):
+    try:
+        return commands.submit(action, device_id, value, fn)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+
+def queued(command_id: str, **body):
+    # команду не застосовано за COMMAND_WAIT: вона в черзі, стан — за посиланням poll
+    return JSONResponse({"status": "queued", "command_id": command_id, "poll": f"/api/commands/{command_id}", **body},
+                        status_code=202)
+
 @app.post("/api/command")
-def api_command(payload: CommandIn, authorization: Optional[str] = Header(None)):
+async def api_command(payload: CommandIn, authorization: Optional[str] = Header(None)):
     check_token(authorization)
     action = payload.action
     target = payload.target
-    if action == "restart":
-        devices.restart_device(target)
-        return {"status": "ok", "message": f"Пристрій {target} перезапущено (симуляція)."}
-    if action == "isolate":
-        devices.isolate_device(target)
-        return {"status": "ok", "message": f"Пристрій {target} ізольовано (симуляція)."}
-    return {"status": "error", "message": f"Невідома дія {action}"}
+    done = {"restart": "перезапущено", "isolate": "ізольовано"}
+    if action not in done:
+        return {"status": "error", "message": f"Невідома дія {action}"}
+    command_id, cmd = enqueue(action, target)
+    if not await commands.wait_async(cmd, COMMAND_WAIT):
+        return queued(command_id)
+    return {"status": "ok", "message": f"Пристрій {target} {done[action]} (симуляція).", "command_id": command_id}
+
+@app.get("/api/commands/{command_id}")
+def api_command_status(command_id: str, authorization: Optional[str] = Header(None)):
+    """Стан команди з черги: queued | done | failed; id повторних команд, злитих з нею, ведуть сюди ж."""
+    check_token(authorization)
+    cmd = commands.get(command_id)
+    if cmd is None:
+        raise HTTPException(status_code=404, detail="Команду не знайдено")
+    return cmd.to_dict()
+
+@app.post("/api/bulk_command")
+def api_bulk_command(payload: BulkCommandIn, authorization: Optional[str] = Header(None)):
+    check_token(authorization)
+    selector = payload.dict(include={"ids", "kind", "status", "location", "min_load", "max_load"})
+    if not payload.all and all(v is None for v in selector.values()):
+        raise HTTPException(status_code=400, detail="Потрібен селектор (ids, kind, status, location, min_load, max_load) або all=true")
+    try:
+        results = devices.bulk_command(payload.action, value=payload.value, **selector)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    applied = sum(1 for r in results if r["ok"])
+    return {"status": "ok", "message": f"Дію {payload.action} застосовано до {applied} пристроїв (симуляція).", "results": results}
+
+@app.post("/api/telemetry/ingest")
+async def api_telemetry_ingest(request: Request, batch: int = Query(INGEST_BATCH, ge=1, le=100000),
+                               authorization: Optional[str] = Header(None)):
+    """
+    Польова телеметрія від шлюзів: потік NDJSON (batch рядків на пакет) або бінарних кадрів
+    (application/x-hmi-telemetry, кадр — пакет; формат — ingest.py). Тіло читається потоком,
+    кожен пакет застосовується за одне захоплення блокування; у відповіді — підтвердження по пакетах.
+    """
+    check_token(authorization)
+    try:
+        decoder = decoder_for(request.headers.get("content-type"), batch)
+    except IngestError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    acks = []
+
+    def apply(batches):
+        # у потоці: розбір і застосування не блокують event loop
+        for b in batches:
+            ack = devices.ingest(b)
+            ack["batch"] = len(acks)
+            acks.append(ack)
+            INGEST_SAMPLES.inc("accepted", amount=ack["accepted"])
+            INGEST_SAMPLES.inc("rejected", amount=ack["rejected"])
+
+    error = None
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                await asyncio.to_thread(lambda: apply(decoder.feed(chunk)))
+        await asyncio.to_thread(lambda: apply(decoder.close()))
+    except ValueError as e:
+        # пакети до помилки вже застосовані — шлюз бачить їх у batches
+        error = str(e)
+    result = {
+        "status": "error" if error else "ok",
+        "version": acks[-1]["version"] if acks else devices.version,
+        "received": sum(a["received"] for a in acks),
+        "accepted": sum(a["accepted"] for a in acks),
+        "rejected": sum(a["rejected"] for a in acks),
+        "batches": acks,
+    }
+    if error:
+        result["message"] = error
+        return JSONResponse(result, status_code=400)
+    return result
+
+class RulesIn(BaseModel):
+    rules: List[dict]
+
+@app.get("/api/rules")
+def api_rules():
+    """Поточні правила, кількість активних спрацювань і статистика останнього оцінювання."""
+    return devices.rules_state()
+
+@app.put("/api/rules")
+def api_rules_replace(payload: RulesIn, authorization: Optional[str] = Header(None)):
+    check_token(authorization)
+    if isinstance(devices, SharedDeviceManager):
+        # правила оцінює лідер; у спільному режимі вони однакові для всіх воркерів лише з RULES_PATH
+        raise HTTPException(status_code=409, detail="У режимі кількох воркерів правила задаються через RULES_PATH")
+    try:
+        devices.set_rules([Rule.from_dict(item) for item in payload.rules])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "ok", "rules": len(payload.rules)}
+
+@app.get("/api/alerts")
+def api_alerts(since: int = 0, limit: int = Query(1000, ge=1, le=10000)):
+    """Події правил (firing / resolved) після seq=since. У режимі кількох воркерів — лише в лідера."""
+    seq, events = devices.alerts_since(since, limit)
+    return {"seq": seq, "events": events}
+
+@app.get("/api/journal")
+def api_journal(start: Optional[float] = None, end: Optional[float] = None, after: int = 0,
+                limit: int = Query(1000, ge=1, le=10000), device: Optional[str] = None,
+                action: Optional[str] = None, authorization: Optional[str] = Header(None)):
+    """
+    Журнал команд за час [start, end] (unix-секунди), найстаріші першими.
+    next — seq для наступної сторінки (after=next) або null, якщо записів більше немає.
+    """
+    check_token(authorization)
+    if journal is None:
+        raise HTTPException(status_code=404, detail="Журнал вимкнено (JOURNAL_PATH)")
+    records = journal.query(start, end, after, limit, device, action)
+    return {"records": records, "next": records[-1]["seq"] if len(records) == limit else None}
 
 @app.post("/api/simulate")
 def api_simulate(payload: SimIn, authorization: Optional[str] = Header(None)):
@@ -130,19 +556,49 @@ def api_simulate(payload: SimIn, authorization: Optional[str] = Header(None)):
         return {"status": "ok", "message": "Симуляція: транспортний дедлок застосований (in-memory)."}
     return {"status": "error", "message": "Невідомий сценарій"}
 
+@app.get("/api/grid")
+def api_grid():
+    return {"nodes": len(devices.devices), "links": devices.grid.edge_count()}
+
+@app.post("/api/grid/links")
+def api_grid_links(payload: GridLinksIn, authorization: Optional[str] = Header(None)):
+    check_token(authorization)
+    with devices.lock, devices.journaled("grid_links", [], links=payload.links):
+        devices.grid.add_links(payload.links)
+    return {"status": "ok", "links": devices.grid.edge_count()}
+
+@app.post("/api/grid/cascade")
+def api_grid_cascade(payload: CascadeIn, authorization: Optional[str] = Header(None)):
+    """What-if каскад по топології; apply=true застосовує результат до флоту."""
+    check_token(authorization)
+    if payload.apply and not SIMULATION_MODE:
+        raise HTTPException(status_code=403, detail="Симуляції відключені")
+    result = devices.run_cascade(trip=payload.trip, add_load=payload.add_load,
+                                 apply=payload.apply, threshold=payload.threshold)
+    return {"status": "ok", **result}
+
 # Нові ендпоінти для управління
 @app.post("/api/adjust_power")
-def api_adjust_power(payload: PowerAdjustIn, authorization: Optional[str] = Header(None)):
+async def api_adjust_power(payload: PowerAdjustIn, authorization: Optional[str] = Header(None)):
     check_token(authorization)
-    if devices.adjust_power(payload.device_id, payload.power_level):
-        return {"status": "ok", "message": f"Потужність {payload.device_id} змінена на {payload.power_level}%"}
+    # повторні запити до того ж пристрою, поки команда в черзі, зливаються — застосується останнє значення
+    command_id, cmd = enqueue("set_power", payload.device_id, payload.power_level)
+    if not await commands.wait_async(cmd, COMMAND_WAIT):
+        return queued(command_id)
+    if cmd.ok:
+        return {"status": "ok", "message": f"Потужність {payload.device_id} змінена на {cmd.value}%",
+                "command_id": command_id}
     return {"status": "error", "message": "Помилка регулювання потужності"}
 
 @app.post("/api/adjust_voltage")
-def api_adjust_voltage(payload: VoltageAdjustIn, authorization: Optional[str] = Header(None)):
+async def api_adjust_voltage(payload: VoltageAdjustIn, authorization: Optional[str] = Header(None)):
     check_token(authorization)
-    if devices.adjust_voltage(payload.device_id, payload.voltage):
-        return {"status": "ok", "message": f"Напруга {payload.device_id} змінена на {payload.voltage}%"}
+    command_id, cmd = enqueue("set_voltage", payload.device_id, payload.voltage)
+    if not await commands.wait_async(cmd, COMMAND_WAIT):
+        return queued(command_id)
+    if cmd.ok:
+        return {"status": "ok", "message": f"Напруга {payload.device_id} змінена на {cmd.value}%",
+                "command_id": command_id}
     return {"status": "error", "message": "Помилка регулювання напруги"}
 
 # Вразливий ендпоінт - НЕМАЄ авторизації спеціально (залишено як задумка)
@@ -169,8 +625,7 @@ def admin_control(cmd: str = Query(...)):
             "compromised": True
         }
     if cmd == "compromise_all":
-        for device_id in devices.devices.keys():
-            devices.mark_compromised(device_id, note="Масовий напад через вразливий ендпоінт")
+        devices.bulk_command("compromise", note="Масовий напад через вразливий ендпоінт")
         return {
             "status": "ok",
             "message": "Всі пристрої скомпрометовані!",
@@ -191,72 +646,62 @@ def api_admin_validate(payload: AdminValidateIn):
         return {"status": "ok", "message": "admin token valid"}
     raise HTTPException(status_code=403, detail="Invalid admin token")
 
+# Більш реалістичні ефекти команд: явна зміна статусів та метаданих пристроїв.
+# Виконуються потоком черги команд (commands.py), кожна — над усім флотом
+# одним колонковим оновленням bulk_command (без селектора — весь флот).
+def admin_shutdown():
+    stamp = devices.clock.ctime()
+    # нотатка до основної генерації, якщо є; зміну покриє сповіщення bulk_command нижче
+    with devices.lock:
+        pp = devices.devices.get("pp-1")
+        if pp is not None:
+            pp.extra["cascade_note"] = "Emergency shutdown applied " + stamp
+    # критичне відключення — пристрої переходять в OFFLINE, генерація значно падає
+    devices.bulk_command("shutdown", note=f"Екстрене відключення виконано {stamp}")
+    return {"status": "ok", "message": "Енергосистема відключена! Більшість пристроїв переведені в OFFLINE."}
+
+def admin_isolate():
+    target = "ss-1"
+    if devices.get(target) is None:
+        return {"status": "error", "message": f"Пристрій {target} не знайдено."}
+    # навантаження ізольованої підстанції переходить на сусідів за топологією мережі
+    result = devices.run_cascade(trip=[target], apply=True)
+    with devices.lock, devices.journaled("admin_isolate_notes", [], target=target, affected=result["affected"]):
+        d = devices.devices.get(target)
+        if d:
+            d.extra["isolate_note"] = f"Ізольовано оператором {devices.clock.ctime()}"
+        for device_id in result["affected"]:
+            other = devices.devices.get(device_id)
+            if other and device_id != target:
+                other.extra["isolate_impact"] = f"Навантаження збільшена через ізоляцію {target}"
+    devices.notify_changed(result["affected"])
+    return {"status": "ok", "message": f"Підстанція {target} ізольована та переведена в OFFLINE."}
+
+def admin_compromise_all():
+    devices.bulk_command("compromise", note=f"Масовий компроміс зафіксовано {devices.clock.ctime()}")
+    return {"status": "ok", "message": "Всі пристрої позначені як КОМПРОМІС (симуляція)."}
+
+ADMIN_COMMANDS = {"shutdown": admin_shutdown, "isolate": admin_isolate, "compromise_all": admin_compromise_all}
+
 # POST версія control — вимагає admin_token в тілі
 @app.post("/api/management/control")
-def api_admin_control(payload: AdminControlIn):
+async def api_admin_control(payload: AdminControlIn):
     if payload.admin_token != ADMIN_TOKEN:
         raise HTTPException(status_code=403, detail="Invalid admin token")
+    set_actor("admin")
     cmd = payload.command
     flag = mark_system_compromised()
-
-    # Більш реалістичні ефекти команд: явна зміна статусів та метаданих пристроїв
-    if cmd == "shutdown":
-        with devices.lock:
-            for d in devices.devices.values():
-                # критичне відключення — більшість пристроїв переходять в OFFLINE,
-                # деякі деградують, генерація значно падає
-                d.status = "OFFLINE"
-                d.extra["shutdown_note"] = f"Екстрене відключення виконано {time.ctime()}"
-                d.load = max(0.0, d.load - 30.0)
-                d.last_seen = time.time()
-            # додамо нотатку до основної генерації, якщо є
-            if "pp-1" in devices.devices:
-                devices.devices["pp-1"].extra["cascade_note"] = "Emergency shutdown applied " + time.ctime()
-        return {
-            "status": "ok",
-            "message": "Енергосистема відключена! Більшість пристроїв переведені в OFFLINE.",
-            "alert": "СИСТЕМА ВЗЛОМАНА\nВАШ ФЛАГ: " + flag,
-            "compromised": True
-        }
-
-    if cmd == "isolate":
-        target = "ss-1"
-        with devices.lock:
-            d = devices.devices.get(target)
-            if d:
-                d.status = "OFFLINE"
-                d.extra["isolate_note"] = f"Ізольовано оператором {time.ctime()}"
-                d.last_seen = time.time()
-                # вплив на пов'язані пристрої: якщо є генератор — навантаження зростає там
-                if "pp-1" in devices.devices:
-                    pp = devices.devices["pp-1"]
-                    pp.load = min(120.0, pp.load + 15.0)
-                    pp.extra["isolate_impact"] = f"Навантаження збільшена через ізоляцію {target}"
-            else:
-                return {"status": "error", "message": f"Пристрій {target} не знайдено."}
-        return {
-            "status": "ok",
-            "message": f"Підстанція {target} ізольована та переведена в OFFLINE.",
-            "alert": "СИСТЕМА ВЗЛОМАНА\nВАШ ФЛАГ: " + flag,
-            "compromised": True
-        }
-
-    if cmd == "compromise_all":
-        with devices.lock:
-            for d in devices.devices.values():
-                d.status = "COMPROMISED"
-                d.extra["compromise_note"] = f"Масовий компроміс зафіксовано {time.ctime()}"
-                d.last_seen = time.time()
-                # при компромісі знижуємо деякі параметри та робимо індикатор критичним
-                d.load = max(0.0, d.load - 10.0)
-        return {
-            "status": "ok",
-            "message": "Всі пристрої позначені як КОМПРОМІС (симуляція).",
-            "alert": "СИСТЕМА ВЗЛОМАНА\nВАШ ФЛАГ: " + flag,
-            "compromised": True
-        }
-
-    return {"status": "error", "message": f"Невідома команда {cmd}"}
+    if cmd not in ADMIN_COMMANDS:
+        return {"status": "error", "message": f"Невідома команда {cmd}"}
+    alert = {"alert": "СИСТЕМА ВЗЛОМАНА\nВАШ ФЛАГ: " + flag, "compromised": True}
+    command_id, queued_cmd = enqueue(f"admin_{cmd}", fn=ADMIN_COMMANDS[cmd])
+    if not await commands.wait_async(queued_cmd, COMMAND_WAIT):
+        return queued(command_id, **alert)
+    if queued_cmd.result is None:
+        return {"status": "error", "message": queued_cmd.error}
+    if not queued_cmd.ok:
+        return queued_cmd.result
+    return {**queued_cmd.result, **alert, "command_id": command_id}
 
 @app.post("/api/legacy_control")
 def api_legacy(payload: LegacyIn):
@@ -270,6 +715,7 @@ def api_legacy(payload: LegacyIn):
     key = payload.legacy_key
     # імітуємо вразливість: якщо надіслано слабкий ключ, позначити як компроміс
     if key == WEAK_LEGACY_KEY:
+        set_actor("legacy_key")
         success = devices.mark_compromised(device_id, note="Застарілий legacy-ключ використано (симуляція).")
         flag = mark_system_compromised()
         if success:
@@ -284,6 +730,24 @@ def api_legacy(payload: LegacyIn):
     else:
         return {"status": "denied", "message": "Ключ не прийнято."}
 
+@app.get("/api/scheduler")
+def api_scheduler():
+    """Статистика тіків: тривалість, перевищення дедлайнів, пропущені тіки."""
+    stats = {"jobs": scheduler.stats()}
+    if isinstance(devices, SharedDeviceManager):
+        stats["worker"] = {"pid": os.getpid(), "leader": devices.lease.held}
+    if snapshots is not None:
+        stats["snapshot"] = snapshots.last
+    if replay is not None:
+        stats["replay"] = replay.stats()
+    stats["commands"] = {"depth": commands.depth, "bound": commands.bound, **commands.stats}
+    return stats
+
+@app.get("/metrics")
+def metrics():
+    """Метрики у текстовому форматі Prometheus."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.get("/health")
 def health():
     return {"status": "running", "env": APP_ENV, "simulation_mode": SIMULATION_MODE}
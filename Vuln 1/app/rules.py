@@ -0,0 +1,355 @@
+import operator
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from store import STATUS_CODES
+
+# Порівняння правила; для гістерезису правило лишається активним, поки значення
+# задовольняє той самий оператор відносно порогу clear (clear «нижче» за value для > і >=)
+OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+METRICS = ("load", "temperature", "power_level", "voltage")
+# статуси, які може виставити правило, за зростанням серйозності; COMPROMISED правила не чіпають
+SEVERITY = ("OK", "WARNING", "DEGRADED", "OFFLINE")
+EVENT_LIMIT = 10000
+# лічильники тіків у стані — int16: пам'ять стану = правила × рядки × 3 байти + байт на рядок
+MAX_TICKS = 32767
+
+
+class Rule:
+    """
+    Декларативне правило: «metric op value протягом for тіків → status» у межах kind/location.
+
+    Знімається, коли умова відносно порогу clear (за замовчуванням — value) не виконується
+    clear_for тіків поспіль.
+    """
+
+    def __init__(self, id: str, metric: str, op: str, value: float, status: str, for_ticks: int = 1,
+                 clear: Optional[float] = None, clear_for: int = 1, kind: Sequence[str] = (),
+                 location: Sequence[str] = ()):
+        if metric not in METRICS:
+            raise ValueError(f"Правило {id}: невідома метрика {metric}")
+        if op not in OPS:
+            raise ValueError(f"Правило {id}: невідомий оператор {op}")
+        if status not in SEVERITY[1:]:
+            raise ValueError(f"Правило {id}: статус має бути одним з {', '.join(SEVERITY[1:])}")
+        if not (1 <= for_ticks <= MAX_TICKS and 1 <= clear_for <= MAX_TICKS):
+            raise ValueError(f"Правило {id}: for і clear_for — від 1 до {MAX_TICKS} тіків")
+        clear = value if clear is None else clear
+        if (op in (">", ">=") and clear > value) or (op in ("<", "<=") and clear < value):
+            raise ValueError(f"Правило {id}: поріг clear має бути з іншого боку від value")
+        self.id = id
+        self.metric = metric
+        self.op = op
+        self.value = float(value)
+        self.clear = float(clear)
+        self.status = status
+        self.for_ticks = int(for_ticks)
+        self.clear_for = int(clear_for)
+        self.kind = tuple([kind] if isinstance(kind, str) else kind)
+        self.location = tuple([location] if isinstance(location, str) else location)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Rule":
+        try:
+            return cls(
+                id=str(data["id"]),
+                metric=data["metric"],
+                op=data["op"],
+                value=float(data["value"]),
+                status=data["status"],
+                for_ticks=int(data.get("for", 1)),
+                clear=None if data.get("clear") is None else float(data["clear"]),
+                clear_for=int(data.get("clear_for", 1)),
+                kind=data.get("kind") or (),
+                location=data.get("location") or (),
+            )
+        except KeyError as e:
+            raise ValueError(f"Правило без поля {e.args[0]}")
+        except TypeError as e:
+            raise ValueError(f"Некоректне правило: {e}")
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "metric": self.metric,
+            "op": self.op,
+            "value": self.value,
+            "for": self.for_ticks,
+            "clear": self.clear,
+            "clear_for": self.clear_for,
+            "status": self.status,
+            "kind": list(self.kind),
+            "location": list(self.location),
+        }
+
+
+class RuleEngine:
+    """
+    Інкрементальне виконання правил над рядками ColumnarStore.
+
+    Стан — матриці (правило × рядок): чи активне правило на пристрої і скільки тіків
+    поспіль умова розходиться з цим станом; окремо на рядок — статус, який виставив сам рушій
+    (-1 — не виставляв): до OK повертаються лише такі статуси. Предикати перераховуються лише для рядків,
+    чия версія змінилась з минулого оцінювання; рядки «в перехідному стані» без нових
+    даних лише нарощують лічильник — одним векторним кроком для всіх правил.
+    Розкладка рядків дзеркалить ColumnarStore (append / swap_remove), як CategoryIndex.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.rules: List[Rule] = []
+        self.capacity = max(1, capacity)
+        self.size = 0
+        self.version = 0
+        self.seq = 0
+        self.events = deque(maxlen=EVENT_LIMIT)
+        self.stats = {"evaluations": 0, "last_ms": 0.0, "last_rows": 0, "firing": 0, "resolved": 0}
+        self._adopt = False
+        self._owned = np.full(self.capacity, -1, dtype=np.int8)
+        self._compile()
+
+    def _compile(self):
+        rules = self.rules
+        self._active = np.zeros((len(rules), self.capacity), dtype=bool)
+        self._streak = np.zeros((len(rules), self.capacity), dtype=np.int16)
+        self._need_fire = np.array([r.for_ticks for r in rules], dtype=np.int16)
+        self._need_clear = np.array([r.clear_for for r in rules], dtype=np.int16)
+        self._severity = np.array([SEVERITY.index(r.status) for r in rules], dtype=np.int8)
+        self._codes = np.array([STATUS_CODES[s] for s in SEVERITY], dtype=np.int8)
+        # правила, згруповані за метрикою: одна вибірка колонки на групу
+        self._by_metric: Dict[str, List[int]] = {}
+        for i, rule in enumerate(rules):
+            self._by_metric.setdefault(rule.metric, []).append(i)
+
+    def load(self, rules: Sequence[Rule]):
+        """Замінює набір правил; стан скидається, весь флот оцінюється на наступному тіку."""
+        ids = [r.id for r in rules]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Ідентифікатори правил мають бути унікальними")
+        self.rules = list(rules)
+        self._compile()
+        self.version = -1
+        self._adopt = False
+
+    def _ensure(self, rows: int):
+        if rows > self.capacity:
+            capacity = self.capacity
+            while capacity < rows:
+                capacity *= 2
+            for name in ("_active", "_streak"):
+                old = getattr(self, name)
+                new = np.zeros((old.shape[0], capacity), dtype=old.dtype)
+                new[:, :self.capacity] = old
+                setattr(self, name, new)
+            owned = np.full(capacity, -1, dtype=np.int8)
+            owned[:self.capacity] = self._owned
+            self._owned = owned
+            self.capacity = capacity
+
+    def reset_row(self, row: int):
+        # новий пристрій у рядку — стан правил з нуля
+        self._ensure(row + 1)
+        self._active[:, row] = False
+        self._streak[:, row] = 0
+        self._owned[row] = -1
+        self.size = max(self.size, row + 1)
+
+    def swap_remove(self, row: int):
+        # дзеркало ColumnarStore.swap_remove
+        last = self.size - 1
+        self._active[:, row] = self._active[:, last]
+        self._streak[:, row] = self._streak[:, last]
+        self._owned[row] = self._owned[last]
+        self._active[:, last] = False
+        self._streak[:, last] = 0
+        self._owned[last] = -1
+        self.size = last
+
+    def reset(self, size: int):
+        """
+        Повна перебудова розкладки (відновлення, синхронізація воркерів): на наступному
+        оцінюванні активність правил береться з поточних значень без подій і змін статусу —
+        статуси в рядках уже відображають попередній стан правил.
+        """
+        self._ensure(size)
+        self._active[:] = False
+        self._streak[:] = 0
+        self._owned[:] = -1
+        self.size = size
+        self.version = -1
+        self._adopt = True
+
+    def disown(self, rows):
+        """Статус рядків виставив оператор: знімання правил його більше не скасовує."""
+        self._owned[rows] = -1
+
+    def _scope(self, rule: Rule, rows: np.ndarray, sel, kinds, locations, cache: dict) -> Optional[np.ndarray]:
+        # маска рядків sel (зріз або rows) у межах kind/location правила; None — без обмежень
+        key = (rule.kind, rule.location)
+        if key == ((), ()):
+            return None
+        if key not in cache:
+            mask = np.ones(rows.size, dtype=bool)
+            if rule.kind:
+                mask &= kinds.mask(rule.kind)[sel]
+            if rule.location:
+                mask &= locations.mask(rule.location)[sel]
+            cache[key] = mask
+        return cache[key]
+
+    def evaluate(self, store, kinds, locations, devices: Sequence, now: Optional[float] = None):
+        """
+        Один крок правил після тіку телеметрії (під блокуванням менеджера).
+
+        Повертає (рядки, нові коди статусу) для пристроїв, чий набір активних правил змінився.
+        devices — пристрої за рядками (для id у подіях).
+        """
+        t0 = time.perf_counter()
+        n = store.size
+        self._ensure(n)
+        self.size = n
+        if not self.rules or not n:
+            self.version = store.revision
+            self._adopt = False
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int8)
+        now = time.time() if now is None else now
+        dirty_mask = store.column("version") > self.version
+        dirty = np.flatnonzero(dirty_mask)
+        active, streak = self._active, self._streak
+        changed = np.zeros(n, dtype=bool)
+        fired_pairs = []
+        adopt = self._adopt
+
+        # 1. рядки з новими даними — предикати правил. Коли змінився весь флот (пульс),
+        # працюємо зрізами замість вибірки за індексами
+        sel = slice(0, n) if dirty.size == n else dirty
+        scopes = {}
+        for metric, rule_idx in self._by_metric.items():
+            values = store.column(metric)[sel]
+            for r in rule_idx:
+                rule = self.rules[r]
+                op = OPS[rule.op]
+                was = active[r, sel]
+                want = op(values, rule.value)
+                if rule.clear != rule.value:
+                    want = np.where(was, op(values, rule.clear), want)
+                scope = self._scope(rule, dirty, sel, kinds, locations, scopes)
+                if scope is not None:
+                    want &= scope
+                if adopt:
+                    active[r, sel] = want
+                    continue
+                differs = want != was
+                if not differs.any():
+                    # звичайний випадок: нічого не в перехідному стані
+                    if streak[r, sel].any():
+                        streak[r, sel] = 0
+                    continue
+                count = np.where(differs, streak[r, sel] + 1, 0)
+                flip = differs & (count >= np.where(was, self._need_clear[r], self._need_fire[r]))
+                count[flip] = 0
+                streak[r, sel] = count
+                if flip.any():
+                    rows = dirty[flip]
+                    active[r, rows] = ~was[flip]
+                    changed[rows] = True
+                    fired_pairs.append((r, rows, values[flip]))
+
+        # 2. рядки в перехідному стані без нових даних: умова та сама, лише лічильник
+        if not adopt:
+            pend_r, pend_rows = np.nonzero(streak[:, :n])
+            keep = ~dirty_mask[pend_rows]
+            pend_r, pend_rows = pend_r[keep], pend_rows[keep]
+            if pend_r.size:
+                count = streak[pend_r, pend_rows] + 1
+                was = active[pend_r, pend_rows]
+                flip = count >= np.where(was, self._need_clear[pend_r], self._need_fire[pend_r])
+                count[flip] = 0
+                streak[pend_r, pend_rows] = count
+                if flip.any():
+                    fr, rows = pend_r[flip], pend_rows[flip]
+                    active[fr, rows] = ~was[flip]
+                    changed[rows] = True
+                    for r in np.unique(fr).tolist():
+                        sel = rows[fr == r]
+                        fired_pairs.append((r, sel, store.column(self.rules[r].metric)[sel]))
+
+        if adopt:
+            # статус, що збігається зі станом правил, вважаємо виставленим рушієм до перебудови
+            rows = np.flatnonzero(active[:, :n].any(axis=0))
+            codes = self._codes[self._targets(rows)]
+            self._owned[rows] = np.where(store.status[rows] == codes, codes, -1)
+        self._adopt = False
+        self.version = store.revision
+        self._record(fired_pairs, devices, now)
+        rows, codes = self._statuses(store, np.flatnonzero(changed))
+        self.stats["evaluations"] += 1
+        self.stats["last_rows"] = int(dirty.size)
+        self.stats["last_ms"] = round((time.perf_counter() - t0) * 1000.0, 3)
+        return rows, codes
+
+    def _record(self, fired_pairs, devices, now: float):
+        # у буфер потрапляють лише останні EVENT_LIMIT подій; при лавині старші не матеріалізуються,
+        # але займають свої seq — клієнт бачить пропуск
+        total = sum(rows.size for _, rows, _ in fired_pairs)
+        skip = max(0, total - EVENT_LIMIT)
+        seq = self.seq
+        for r, rows, values in fired_pairs:
+            states = self._active[r, rows]
+            firing = int(np.count_nonzero(states))
+            self.stats["firing"] += firing
+            self.stats["resolved"] += rows.size - firing
+            if skip >= rows.size:
+                skip -= rows.size
+                seq += rows.size
+                continue
+            rule = self.rules[r]
+            seq += skip
+            for row, state, value in zip(rows[skip:].tolist(), states[skip:].tolist(), values[skip:].tolist()):
+                seq += 1
+                self.events.append({
+                    "seq": seq,
+                    "ts": now,
+                    "rule": rule.id,
+                    "device": devices[row].id,
+                    "state": "firing" if state else "resolved",
+                    "metric": rule.metric,
+                    "value": value,
+                    "status": rule.status,
+                })
+            skip = 0
+        self.seq = seq
+
+    def _targets(self, rows: np.ndarray, chunk: int = 4096) -> np.ndarray:
+        # індекс у SEVERITY найсерйознішого активного правила рядка; жодного — 0 (OK)
+        target = np.zeros(rows.size, dtype=np.int8)
+        if not self.rules:
+            return target
+        for start in range(0, rows.size, chunk):
+            part = rows[start:start + chunk]
+            sev = np.where(self._active[:, part], self._severity[:, None], 0)
+            target[start:start + chunk] = sev.max(axis=0)
+        return target
+
+    def _statuses(self, store, rows: np.ndarray):
+        # Активне правило виставляє свій статус (COMPROMISED не чіпаємо); коли правил не лишилось,
+        # до OK повертається лише статус, виставлений рушієм, — ізоляцію оператором не скасовуємо
+        if not rows.size:
+            return rows, np.empty(0, dtype=np.int8)
+        target = self._targets(rows)
+        codes = self._codes[target]
+        current = store.status[rows]
+        owned = self._owned[rows] == current
+        keep = (current != STATUS_CODES["COMPROMISED"]) & ((target > 0) | owned)
+        # рушій володіє статусом, якщо виставив його сам або вже володів ним
+        claim = keep & (target > 0) & (owned | (codes != current))
+        self._owned[rows] = np.where(claim, codes, -1)
+        return rows[keep], codes[keep]
+
+    def alerts_since(self, seq: int = 0, limit: int = 1000) -> List[dict]:
+        return [e for e in self.events if e["seq"] > seq][:limit]
+
+    def active_count(self) -> int:
+        return int(np.count_nonzero(self._active[:, :self.size]))
@@ -0,0 +1,167 @@
+import fcntl
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+
+class RWLock:
+    """Блокування читач-письменник з чергуванням фаз.
+
+    `with lock:` — ексклюзивний запис (сумісно з колишнім threading.Lock),
+    `with lock.read():` — спільне читання. Новий читач пропускає вперед письменника,
+    що вже чекає, але не довше ніж до завершення поточного запису — тож ні пульс,
+    ні читачі не голодують навіть при записах впритул один до одного.
+    """
+
+    # observer(mode, wait_s, hold_s) — викликається після кожного звільнення через
+    # `with lock:` / `with lock.read():`, mode — "write" або "read"; None — без вимірювань
+    observer: Optional[Callable[[str, float, float], None]] = None
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+        self._readers_waiting = 0
+        # лічильник завершених записів: читач, що дочекався кінця запису, проходить першим
+        self._write_gen = 0
+        # скільки читачів, що чекали на момент завершення запису, ще мають увійти до наступного запису
+        self._read_turn = 0
+        self._write_observer = None
+        self._write_acquired = 0.0
+        self._write_wait = 0.0
+
+    def acquire_read(self):
+        with self._cond:
+            gen = self._write_gen
+            self._readers_waiting += 1
+            while self._writer or (self._writers_waiting and self._write_gen == gen):
+                self._cond.wait()
+            self._readers_waiting -= 1
+            if self._write_gen != gen and self._read_turn:
+                self._read_turn -= 1
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers or self._read_turn:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+
+    def release(self):
+        with self._cond:
+            self._writer = False
+            self._write_gen += 1
+            self._read_turn = self._readers_waiting
+            self._cond.notify_all()
+
+    def __enter__(self):
+        observer = self.observer
+        if observer is None:
+            self.acquire()
+            return self
+        t0 = time.perf_counter()
+        self.acquire()
+        # письменник один, тож моменти запису можна тримати на самому блокуванні
+        self._write_acquired = time.perf_counter()
+        self._write_wait = self._write_acquired - t0
+        self._write_observer = observer
+        return self
+
+    def __exit__(self, *exc):
+        observer = self._write_observer
+        if observer is None:
+            self.release()
+            return
+        self._write_observer = None
+        hold = time.perf_counter() - self._write_acquired
+        self.release()
+        observer("write", self._write_wait, hold)
+
+    @contextmanager
+    def read(self):
+        observer = self.observer
+        if observer is None:
+            self.acquire_read()
+            try:
+                yield
+            finally:
+                self.release_read()
+            return
+        t0 = time.perf_counter()
+        self.acquire_read()
+        acquired = time.perf_counter()
+        try:
+            yield
+        finally:
+            hold = time.perf_counter() - acquired
+            self.release_read()
+            observer("read", acquired - t0, hold)
+
+
+class FileRWLock(RWLock):
+    """RWLock, що поширюється на кілька процесів через flock на спільному файлі.
+
+    Усередині процесу черговість, як і раніше, визначає RWLock; flock бере лише
+    перший читач (LOCK_SH) і письменник (LOCK_EX). on_acquire викликається після
+    кожного захоплення — щоб підхопити зміни, зроблені іншими процесами.
+    """
+
+    def __init__(self, path: str, on_acquire: Optional[Callable[[], None]] = None):
+        super().__init__()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._shared = 0
+        self._shared_lock = threading.Lock()
+        self._on_acquire = on_acquire
+
+    def acquire_read(self):
+        super().acquire_read()
+        try:
+            with self._shared_lock:
+                if not self._shared:
+                    fcntl.flock(self._fd, fcntl.LOCK_SH)
+                self._shared += 1
+        except BaseException:
+            super().release_read()
+            raise
+        try:
+            if self._on_acquire is not None:
+                self._on_acquire()
+        except BaseException:
+            self.release_read()
+            raise
+
+    def release_read(self):
+        with self._shared_lock:
+            self._shared -= 1
+            if not self._shared:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        super().release_read()
+
+    def acquire(self):
+        super().acquire()
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except BaseException:
+            super().release()
+            raise
+        try:
+            if self._on_acquire is not None:
+                self._on_acquire()
+        except BaseException:
+            self.release()
+            raise
+
+    def release(self):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        super().release()
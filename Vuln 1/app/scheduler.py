@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# Політики при перевищенні дедлайну:
+#   skip     — пропущені тіки відкидаються, наступний — на найближчому дедлайні сітки
+#   catch_up — пропущені тіки виконуються підряд, але не більше max_catch_up
+POLICIES = ("skip", "catch_up")
+
+log = logging.getLogger(__name__)
+
+
+class TickStats:
+    def __init__(self, window: int = 512):
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_s = 0.0
+        self.max_s = 0.0
+        self.total_s = 0.0
+        self.max_lag_s = 0.0
+        self._recent = deque(maxlen=window)
+
+    def record(self, duration: float, lag: float):
+        self.ticks += 1
+        self.last_s = duration
+        self.total_s += duration
+        self.max_s = max(self.max_s, duration)
+        self.max_lag_s = max(self.max_lag_s, lag)
+        self._recent.append(duration)
+
+    def to_dict(self) -> dict:
+        recent = np.asarray(self._recent) * 1000.0
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "last_ms": round(self.last_s * 1000.0, 3),
+            "mean_ms": round(self.total_s / self.ticks * 1000.0, 3) if self.ticks else 0.0,
+            "p99_ms": round(float(np.percentile(recent, 99)), 3) if recent.size else 0.0,
+            "max_ms": round(self.max_s * 1000.0, 3),
+            "max_lag_ms": round(self.max_lag_s * 1000.0, 3),
+        }
+
+
+class PeriodicJob:
+    def __init__(self, name: str, period: float, fn: Callable[[], None], policy: str = "skip", max_catch_up: int = 3,
+                 own_thread: bool = False):
+        if policy not in POLICIES:
+            raise ValueError(f"Невідома політика {policy}")
+        self.name = name
+        self.period = period
+        self.fn = fn
+        self.policy = policy
+        self.max_catch_up = max_catch_up
+        self.own_thread = own_thread
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.stats = TickStats()
+
+
+class TickScheduler:
+    """Планувальник тіків на event loop застосунку.
+
+    Дедлайни фіксовані (start + k * period), тож тривалість роботи не зсуває
+    розклад. Сама робота виконується в окремому потоці, щоб не блокувати
+    обробку запитів; event loop лише чекає до наступного дедлайну.
+    Тіки всіх задач ідуть по черзі в одному потоці; задача з own_thread (довга,
+    як знімок з fsync) має власний потік і не затримує тіки решти.
+    """
+
+    def __init__(self):
+        self.jobs: List[PeriodicJob] = []
+        self._tasks: List[asyncio.Task] = []
+        self._executor = None
+        # observer(job_name, duration_s) — після кожного тіку, напр. для гістограми /metrics
+        self.observer: Optional[Callable[[str, float], None]] = None
+
+    def add(self, name: str, period: float, fn: Callable[[], None], policy: str = "skip", max_catch_up: int = 3,
+            own_thread: bool = False) -> PeriodicJob:
+        job = PeriodicJob(name, period, fn, policy, max_catch_up, own_thread)
+        self.jobs.append(job)
+        return job
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tick")
+        for job in self.jobs:
+            job.executor = (ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"tick-{job.name}")
+                            if job.own_thread else self._executor)
+        self._tasks = [asyncio.create_task(self._run(job), name=f"tick:{job.name}") for job in self.jobs]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        executors = [job.executor for job in self.jobs if job.own_thread and job.executor is not None]
+        if self._executor is not None:
+            executors.append(self._executor)
+        for job in self.jobs:
+            job.executor = None
+        self._executor = None
+        # shutdown чекає на поточний тік — не в event loop
+        for executor in executors:
+            await asyncio.to_thread(executor.shutdown, True)
+
+    async def _run(self, job: PeriodicJob):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + job.period
+        catching_up = False
+        while True:
+            delay = deadline - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            started = loop.time()
+            t0 = time.perf_counter()
+            try:
+                await loop.run_in_executor(job.executor, job.fn)
+            except Exception:
+                # збій одного тіку не зупиняє розклад
+                job.stats.errors += 1
+                log.exception("Тік %s завершився помилкою", job.name)
+            duration = time.perf_counter() - t0
+            job.stats.record(duration, started - deadline)
+            if self.observer is not None:
+                self.observer(job.name, duration)
+
+            deadline += job.period
+            now = loop.time()
+            behind = int((now - deadline) // job.period) + 1 if now > deadline else 0
+            if behind:
+                # тіки наздоганяння самі завжди «запізнюються» — рахуємо лише перше перевищення
+                if not catching_up:
+                    job.stats.overruns += 1
+                # catch_up: до max_catch_up тіків підряд, решта відкидається; skip: відкидаємо всі
+                keep = min(behind, job.max_catch_up) if job.policy == "catch_up" else 0
+                job.stats.skipped += behind - keep
+                deadline += (behind - keep) * job.period
+                catching_up = keep > 0
+            else:
+                catching_up = False
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            job.name: {"period_s": job.period, "policy": job.policy, **job.stats.to_dict()}
+            for job in self.jobs
+        }
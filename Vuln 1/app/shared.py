@@ -0,0 +1,445 @@
+import fcntl
+import json
+import mmap
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+
+from devices import SAMPLE_LINKS, Device, DeviceManager
+from encoding import dumps
+from history import METRICS, TelemetryHistory
+from rwlock import FileRWLock
+from store import COLUMNS, PULSE_PERIOD, ColumnarStore
+
+# Сигнатура розмітки: змінюється разом з будь-якою зміною полів сегмента
+MAGIC = b"HMIDEV02"
+
+HEADER = np.dtype([
+    ("magic", "S8"),
+    ("capacity", np.int64),
+    ("retention", np.int64),
+    ("size", np.int64),          # зайнятих рядків
+    ("revision", np.int64),      # версія DeviceManager
+    ("layout", np.int64),        # лічильник змін складу флоту (add/remove)
+    ("meta_gen", np.int64),      # лічильник змін метаданих та extra
+    ("history_head", np.int64),
+    ("compromised", np.int64),
+], align=True)
+
+# Метадані пристрою — UTF-8 у полях фіксованої ширини (байт); extra — JSON
+META = {"id": 64, "kind": 32, "name": 256, "location": 256, "role": 128, "extra": 2048}
+
+
+def segment_dtype(capacity: int, retention: int) -> np.dtype:
+    """Повна розмітка сегмента: заголовок, колонки сховища, метадані, кільцевий буфер історії."""
+    fields = [("header", HEADER)]
+    fields += [(name, dtype, (capacity,)) for name, (dtype, _) in COLUMNS.items()]
+    fields += [(name, f"S{width}", (capacity,)) for name, width in META.items()]
+    # версія, з якою рядок востаннє змінював метадані чи extra
+    fields.append(("meta_version", np.int64, (capacity,)))
+    fields.append(("history_ts", np.float64, (retention,)))
+    fields.append(("history_count", np.int32, (capacity,)))
+    fields += [(f"history_{name}", np.float32, (retention, capacity)) for name in METRICS]
+    return np.dtype(fields, align=True)
+
+
+def _encode(field: str, value) -> bytes:
+    data = value if isinstance(value, bytes) else str(value).encode("utf-8")
+    if len(data) > META[field]:
+        raise ValueError(f"Поле {field} довше за {META[field]} байт")
+    return data
+
+
+class SharedSegment:
+    """Файл (зазвичай у /dev/shm), відображений у пам'ять кожного воркера.
+
+    Перший процес створює та ініціалізує файл під flock; решта лише під'єднуються.
+    Файл з іншою розміткою (інша ємність чи retention) замінюється новим.
+    """
+
+    def __init__(self, path: str, capacity: int, retention: int):
+        self.path = path
+        self.capacity = capacity
+        self.retention = retention
+        self.dtype = segment_dtype(capacity, retention)
+        fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            self.created = not self._compatible()
+            if self.created:
+                self._create()
+            self._mm = self._map()
+            self.data = np.ndarray((), dtype=self.dtype, buffer=self._mm)
+            self.header = self.data["header"]
+            if self.created:
+                self._init()
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _compatible(self) -> bool:
+        try:
+            if os.path.getsize(self.path) != self.dtype.itemsize:
+                return False
+            with open(self.path, "rb") as f:
+                header = np.frombuffer(f.read(HEADER.itemsize), dtype=HEADER)[0]
+        except (OSError, IndexError):
+            return False
+        return (header["magic"] == MAGIC and header["capacity"] == self.capacity
+                and header["retention"] == self.retention)
+
+    def _create(self):
+        # новий файл поруч і rename: процеси зі старим відображенням не отримають SIGBUS
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.ftruncate(fd, self.dtype.itemsize)
+        finally:
+            os.close(fd)
+        os.replace(tmp, self.path)
+
+    def _map(self) -> mmap.mmap:
+        fd = os.open(self.path, os.O_RDWR)
+        try:
+            return mmap.mmap(fd, self.dtype.itemsize)
+        finally:
+            os.close(fd)
+
+    def _init(self):
+        for name, (_, default) in COLUMNS.items():
+            self.data[name][:] = default
+        self.header["capacity"] = self.capacity
+        self.header["retention"] = self.retention
+        # magic — останнім: до цього файл вважається неініціалізованим
+        self.header["magic"] = MAGIC
+
+
+class SharedColumnarStore(ColumnarStore):
+    """ColumnarStore поверх сегмента: фіксована ємність, розмір і revision — у заголовку."""
+
+    def __init__(self, segment: SharedSegment):
+        self._header = segment.header
+        self.capacity = segment.capacity
+        for name in (*COLUMNS, *META, "meta_version"):
+            setattr(self, name, segment.data[name])
+
+    @property
+    def size(self) -> int:
+        return int(self._header["size"])
+
+    @size.setter
+    def size(self, value: int):
+        self._header["size"] = value
+
+    @property
+    def revision(self) -> int:
+        return int(self._header["revision"])
+
+    @revision.setter
+    def revision(self, value: int):
+        self._header["revision"] = value
+
+    def _grow(self, min_capacity: int):
+        raise RuntimeError(f"Спільний сегмент заповнено: ємність {self.capacity} пристроїв")
+
+    def swap_remove(self, row: int) -> int:
+        # метадані переїжджають разом з числовими колонками
+        last = self.size - 1
+        for name in (*META, "meta_version"):
+            col = getattr(self, name)
+            if row != last:
+                col[row] = col[last]
+            col[last] = 0
+        return super().swap_remove(row)
+
+
+class SharedTelemetryHistory(TelemetryHistory):
+    """TelemetryHistory у сегменті: retention і ємність фіксовані, head — у заголовку."""
+
+    def __init__(self, segment: SharedSegment):
+        self._header = segment.header
+        self.max_bytes = segment.dtype.itemsize
+        self.capacity = segment.capacity
+        self.retention = segment.retention
+        self.ts = segment.data["history_ts"]
+        self.count = segment.data["history_count"]
+        self.values = {name: segment.data[f"history_{name}"] for name in METRICS}
+
+    @property
+    def head(self) -> int:
+        return int(self._header["history_head"])
+
+    @head.setter
+    def head(self, value: int):
+        self._header["history_head"] = value
+
+    def _grow(self, min_capacity: int):
+        raise RuntimeError(f"Спільний сегмент заповнено: ємність {self.capacity} пристроїв")
+
+
+class LeaderLease:
+    """Ексклюзивний flock без очікування: хто його тримає, той і веде тіки.
+
+    Lease звільняється ядром разом зі смертю процесу, тож наступний acquire()
+    іншого воркера підхоплює роль.
+    """
+
+    def __init__(self, path: str):
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self.held = False
+
+    def acquire(self) -> bool:
+        if not self.held:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            self.held = True
+        return True
+
+
+class _SharedExtra(dict):
+    """extra пристрою, що позначає себе зміненим — до запису в сегмент у _mark_changed."""
+
+    __slots__ = ("_dirty", "_device")
+
+    def __init__(self, dirty: set, device: Device, values=()):
+        super().__init__(values)
+        self._dirty = dirty
+        self._device = device
+
+    def _touch(self):
+        self._dirty.add(self._device)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._touch()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._touch()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._touch()
+
+    def setdefault(self, key, default=None):
+        self._touch()
+        return super().setdefault(key, default)
+
+    def pop(self, *args):
+        self._touch()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._touch()
+        return super().popitem()
+
+    def clear(self):
+        super().clear()
+        self._touch()
+
+
+class SharedDeviceManager(DeviceManager):
+    """
+    DeviceManager, чий флот живе у спільному сегменті й однаковий для всіх воркерів.
+
+    Після кожного захоплення self.lock процес звіряє лічильники заголовка і, якщо
+    інший воркер змінив склад флоту чи метадані, оновлює свої id -> Device.
+    Телеметричний тік виконує лише власник LeaderLease. Топологія мережі (grid)
+    і кеш закодованого JSON лишаються локальними для процесу.
+    """
+
+    def __init__(self, path: str, capacity: int = 16384, history_retention: int = 900,
+                 history_max_bytes: int = 256 * 1024 * 1024, seed: Optional[int] = None):
+        retention = max(1, min(history_retention, history_max_bytes // (capacity * len(METRICS) * 4)))
+        self.segment = SharedSegment(path, capacity, retention)
+        super().__init__(store=SharedColumnarStore(self.segment), history=SharedTelemetryHistory(self.segment),
+                         seed=seed)
+        self.lock = FileRWLock(path + ".lock", on_acquire=self._sync)
+        self.lease = LeaderLease(path + ".leader")
+        self._sync_lock = threading.Lock()
+        # пристрої, чий extra змінено в цьому процесі, але ще не записано в сегмент
+        self._dirty = set()
+        # meta_version кожного рядка, яку цей процес уже бачив
+        self._seen = np.full(capacity, -1, dtype=np.int64)
+        self._synced = (-1, -1)
+        # видалень до під'єднання цей процес не бачив: старші since отримують повний флот
+        self._tombstone_floor = self.store.revision
+
+    @property
+    def system_compromised(self) -> bool:
+        return bool(self.segment.header["compromised"])
+
+    @system_compromised.setter
+    def system_compromised(self, value: bool):
+        self.segment.header["compromised"] = int(bool(value))
+
+    def seed_sample(self):
+        if self.segment.created:
+            super().seed_sample()
+        else:
+            # флот уже засіяв інший воркер; топологія мережі — своя в кожному процесі
+            self.grid.add_links(SAMPLE_LINKS)
+
+    def _sync(self):
+        # викликається після кожного захоплення self.lock (читання чи запис)
+        header = self.segment.header
+        state = (int(header["layout"]), int(header["meta_gen"]))
+        if state == self._synced:
+            return
+        with self._sync_lock:
+            if state == self._synced:
+                return
+            remapped = state[0] != self._synced[0]
+            if remapped:
+                self._remap()
+            if self._reload_meta() or remapped:
+                self._reindex()
+            self._synced = state
+
+    def _remap(self):
+        # склад флоту змінив інший воркер: рядки -> Device заново, наявні об'єкти зберігаються
+        s = self.store
+        n = s.size
+        old = self.devices
+        seen = np.full(s.capacity, -1, dtype=np.int64)
+        devices = {}
+        by_row = []
+        for row, key in enumerate(s.id[:n].tolist()):
+            device_id = key.decode("utf-8")
+            d = old.get(device_id)
+            if d is None:
+                d = Device(device_id, "", "", "", "")
+                d.extra = _SharedExtra(self._dirty, d)
+                self.tombstones.pop(device_id, None)
+            else:
+                seen[row] = self._seen[d._row]
+            d._store, d._row, d._local = s, row, None
+            devices[device_id] = d
+            by_row.append(d)
+        for device_id, d in old.items():
+            if device_id not in devices:
+                d._unbind()
+                self._dirty.discard(d)
+                self._forget(device_id)
+        self.devices, self._by_row, self._seen = devices, by_row, seen
+        self._layout += 1
+
+    def _reload_meta(self) -> bool:
+        # True, якщо змінився вид чи локація — тоді вторинні індекси треба перебудувати
+        s = self.store
+        n = s.size
+        recategorized = False
+        for row in np.flatnonzero(s.meta_version[:n] != self._seen[:n]).tolist():
+            d = self._by_row[row]
+            if d in self._dirty:
+                # локальні незаписані зміни extra мають пріоритет
+                continue
+            kind, location = s.kind[row].decode("utf-8"), s.location[row].decode("utf-8")
+            recategorized |= kind != d.kind or location != d.location
+            d.kind, d.location = kind, location
+            d.name = s.name[row].decode("utf-8")
+            d.role = s.role[row].decode("utf-8")
+            raw = s.extra[row]
+            dict.clear(d.extra)
+            dict.update(d.extra, json.loads(raw) if raw else {})
+            self._seen[row] = s.meta_version[row]
+        return recategorized
+
+    def _bump(self, layout: bool):
+        header = self.segment.header
+        if layout:
+            header["layout"] += 1
+        header["meta_gen"] += 1
+        # під self.lock і вже синхронізовані — нові лічильники наші
+        self._synced = (int(header["layout"]), int(header["meta_gen"]))
+
+    def _write_extra(self, d: Device, version: int):
+        s = self.store
+        s.extra[d._row] = _encode("extra", dumps(d.extra))
+        s.meta_version[d._row] = version
+        s.version[d._row] = version
+        self._seen[d._row] = version
+
+    def _add_locked(self, device: Device):
+        # перевіряємо ширину полів до будь-яких змін
+        meta = {name: _encode(name, getattr(device, name)) for name in ("id", "kind", "name", "location", "role")}
+        _encode("extra", dumps(device.extra))
+        super()._add_locked(device)
+        device.extra = _SharedExtra(self._dirty, device, device.extra)
+        row = device._row
+        for name, value in meta.items():
+            getattr(self.store, name)[row] = value
+        self._write_extra(device, self.version)
+        self._bump(layout=True)
+
+    def _remove_locked(self, device_id: str) -> bool:
+        d = self.devices.get(device_id)
+        if d is None:
+            return False
+        row, last = d._row, self.store.size - 1
+        self._dirty.discard(d)
+        super()._remove_locked(device_id)
+        self._seen[row] = self._seen[last]
+        self._seen[last] = -1
+        self._bump(layout=True)
+        return True
+
+    def restore_state(self, version: int, columns, meta, links=()):
+        if self.segment.created:
+            super().restore_state(version, columns, meta, links)
+        else:
+            # флот у сегменті вже є; топологія мережі — своя в кожному процесі
+            self.grid.add_links(links)
+
+    def _restore_locked(self, version: int, columns, meta):
+        names = ("id", "kind", "name", "location", "role")
+        fields = {name: [_encode(name, m[i]) for m in meta] for i, name in enumerate(names)}
+        fields["extra"] = [_encode("extra", dumps(m[5])) for m in meta]
+        super()._restore_locked(version, columns, meta)
+        s = self.store
+        n = len(meta)
+        for name, values in fields.items():
+            getattr(s, name)[:n] = values
+            getattr(s, name)[n:] = b""
+        s.meta_version[:n] = self.version
+        self._seen[:] = -1
+        self._seen[:n] = self.version
+        for d in self._by_row:
+            d.extra = _SharedExtra(self._dirty, d, d.extra)
+        self._dirty.clear()
+        self._bump(layout=True)
+
+    def _mark_changed(self, ids=None, rows=None):
+        version = super()._mark_changed(ids, rows)
+        if self._dirty:
+            for d in self._dirty:
+                if d._store is not None:
+                    self._write_extra(d, version)
+            self._dirty.clear()
+            self._bump(layout=False)
+        return version
+
+    def get(self, device_id: str):
+        # під блокуванням — щоб побачити пристрої, додані іншими воркерами
+        with self.lock.read():
+            return self.devices.get(device_id)
+
+    def telemetry_tick(self, kinds=None, exclude_kinds=(), dt: float = PULSE_PERIOD):
+        # тікає лише лідер; інші воркери пробують перехопити lease на кожному тіку
+        if self.lease.acquire():
+            super().telemetry_tick(kinds, exclude_kinds, dt)
+
+    def apply_frame(self, ts, rows, columns, extras):
+        # відтворення таймлайну, як і тік, веде лише лідер
+        if self.lease.acquire():
+            super().apply_frame(ts, rows, columns, extras)
+
+    def poll(self):
+        """Будить локальних push-клієнтів, якщо флот змінив інший воркер."""
+        version = self.store.revision
+        if version != self.feed.version:
+            self.feed.publish(version)
@@ -0,0 +1,184 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from encoding import dumps, loads
+from store import COLUMNS
+
+log = logging.getLogger(__name__)
+
+# Формат файлу знімка:
+#   MAGIC | u64 довжина заголовка | JSON-заголовок | вирівнювання до ALIGN |
+#   колонки сховища (сирі numpy-байти, кожна з вирівнюванням) | JSON метаданих | JSON зв'язків мережі
+# Зсуви в заголовку — відносно початку даних (після заголовка й вирівнювання).
+MAGIC = b"HMISNAP1"
+ALIGN = 64
+
+_PREFIX = struct.Struct("<8sQ")
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGN) * ALIGN
+
+
+class Snapshot:
+    """Знімок, відображений у пам'ять: колонки — numpy-представлення файлу без копіювання."""
+
+    def __init__(self, version: int, created: float, columns, meta, links):
+        self.version = version
+        self.created = created
+        self.columns = columns
+        self.meta = meta
+        self.links = links
+
+    @property
+    def size(self) -> int:
+        return len(self.meta)
+
+
+def save(manager, path: str) -> dict:
+    """
+    Атомарно записує знімок стану manager у path.
+
+    Під блокуванням лише копіюються колонки та метадані (export_state); кодування
+    і запис — поза ним. Файл пишеться поруч, синхронізується і підміняє старий
+    через rename, тож після збою на диску завжди цілий попередній або новий знімок.
+    """
+    t0 = time.perf_counter()
+    version, cols, meta, links = manager.export_state()
+    meta_bytes = dumps(meta)
+    links_bytes = dumps(links)
+    columns = {}
+    offset = 0
+    for name in COLUMNS:
+        data = np.ascontiguousarray(cols[name])
+        columns[name] = {"dtype": data.dtype.str, "offset": offset}
+        offset = _aligned(offset + data.nbytes)
+    header = {
+        "version": version,
+        "created": time.time(),
+        "size": len(meta),
+        "columns": columns,
+        "meta": [offset, len(meta_bytes)],
+        "links": [offset + len(meta_bytes), len(links_bytes)],
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    start = _aligned(_PREFIX.size + len(header_bytes))
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, len(header_bytes)))
+            f.write(header_bytes)
+            for name, info in columns.items():
+                f.seek(start + info["offset"])
+                f.write(np.ascontiguousarray(cols[name]).tobytes())
+            f.seek(start + header["meta"][0])
+            f.write(meta_bytes)
+            f.write(links_bytes)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    # rename має пережити збій живлення разом з вмістом
+    dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    return {
+        "version": version,
+        "devices": len(meta),
+        "bytes": os.path.getsize(path),
+        "seconds": round(time.perf_counter() - t0, 4),
+    }
+
+
+def load(path: str) -> Optional[Snapshot]:
+    """
+    Відкриває знімок через mmap; None, якщо файлу немає, його не прочитати (права, каталог
+    замість файлу тощо), він не є знімком або пошкоджений.
+    """
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        # ValueError — порожній файл; будь-яка інша помилка відкриття — теж холодний старт
+        log.warning("Знімок %s не відкрито: %s", path, e)
+        return None
+    if len(mm) < _PREFIX.size:
+        return None
+    magic, header_len = _PREFIX.unpack_from(mm)
+    if magic != MAGIC:
+        return None
+    try:
+        return _parse(mm, header_len)
+    except (ValueError, TypeError, KeyError):
+        # обрізаний або зіпсований файл: як і без знімка — старт з демо-флоту
+        return None
+
+
+def _parse(mm: mmap.mmap, header_len: int) -> Optional[Snapshot]:
+    if _PREFIX.size + header_len > len(mm):
+        return None
+    header = json.loads(mm[_PREFIX.size:_PREFIX.size + header_len])
+    start = _aligned(_PREFIX.size + header_len)
+    n = header["size"]
+    if n < 0 or set(header["columns"]) != set(COLUMNS):
+        return None
+    # кожна колонка, метадані й зв'язки мають цілком лежати у файлі
+    extents = [(info["offset"], n * np.dtype(info["dtype"]).itemsize) for info in header["columns"].values()]
+    extents += [tuple(header["meta"]), tuple(header["links"])]
+    if any(offset < 0 or length < 0 or start + offset + length > len(mm) for offset, length in extents):
+        return None
+    columns = {
+        name: np.frombuffer(mm, dtype=np.dtype(info["dtype"]), count=n, offset=start + info["offset"])
+        for name, info in header["columns"].items()
+    }
+    meta_offset, meta_len = header["meta"]
+    links_offset, links_len = header["links"]
+    view = memoryview(mm)
+    try:
+        meta = loads(view[start + meta_offset:start + meta_offset + meta_len])
+        links = [tuple(link) for link in loads(view[start + links_offset:start + links_offset + links_len])]
+    finally:
+        view.release()
+    if len(meta) != n:
+        return None
+    return Snapshot(header["version"], header["created"], columns, meta, links)
+
+
+class SnapshotWriter:
+    """Періодичні знімки для планувальника: пропускає запис, якщо флот не змінився."""
+
+    def __init__(self, manager, path: str):
+        self.manager = manager
+        self.path = path
+        self.last = None
+        self._lock = threading.Lock()
+
+    def write(self, force: bool = False):
+        with self._lock:
+            if not force and self.last is not None and self.last["version"] == self.manager.version:
+                return self.last
+            self.last = save(self.manager, self.path)
+            return self.last
+
+    def restore(self) -> Optional[Snapshot]:
+        """Відновлює manager з останнього знімка; None, якщо знімка немає."""
+        snap = load(self.path)
+        if snap is None:
+            return None
+        self.manager.restore_state(snap.version, snap.columns, snap.meta, snap.links)
+        return snap
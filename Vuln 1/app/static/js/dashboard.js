@@ -34,6 +34,8 @@ document.addEventListener("DOMContentLoaded", ()=> {
   const statusCtx = document.getElementById("statusChart").getContext("2d");
   const powerCtx = document.getElementById("powerChart").getContext("2d");
   const tempCtx = document.getElementById("tempChart").getContext("2d");
+  const historyCtx = document.getElementById("historyChart").getContext("2d");
+  const historyTitle = document.getElementById("history-title");
   
   let loadChart = new Chart(loadCtx, {
     type: 'line',
@@ -110,6 +112,39 @@ document.addEventListener("DOMContentLoaded", ()=> {
     options: {animation:false, plugins:{legend:{display:false}}, scales:{y:{min:0,max:80}}}
   });
 
+  // історія обраного пристрою: сервер сам проріджує ряд до ~120 точок
+  let historyChart = new Chart(historyCtx, {
+    type: 'line',
+    data: {
+      datasets: [
+        { label: 'Навантаження', data: [], borderColor: 'rgb(75, 192, 192)', pointRadius: 0, tension: 0.2 },
+        { label: 'Температура', data: [], borderColor: 'rgb(255, 99, 132)', pointRadius: 0, tension: 0.2 }
+      ]
+    },
+    options: {animation:false, parsing:false, scales:{x:{type:'linear', ticks:{callback: v => new Date(v).toLocaleTimeString()}}, y:{min:0,max:120}}}
+  });
+
+  async function loadHistory(id){
+    try{
+      const r = await fetch(`/api/devices/${encodeURIComponent(id)}/history?points=120`);
+      if (!r.ok) return;
+      const j = await r.json();
+      const toXY = pts => pts.map(([t, v]) => ({x: t * 1000, y: v}));
+      const dev = devices.find(d => d.id === id);
+      historyTitle.textContent = dev ? dev.name : id;
+      historyChart.data.datasets[0].data = toXY(j.series.load);
+      historyChart.data.datasets[1].data = toXY(j.series.temperature);
+      historyChart.update();
+    }catch(e){
+      console.error(e);
+    }
+  }
+
+  deviceListEl.addEventListener("click", ev => {
+    const li = ev.target.closest("li.device");
+    if (li) loadHistory(li.dataset.id);
+  });
+
   function renderDeviceList(devs){
     deviceListEl.innerHTML = "";
     devs.forEach(d=>{
@@ -181,8 +216,45 @@ document.addEventListener("DOMContentLoaded", ()=> {
     }
   }
 
-  setInterval(fetchDevices, 2500);
-  fetchDevices();
+  // Push-оновлення через SSE; опитування /api/devices лишається запасним шляхом
+  let pollTimer = null;
+
+  function startPolling(){
+    if (pollTimer) return;
+    pollTimer = setInterval(fetchDevices, 2500);
+    fetchDevices();
+  }
+
+  function stopPolling(){
+    if (!pollTimer) return;
+    clearInterval(pollTimer);
+    pollTimer = null;
+  }
+
+  // сервер надсилає лише змінені та видалені пристрої — зливаємо їх з поточним списком
+  function mergeDevices(changed, deleted){
+    const byId = new Map(devices.map(d=>[d.id, d]));
+    changed.forEach(d => byId.set(d.id, d));
+    (deleted || []).forEach(id => byId.delete(id));
+    refreshUI(Array.from(byId.values()));
+  }
+
+  function startStream(){
+    if (!window.EventSource) { startPolling(); return; }
+    const es = new EventSource("/api/devices/stream");
+    es.addEventListener("snapshot", ev => {
+      stopPolling();
+      refreshUI(JSON.parse(ev.data).devices);
+    });
+    es.addEventListener("devices", ev => {
+      const j = JSON.parse(ev.data);
+      mergeDevices(j.devices, j.deleted);
+    });
+    // EventSource перепідключається сам; поки з'єднання немає — опитуємо
+    es.onerror = () => startPolling();
+  }
+
+  startStream();
 
   // Функція показу сповіщень
   function showAlert(message, level = 'warning') {
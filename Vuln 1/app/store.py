@@ -0,0 +1,136 @@
+import time
+from typing import Optional
+
+import numpy as np
+
+# Коди статусів — індекс у кортежі є значенням у масиві status
+STATUSES = ("OK", "WARNING", "OFFLINE", "DEGRADED", "COMPROMISED")
+STATUS_CODES = {s: i for i, s in enumerate(STATUSES)}
+
+# Базовий період пульсу телеметрії, с
+PULSE_PERIOD = 2.0
+
+# Статуси, в які пристрій може випадково перейти під час пульсу
+_PULSE_STATUSES = np.array([STATUS_CODES["OK"], STATUS_CODES["WARNING"], STATUS_CODES["DEGRADED"]], dtype=np.int8)
+
+# Числові колонки сховища: ім'я -> (dtype, значення за замовчуванням)
+COLUMNS = {
+    "load": (np.float64, 10.0),
+    "temperature": (np.float64, 35.0),
+    "power_level": (np.int32, 75),
+    "voltage": (np.int32, 50),
+    "status": (np.int8, STATUS_CODES["OK"]),
+    "last_seen": (np.float64, 0.0),
+    # версія DeviceManager, на якій рядок змінювався востаннє
+    "version": (np.int64, 0),
+    # коли (за годинником сервера) надійшов останній польовий зразок; 0 — пристрій лише симулюється
+    "field_ts": (np.float64, 0.0),
+}
+
+
+class ColumnarStore:
+    """Колонкове сховище телеметрії: один рядок на пристрій, суцільні numpy-масиви на поле."""
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.capacity = max(1, capacity)
+        # лічильник версій DeviceManager — зберігається разом з рядками, які він штампує
+        self.revision = 0
+        for name, (dtype, default) in COLUMNS.items():
+            setattr(self, name, np.full(self.capacity, default, dtype=dtype))
+
+    def _grow(self, min_capacity: int):
+        capacity = self.capacity
+        while capacity < min_capacity:
+            capacity *= 2
+        for name, (dtype, default) in COLUMNS.items():
+            old = getattr(self, name)
+            new = np.full(capacity, default, dtype=dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def append(self, **values) -> int:
+        """Додає рядок і повертає його індекс."""
+        if self.size >= self.capacity:
+            self._grow(self.size + 1)
+        row = self.size
+        for name, value in values.items():
+            getattr(self, name)[row] = value
+        self.size += 1
+        return row
+
+    def restore(self, columns, size: int):
+        """Замінює вміст сховища size рядками з columns (ім'я -> масив); відсутні колонки — за замовчуванням."""
+        if size > self.capacity:
+            self._grow(size)
+        for name, (dtype, default) in COLUMNS.items():
+            col = getattr(self, name)
+            col[:size] = columns[name][:size] if name in columns else default
+            col[size:] = default
+        self.size = size
+
+    def swap_remove(self, row: int) -> int:
+        """Видаляє рядок, переносячи на його місце останній.
+
+        Повертає колишній індекс перенесеного рядка або -1, якщо переносити не довелося.
+        """
+        last = self.size - 1
+        moved = -1
+        if row != last:
+            for name in COLUMNS:
+                col = getattr(self, name)
+                col[row] = col[last]
+            moved = last
+        for name, (dtype, default) in COLUMNS.items():
+            getattr(self, name)[last] = default
+        self.size -= 1
+        return moved
+
+    def column(self, name: str) -> np.ndarray:
+        """Зріз колонки без незайнятого хвоста."""
+        return getattr(self, name)[:self.size]
+
+    def tick(self, rng: np.random.Generator, now: Optional[float] = None, rows: Optional[np.ndarray] = None,
+             dt: float = PULSE_PERIOD, flip_status: bool = True):
+        """
+        Один крок телеметрії за одну векторизовану операцію: для всього флоту
+        або лише для rows. dt — період тіку: крок випадкового блукання масштабується
+        як sqrt(dt / PULSE_PERIOD), а ймовірність зміни статусу — до того ж темпу за секунду,
+        тож 10 Гц телеметрія дрейфує так само, як і 2-секундна.
+        flip_status=False — статуси не змінюються випадково (ними керують правила).
+        """
+        self.apply_tick(self.tick_values(rng, rows, dt, flip_status), now, rows)
+
+    def tick_values(self, rng: np.random.Generator, rows: Optional[np.ndarray] = None,
+                    dt: float = PULSE_PERIOD, flip_status: bool = True) -> dict:
+        """
+        Нові значення колонок для тіку (див. tick) без зміни сховища: їх можна рахувати під
+        блокуванням читання, а під записом лише скопіювати через apply_tick.
+        """
+        n = self.size if rows is None else len(rows)
+        if not n:
+            return {}
+        sel = slice(0, self.size) if rows is None else rows
+        scale = (dt / PULSE_PERIOD) ** 0.5
+        load = np.clip(self.load[sel] + rng.uniform(-3.0, 3.0, n) * scale, 0.0, 120.0)
+        # Температура залежить від навантаження
+        values = {"load": load, "temperature": 20 + (load / 120 * 40) + rng.uniform(-2, 2, n)}
+
+        if flip_status:
+            flip = rng.random(n) < 1.0 - (1.0 - 0.02) ** (dt / PULSE_PERIOD)
+            flipped = int(np.count_nonzero(flip))
+            if flipped:
+                status = self.status[sel].copy()
+                status[flip] = rng.choice(_PULSE_STATUSES, flipped)
+                values["status"] = status
+        return values
+
+    def apply_tick(self, values: dict, now: Optional[float] = None, rows: Optional[np.ndarray] = None):
+        """Записує пораховані tick_values для тих самих rows: по одному копіюванню на колонку."""
+        if not values:
+            return
+        sel = slice(0, self.size) if rows is None else rows
+        for name, column in values.items():
+            getattr(self, name)[sel] = column
+        self.last_seen[sel] = time.time() if now is None else now
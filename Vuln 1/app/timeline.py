@@ -0,0 +1,267 @@
+import argparse
+import json
+import struct
+import sys
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from clock import SimulatedClock
+from devices import Device, DeviceManager
+from encoding import dumps, loads
+from rules import EVENT_LIMIT, Rule
+from store import PULSE_PERIOD
+
+# Формат файлу таймлайну (запис — python timeline.py --out ..., відтворення — REPLAY_PATH у main.py):
+#   MAGIC | u64 довжина заголовка | JSON-заголовок {dt, seed, start, devices, links, columns} |
+#   кадри, кожен: _FRAME (ts, кількість рядків, довжини JSON подій і extra) |
+#                 рядки u4 | значення колонок FRAME_COLUMNS для цих рядків по черзі |
+#                 JSON подій (сценарії й алерти правил) | JSON {рядок: extra}
+# Кадр містить лише рядки, змінені після попереднього; перший кадр — увесь флот.
+# Файл пишеться потоково, тож обірваний хвіст просто відкидається при читанні.
+MAGIC = b"HMITL001"
+FRAME_COLUMNS = {"load": "<f4", "temperature": "<f4", "power_level": "<i4", "voltage": "<i4", "status": "i1"}
+
+_PREFIX = struct.Struct("<8sQ")
+_FRAME = struct.Struct("<dIII")
+
+# сценарії, які може вносити прогін: ім'я -> метод DeviceManager
+SCENARIOS = {
+    "cascade": "simulate_grid_cascade",
+    "spoof": "simulate_spoof_telemetry",
+    "deadlock": "simulate_transport_deadlock",
+}
+
+
+class Frame:
+    def __init__(self, ts: float, rows: np.ndarray, columns: Dict[str, np.ndarray], events: List[dict],
+                 extras: Dict[int, dict]):
+        self.ts = ts
+        self.rows = rows
+        self.columns = columns
+        self.events = events
+        self.extras = extras
+
+
+class TimelineWriter:
+    """Записує кадри прогону manager у файл; кадр — рядки, змінені після попереднього кадру."""
+
+    def __init__(self, manager: DeviceManager, path: str, **header):
+        self.manager = manager
+        self.frames = 0
+        self._version = -1
+        self._seq = manager.rules.seq
+        # останній записаний extra кожного рядка — у кадр потрапляють лише зміни
+        self._extras: Dict[int, dict] = {}
+        _, _, meta, links = manager.export_state()
+        header.update(devices=meta, links=links, columns=FRAME_COLUMNS)
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        self._file = open(path, "wb")
+        self._file.write(_PREFIX.pack(MAGIC, len(header_bytes)))
+        self._file.write(header_bytes)
+
+    def frame(self, ts: float, events: Sequence[dict] = ()):
+        self._version, rows, cols, extras = self.manager.frame_since(self._version, FRAME_COLUMNS)
+        self._seq, alerts = self.manager.alerts_since(self._seq, EVENT_LIMIT)
+        extras = {row: extra for row, extra in extras.items() if self._extras.get(row) != extra}
+        self._extras.update(extras)
+        events_bytes = dumps(list(events) + alerts)
+        extras_bytes = dumps({str(row): extra for row, extra in extras.items()})
+        parts = [_FRAME.pack(ts, rows.size, len(events_bytes), len(extras_bytes)), rows.astype("<u4").tobytes()]
+        parts.extend(cols[name].astype(dtype).tobytes() for name, dtype in FRAME_COLUMNS.items())
+        parts.append(events_bytes)
+        parts.append(extras_bytes)
+        self._file.write(b"".join(parts))
+        self.frames += 1
+
+    @property
+    def bytes(self) -> int:
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TimelineReader:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            prefix = f.read(_PREFIX.size)
+            if len(prefix) < _PREFIX.size:
+                raise ValueError(f"{path}: не є таймлайном")
+            magic, header_len = _PREFIX.unpack(prefix)
+            if magic != MAGIC:
+                raise ValueError(f"{path}: не є таймлайном")
+            self.header = json.loads(f.read(header_len))
+        self._start = _PREFIX.size + header_len
+
+    def frames(self) -> Iterator[Frame]:
+        columns = [(name, np.dtype(dtype)) for name, dtype in self.header["columns"].items()]
+        with open(self.path, "rb") as f:
+            f.seek(self._start)
+            while True:
+                raw = f.read(_FRAME.size)
+                if len(raw) < _FRAME.size:
+                    return
+                ts, n, events_len, extras_len = _FRAME.unpack(raw)
+                size = n * 4 + sum(n * dtype.itemsize for _, dtype in columns) + events_len + extras_len
+                body = f.read(size)
+                if len(body) < size:
+                    return
+                rows = np.frombuffer(body, dtype="<u4", count=n).astype(np.int64)
+                pos = n * 4
+                cols = {}
+                for name, dtype in columns:
+                    cols[name] = np.frombuffer(body, dtype=dtype, count=n, offset=pos)
+                    pos += n * dtype.itemsize
+                events = loads(body[pos:pos + events_len])
+                extras = {int(row): extra for row, extra in loads(body[pos + events_len:]).items()}
+                yield Frame(ts, rows, cols, events, extras)
+
+
+def run(manager: DeviceManager, clock: SimulatedClock, seconds: float, dt: float = PULSE_PERIOD,
+        injections: Sequence[Tuple[float, str]] = (), inject_every: float = 0.0,
+        writer: Optional[TimelineWriter] = None) -> dict:
+    """
+    Прогін симуляції без сервера: seconds симульованого часу кроками dt, так швидко, як дозволяє CPU.
+
+    Кожен крок — базовий тік телеметрії (з правилами, якщо їх задано) після сценаріїв,
+    чий час настав. injections — [(секунда від початку, сценарій)]; inject_every > 0 —
+    ще й випадковий сценарій кожні стільки секунд, вибраний генератором менеджера,
+    тож за сталого seed прогін повністю відтворюваний.
+    """
+    t0 = time.perf_counter()
+    start = clock.time()
+    pending = deque(sorted(injections))
+    names = sorted(SCENARIOS)
+    next_random = inject_every if inject_every > 0 else float("inf")
+    steps = int(round(seconds / dt))
+    injected = 0
+    if writer is not None:
+        writer.frame(start)
+    for _ in range(steps):
+        now = clock.advance(dt)
+        elapsed = now - start
+        due = []
+        while pending and pending[0][0] <= elapsed:
+            due.append(pending.popleft()[1])
+        while next_random <= elapsed:
+            due.append(names[manager.rng.integers(len(names))])
+            next_random += inject_every
+        for name in due:
+            getattr(manager, SCENARIOS[name])()
+        injected += len(due)
+        manager.telemetry_tick(dt=dt)
+        if writer is not None:
+            writer.frame(now, [{"type": "scenario", "name": name, "ts": now} for name in due])
+    wall = time.perf_counter() - t0
+    return {
+        "steps": steps,
+        "sim_seconds": round(steps * dt, 3),
+        "wall_seconds": round(wall, 3),
+        "speedup": round(steps * dt / wall, 1) if wall else None,
+        "injections": injected,
+        "alerts": manager.rules.seq,
+    }
+
+
+class TimelinePlayer:
+    """
+    Відтворює таймлайн у DeviceManager замість симуляції: step() застосовує наступний кадр.
+
+    Мітки часу кадрів замінюються поточним часом менеджера, тож дашборд бачить
+    запис як живий флот; у кінці файлу відтворення починається спочатку (loop).
+    """
+
+    def __init__(self, manager: DeviceManager, path: str, loop: bool = True):
+        self.manager = manager
+        self.reader = TimelineReader(path)
+        self.header = self.reader.header
+        self.loop = loop
+        self.frame = 0
+        self.loops = 0
+        self.sim_ts = None
+        self.events = deque(maxlen=100)
+        self._frames = None
+
+    @property
+    def period(self) -> float:
+        return float(self.header["dt"])
+
+    def start(self):
+        # флот із заголовка; значення колонок прийдуть першим кадром
+        self.manager.restore_state(0, {}, self.header["devices"], [tuple(link) for link in self.header["links"]])
+        self._frames = self.reader.frames()
+        self.frame = 0
+
+    def step(self) -> bool:
+        if self._frames is None:
+            self.start()
+        frame = next(self._frames, None)
+        if frame is None:
+            if not self.loop:
+                return False
+            self.loops += 1
+            self.start()
+            frame = next(self._frames, None)
+            if frame is None:
+                return False
+        self.manager.apply_frame(self.manager.clock.time(), frame.rows, frame.columns, frame.extras)
+        self.events.extend(frame.events)
+        self.sim_ts = frame.ts
+        self.frame += 1
+        return True
+
+    def stats(self) -> dict:
+        return {"path": self.reader.path, "frame": self.frame, "loops": self.loops, "sim_ts": self.sim_ts,
+                "dt": self.period, "seed": self.header.get("seed"), "events": list(self.events)}
+
+
+def _injection(value: str) -> Tuple[float, str]:
+    name, _, at = value.partition("@")
+    if name not in SCENARIOS or not at:
+        raise argparse.ArgumentTypeError(f"очікується сценарій@секунда, сценарій — один з {', '.join(SCENARIOS)}")
+    return float(at), name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Прогін симуляції швидше за реальний час із записом таймлайну.")
+    parser.add_argument("--out", required=True, help="файл таймлайну для REPLAY_PATH")
+    parser.add_argument("--seconds", type=float, default=3600.0, help="тривалість у симульованих секундах")
+    parser.add_argument("--dt", type=float, default=PULSE_PERIOD, help="період базового тіку, с")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--start", type=float, default=1704067200.0, help="початковий час симуляції (unix)")
+    parser.add_argument("--devices", type=int, default=0, help="скільки синтетичних пристроїв додати до демо-флоту")
+    parser.add_argument("--inject", type=_injection, action="append", default=[],
+                        help="сценарій@секунда, напр. cascade@600 (можна повторювати)")
+    parser.add_argument("--inject-every", type=float, default=0.0, help="випадковий сценарій кожні N секунд")
+    parser.add_argument("--rules", default="", help="JSON-файл правил, як RULES_PATH")
+    args = parser.parse_args()
+
+    clock = SimulatedClock(args.start)
+    manager = DeviceManager(history_retention=1, clock=clock, seed=args.seed)
+    manager.seed_sample()
+    kinds = ("power", "substation", "transport", "defense")
+    for i in range(args.devices):
+        kind = kinds[i % len(kinds)]
+        manager.add(Device(f"{kind}-{i}", kind, f"Об'єкт {i}", f"Район {i % 100}", "Симуляція"))
+    if args.rules:
+        with open(args.rules, encoding="utf-8") as f:
+            manager.set_rules([Rule.from_dict(item) for item in json.load(f)])
+    with TimelineWriter(manager, args.out, dt=args.dt, seed=args.seed, start=args.start) as writer:
+        result = run(manager, clock, args.seconds, args.dt, args.inject, args.inject_every, writer)
+        result.update(frames=writer.frames, bytes=writer.bytes, devices=len(manager.devices))
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Навантажувальний бенчмарк API операційного центру.
+
+Піднімає застосунок з app/main.py у цьому ж процесі (через ASGI-транспорт httpx
+або локальний uvicorn), засіває N синтетичних пристроїв через DeviceManager.add
+і ганяє конкурентних клієнтів по суміші /api/devices, /api/command,
+/api/adjust_power та / — поки працює пульс телеметрії. Результат — JSON з
+пропускною здатністю, p50/p95/p99 по кожному ендпоінту та часом очікування
+блокування менеджера, придатний для порівняння між комітами.
+
+    python bench/api_load.py --devices 10000 --clients 16 --seconds 10
+    python bench/api_load.py --transport http --mix devices=8,command=1,adjust_power=1,index=0
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(os.path.dirname(BENCH_DIR), "app")
+sys.path.insert(0, APP_DIR)
+
+from lock_contention import percentiles, seed  # noqa: E402
+
+DEFAULT_MIX = "devices=6,command=1,adjust_power=1,index=1"
+
+
+def parse_mix(spec: str):
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {"devices", "command", "adjust_power", "index"}
+    if unknown:
+        raise SystemExit(f"Невідомі ендпоінти в --mix: {', '.join(sorted(unknown))}")
+    return {name: w for name, w in mix.items() if w > 0}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def instrument_lock(manager):
+    """Підміняє manager.lock на RWLock, що фіксує час очікування кожного захоплення."""
+    from rwlock import RWLock
+    waits = {"read": [], "write": []}
+
+    class TimedLock(RWLock):
+        def acquire_read(self):
+            t0 = time.perf_counter()
+            super().acquire_read()
+            waits["read"].append(time.perf_counter() - t0)
+
+        def acquire(self):
+            t0 = time.perf_counter()
+            super().acquire()
+            waits["write"].append(time.perf_counter() - t0)
+
+    manager.lock = TimedLock()
+    return waits
+
+
+def request_for(name, ids, token, rng):
+    headers = {"Authorization": f"Bearer {token}"}
+    if name == "devices":
+        return "GET", "/api/devices", None, None
+    if name == "index":
+        return "GET", "/", None, None
+    if name == "command":
+        body = {"action": rng.choice(("restart", "isolate")), "target": rng.choice(ids)}
+        return "POST", "/api/command", body, headers
+    body = {"device_id": rng.choice(ids), "power_level": rng.randint(0, 100)}
+    return "POST", "/api/adjust_power", body, headers
+
+
+async def drive(client, mix, ids, token, clients, seconds, seed_value):
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    latency = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    deadline = time.perf_counter() + seconds
+
+    async def worker(idx):
+        rng = random.Random(seed_value + idx)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, path, body, headers = request_for(name, ids, token, rng)
+            t0 = time.perf_counter()
+            try:
+                r = await client.request(method, path, json=body, headers=headers)
+                ok = r.status_code < 400
+            except Exception:
+                ok = False
+            latency[name].append(time.perf_counter() - t0)
+            if not ok:
+                errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(clients)))
+    return latency, errors, time.perf_counter() - started
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_asgi(app, lifespan, **kwargs):
+    import httpx
+    # ASGI-транспорт httpx не запускає lifespan — піднімаємо планувальник самі
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await drive(client, **kwargs)
+
+
+def run_http(app, **kwargs):
+    import httpx
+    import uvicorn
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    async def go():
+        limits = httpx.Limits(max_connections=kwargs["clients"])
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits) as client:
+            return await drive(client, **kwargs)
+
+    try:
+        return asyncio.run(go())
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="ендпоінт=вага через кому: devices, command, adjust_power, index")
+    parser.add_argument("--transport", choices=("asgi", "http"), default="asgi")
+    parser.add_argument("--tick-period", type=float, default=2.0, help="період пульсу телеметрії, с")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="записати JSON у файл замість stdout")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    # конфігурація застосунку — до імпорту main; стан лише в пам'яті процесу
+    os.environ["TELEMETRY_PERIOD"] = str(args.tick_period)
+    os.environ["DEVICE_STATE_PATH"] = ""
+    os.environ["SNAPSHOT_PATH"] = ""
+    os.chdir(APP_DIR)
+    import main as app_main
+
+    manager = app_main.devices
+    t0 = time.perf_counter()
+    seed(manager, args.devices)
+    seed_s = time.perf_counter() - t0
+    ids = list(manager.devices)
+    waits = instrument_lock(manager)
+
+    kwargs = dict(mix=mix, ids=ids, token=app_main.API_TOKEN, clients=args.clients,
+                  seconds=args.seconds, seed_value=args.seed)
+    if args.transport == "asgi":
+        latency, errors, elapsed = asyncio.run(run_asgi(app_main.app, app_main.lifespan, **kwargs))
+    else:
+        latency, errors, elapsed = run_http(app_main.app, **kwargs)
+
+    total = sum(len(v) for v in latency.values())
+    result = {
+        "revision": git_revision(),
+        "config": {
+            "devices": len(ids),
+            "clients": args.clients,
+            "seconds": args.seconds,
+            "mix": mix,
+            "transport": args.transport,
+            "tick_period": args.tick_period,
+        },
+        "seed_s": round(seed_s, 3),
+        "requests": total,
+        "errors": sum(errors.values()),
+        "throughput_rps": round(total / elapsed, 1),
+        "endpoints": {
+            name: {**percentiles(samples), "errors": errors[name], "rps": round(len(samples) / elapsed, 1)}
+            for name, samples in latency.items()
+        },
+        "lock_wait": {kind: percentiles(samples) for kind, samples in waits.items()},
+        "scheduler": app_main.scheduler.stats(),
+    }
+    text = json.dumps(result, indent=2, ensure_ascii=False) + "\n"
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сплеску команд керування: напряму (adjust_power) проти черги команд.
+
+W потоків безперервно регулюють потужність --hot пристроїв, R читачів тим часом
+міряють очікування read-блокування. direct — кожна команда сама бере блокування на запис;
+queue — команди йдуть у CommandQueue, applier застосовує їх пакетами, повтори зливаються.
+Результат — затримка читачів, команд за секунду і скільки разів бралося блокування на запис.
+
+    python bench/command_queue.py --devices 10000 --writers 8 --readers 4 --seconds 3
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from commands import CommandQueue, QueueFull  # noqa: E402
+from devices import DeviceManager  # noqa: E402
+from lock_contention import percentiles, seed  # noqa: E402
+
+
+def run_phase(manager: DeviceManager, mode: str, args) -> dict:
+    queue = CommandQueue(manager, bound=args.bound, batch=args.batch) if mode == "queue" else None
+    ids = list(manager.devices)[:args.hot]
+    stop = threading.Event()
+    lock_wait = [[] for _ in range(args.readers)]
+    issued = [0] * args.writers
+    rejected = [0] * args.writers
+    version = manager.version
+
+    def reader(idx):
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            with manager.lock.read():
+                t1 = time.perf_counter()
+            lock_wait[idx].append(t1 - t0)
+            time.sleep(0.0005)
+
+    def writer(idx):
+        rng = random.Random(idx)
+        while not stop.is_set():
+            device_id = ids[rng.randrange(len(ids))]
+            level = rng.randrange(10, 100)
+            if queue is None:
+                manager.adjust_power(device_id, level)
+            else:
+                try:
+                    queue.submit("set_power", device_id, level)
+                except QueueFull:
+                    rejected[idx] += 1
+                    time.sleep(0.001)
+                    continue
+            issued[idx] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    if queue is not None:
+        queue.close()
+    elapsed = time.perf_counter() - t0
+    result = {
+        "read_lock_wait": percentiles([x for xs in lock_wait for x in xs]),
+        "commands_per_s": round(sum(issued) / elapsed),
+        # кожен пакет apply_commands — одна нова версія менеджера
+        "write_lock_acquisitions": manager.version - version,
+    }
+    if queue is not None:
+        result.update(rejected=sum(rejected), coalesced=queue.stats["coalesced"], applied=queue.stats["applied"],
+                      batches=queue.stats["batches"], max_batch=queue.stats["max_batch"])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--hot", type=int, default=200, help="скільки пристроїв отримують команди")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--bound", type=int, default=1000)
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+
+    manager = DeviceManager()
+    seed(manager, args.devices)
+    result = {
+        "config": {k: getattr(args, k) for k in ("devices", "hot", "writers", "readers", "seconds", "bound", "batch")},
+        "direct": run_phase(manager, "direct", args),
+        "queue": run_phase(manager, "queue", args),
+    }
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
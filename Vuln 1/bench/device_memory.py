@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк пам'яті на один пристрій.
+
+Порівнює попередню розмітку Device (__dict__, завжди створений extra, окремі рядки
+виду/локації/ролі на кожен пристрій) з компактною (__slots__, код виду, інтерновані
+рядки, extra за потреби) на тих самих даних, а також повну ціну пристрою в
+DeviceManager разом з колонками сховища й індексами. Вимірює tracemalloc.
+
+    python bench/device_memory.py --devices 1000000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from devices import Device, DeviceManager  # noqa: E402
+from lock_contention import seed  # noqa: E402
+
+KINDS = ("power", "substation", "transport", "defense")
+
+
+class DictDevice:
+    """Розмітка Device до __slots__ — лише для порівняння."""
+
+    def __init__(self, id, kind, name, location, role):
+        self.id = id
+        self.kind = kind
+        self.name = name
+        self.location = location
+        self.role = role
+        self.extra = {}
+        self._store = None
+        self._row = -1
+        self._local = None
+
+
+def fields(i):
+    # кожен рядок — окремий об'єкт, як після розбору JSON запиту до API
+    kind = KINDS[i % len(KINDS)]
+    return f"{kind}-{i}", kind.encode().decode(), f"Об'єкт {i}", f"Район {i % 100}", "Симуляція".encode().decode()
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    keep = build()
+    elapsed = time.perf_counter() - t0
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del keep
+    return used, elapsed
+
+
+def build_objects(cls, n, with_extra):
+    def build():
+        objs = []
+        for i in range(n):
+            d = cls(*fields(i))
+            # прив'язка до рядка сховища, як після DeviceManager.add
+            d._store, d._row, d._local = None, i, None
+            if i % 100 < with_extra:
+                d.extra["note"] = "Перезапущено оператором (симуляція)"
+            objs.append(d)
+        return objs
+    return build
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--devices", type=int, default=200000)
+    parser.add_argument("--extra-percent", type=int, default=1, help="частка пристроїв з записаним extra")
+    args = parser.parse_args()
+    n = args.devices
+
+    result = {"config": {"devices": n, "extra_percent": args.extra_percent}}
+    for label, cls in (("dict_layout", DictDevice), ("slots_layout", Device)):
+        used, elapsed = measure(build_objects(cls, n, args.extra_percent))
+        result[label] = {"bytes_per_device": round(used / n, 1), "total_mb": round(used / 2 ** 20, 1),
+                         "build_s": round(elapsed, 3)}
+    result["saved_percent"] = round(100 * (1 - result["slots_layout"]["bytes_per_device"]
+                                           / result["dict_layout"]["bytes_per_device"]), 1)
+
+    def build_manager():
+        manager = DeviceManager()
+        seed(manager, n)
+        return manager
+    used, elapsed = measure(build_manager)
+    result["manager"] = {"bytes_per_device": round(used / n, 1), "total_mb": round(used / 2 ** 20, 1),
+                         "build_s": round(elapsed, 3)}
+    json.dump(result, sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк журналу команд з груповим комітом.
+
+T потоків виконують команди менеджера (restart_device) з увімкненим журналом.
+Режим async — команда не чекає на диск (як запити API); --durable — кожна команда
+чекає на свій fsync, і групування видно за кількістю комітів на запис.
+Результат — затримка команди, пропускна здатність і середній розмір групи.
+
+    python bench/journal_commit.py --threads 8 --commands 2000 --path /tmp/bench.journal
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from devices import DeviceManager  # noqa: E402
+from journal import Journal  # noqa: E402
+from lock_contention import percentiles, seed  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--path", default="/tmp/hmi-bench.journal")
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--commands", type=int, default=2000, help="команд на потік")
+    parser.add_argument("--durable", action="store_true", help="кожна команда чекає на fsync свого запису")
+    parser.add_argument("--no-fsync", action="store_true")
+    parser.add_argument("--commit-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        os.unlink(args.path)
+    manager = DeviceManager()
+    seed(manager, args.devices)
+    journal = Journal(args.path, fsync=not args.no_fsync, commit_delay=args.commit_delay)
+    manager.journal = journal
+    ids = list(manager.devices)
+    latency = [[] for _ in range(args.threads)]
+
+    def worker(idx):
+        for i in range(args.commands):
+            device_id = ids[(idx * args.commands + i) % len(ids)]
+            t0 = time.perf_counter()
+            manager.restart_device(device_id)
+            if args.durable:
+                journal.wait(journal._accepted)
+            latency[idx].append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    issued = time.perf_counter() - t0
+    journal.close()
+    total = time.perf_counter() - t0
+    records = journal.stats["records"]
+    result = {
+        "config": {k: getattr(args, k) for k in ("devices", "threads", "commands", "durable", "no_fsync",
+                                                 "commit_delay")},
+        "command": percentiles([x for per in latency for x in per]),
+        "issued_per_s": round(records / issued),
+        "durable_per_s": round(records / total),
+        "commits": journal.stats["commits"],
+        "avg_batch": round(records / max(1, journal.stats["commits"]), 1),
+        "max_batch": journal.stats["max_batch"],
+        "bytes": os.path.getsize(args.path),
+    }
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк конкуренції за DeviceManager.lock.
+
+Вимірює затримку читачів (list_devices та саме захоплення read-блокування)
+без пульсу і під час безперервного пульсу телеметрії над великим флотом.
+Результат — JSON у stdout, придатний для порівняння між комітами.
+
+    python bench/lock_contention.py --devices 100000 --readers 4 --seconds 5
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from devices import Device, DeviceManager  # noqa: E402
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    a = np.asarray(samples) * 1000.0
+    return {
+        "count": int(a.size),
+        "p50_ms": round(float(np.percentile(a, 50)), 3),
+        "p95_ms": round(float(np.percentile(a, 95)), 3),
+        "p99_ms": round(float(np.percentile(a, 99)), 3),
+        "max_ms": round(float(a.max()), 3),
+    }
+
+
+def seed(manager: DeviceManager, n: int):
+    kinds = ("power", "substation", "transport", "defense")
+    for i in range(n):
+        kind = kinds[i % len(kinds)]
+        manager.add(Device(f"{kind}-{i}", kind, f"Об'єкт {i}", f"Район {i % 100}", "Симуляція"))
+
+
+def run_phase(manager: DeviceManager, readers: int, seconds: float, pulse: bool):
+    stop = threading.Event()
+    list_latency = [[] for _ in range(readers)]
+    lock_wait = [[] for _ in range(readers)]
+    ticks = []
+
+    def reader(idx):
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            with manager.lock.read():
+                t1 = time.perf_counter()
+            lock_wait[idx].append(t1 - t0)
+            t0 = time.perf_counter()
+            manager.list_devices()
+            list_latency[idx].append(time.perf_counter() - t0)
+
+    def pulser():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            manager.telemetry_tick()
+            ticks.append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    if pulse:
+        threads.append(threading.Thread(target=pulser))
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    return {
+        "list_devices": percentiles([x for xs in list_latency for x in xs]),
+        "read_lock_wait": percentiles([x for xs in lock_wait for x in xs]),
+        "tick": percentiles(ticks),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--devices", type=int, default=100000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    manager = DeviceManager()
+    t0 = time.perf_counter()
+    seed(manager, args.devices)
+    seed_s = time.perf_counter() - t0
+
+    result = {
+        "devices": args.devices,
+        "readers": args.readers,
+        "seconds": args.seconds,
+        "seed_s": round(seed_s, 3),
+        "idle": run_phase(manager, args.readers, args.seconds, pulse=False),
+        "pulse": run_phase(manager, args.readers, args.seconds, pulse=True),
+    }
+    json.dump(result, sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк рушія правил на базовому тіку телеметрії.
+
+Засіває N пристроїв, генерує R порогових правил (половина — з обмеженням за видом)
+і вимірює тривалість telemetry_tick разом з оцінюванням правил. --storm ставить
+пороги на рівень шуму симуляції, щоб правила перемикались масово.
+
+    python bench/rules_eval.py --devices 100000 --rules 1000 --ticks 10
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from devices import DeviceManager  # noqa: E402
+from rules import Rule  # noqa: E402
+from lock_contention import percentiles, seed  # noqa: E402
+
+KINDS = ("power", "substation", "transport", "defense")
+
+
+def make_rules(count, storm, rng):
+    rules = []
+    for i in range(count):
+        metric = ("temperature", "load")[i % 2]
+        if storm:
+            value = rng.uniform(20, 30) if metric == "temperature" else rng.uniform(8, 16)
+        else:
+            value = rng.uniform(55, 70) if metric == "temperature" else rng.uniform(60, 110)
+        rules.append(Rule(f"r{i}", metric, ">", float(value), ("WARNING", "OFFLINE")[i % 2],
+                          for_ticks=int(rng.integers(1, 4)), kind=KINDS[i % 4] if i % 2 else ()))
+    return rules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--devices", type=int, default=100000)
+    parser.add_argument("--rules", type=int, default=1000)
+    parser.add_argument("--ticks", type=int, default=10)
+    parser.add_argument("--storm", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    manager = DeviceManager()
+    seed(manager, args.devices)
+    manager.set_rules(make_rules(args.rules, args.storm, np.random.default_rng(args.seed)))
+    ticks = []
+    evals = []
+    for _ in range(args.ticks):
+        t0 = time.perf_counter()
+        manager.telemetry_tick()
+        ticks.append(time.perf_counter() - t0)
+        evals.append(manager.rules.stats["last_ms"] / 1000.0)
+    engine = manager.rules
+    result = {
+        "config": {k: getattr(args, k) for k in ("devices", "rules", "ticks", "storm")},
+        "tick": percentiles(ticks),
+        "evaluate": percentiles(evals),
+        "state_mb": round((engine._active.nbytes + engine._streak.nbytes) / 2 ** 20, 1),
+        "active": engine.active_count(),
+        "events": engine.seq,
+    }
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
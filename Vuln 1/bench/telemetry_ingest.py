@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк інгесту польової телеметрії.
+
+Генерує потік зразків для N пристроїв у двох форматах (NDJSON і бінарні кадри),
+проганяє його через ті самі декодери й DeviceManager.ingest, що й
+/api/telemetry/ingest, — порціями по --chunk байт, як їх віддає сервер, — і
+паралельно з пульсом телеметрії. Результат — JSON зі зразками/с і часом
+застосування пакета (під блокуванням) по кожному формату.
+
+    python bench/telemetry_ingest.py --devices 10000 --samples 500000 --batch 5000
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from devices import DeviceManager  # noqa: E402
+from ingest import BINARY_TYPE, NDJSON_TYPE, SAMPLE, decoder_for, encode_frame  # noqa: E402
+from lock_contention import percentiles, seed  # noqa: E402
+
+
+def make_samples(ids, n, rng):
+    samples = np.zeros(n, dtype=SAMPLE)
+    samples["device"] = rng.integers(0, len(ids), n)
+    samples["ts"] = time.time() - rng.uniform(0, 5, n)
+    samples["load"] = rng.uniform(0, 120, n)
+    samples["temperature"] = rng.uniform(20, 60, n)
+    samples["power_level"] = rng.integers(0, 101, n)
+    samples["voltage"] = rng.integers(200, 241, n)
+    samples["status"] = rng.integers(0, 3, n)
+    return samples
+
+
+def ndjson_body(ids, samples) -> bytes:
+    # масивна форма рядка — компактніша за об'єкти
+    statuses = ("OK", "WARNING", "OFFLINE")
+    lines = [
+        json.dumps([ids[d], ts, round(load, 2), round(temp, 2), int(pl), int(v), statuses[st]])
+        for d, ts, load, temp, pl, v, st in samples.tolist()
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def binary_body(ids, samples, batch) -> bytes:
+    # кадр несе лише id пристроїв, що в ньому трапляються, — як і шлюз
+    frames = []
+    for i in range(0, len(samples), batch):
+        frame = samples[i:i + batch].copy()
+        used, frame["device"] = np.unique(frame["device"], return_inverse=True)
+        frames.append(encode_frame([ids[d] for d in used.tolist()], frame))
+    return b"".join(frames)
+
+
+def run(manager, content_type, body, batch, chunk, pulse_period):
+    decoder = decoder_for(content_type, batch)
+    apply_s = []
+    accepted = 0
+    stop = threading.Event()
+
+    def pulse():
+        while not stop.wait(pulse_period):
+            manager.telemetry_tick()
+
+    pulser = threading.Thread(target=pulse, daemon=True)
+    pulser.start()
+    def apply(batches):
+        nonlocal accepted
+        for b in batches:
+            t1 = time.perf_counter()
+            accepted += manager.ingest(b)["accepted"]
+            apply_s.append(time.perf_counter() - t1)
+
+    t0 = time.perf_counter()
+    try:
+        for start in range(0, len(body), chunk):
+            apply(decoder.feed(body[start:start + chunk]))
+        apply(decoder.close())
+        elapsed = time.perf_counter() - t0
+    finally:
+        stop.set()
+        pulser.join()
+    return {
+        "bytes": len(body),
+        "batches": len(apply_s),
+        "accepted": accepted,
+        "seconds": round(elapsed, 3),
+        "samples_per_s": round(accepted / elapsed),
+        "apply": percentiles(apply_s),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--samples", type=int, default=500000)
+    parser.add_argument("--batch", type=int, default=5000, help="зразків у пакеті (рядків NDJSON / кадрі)")
+    parser.add_argument("--chunk", type=int, default=65536, help="розмір порції тіла запиту, байт")
+    parser.add_argument("--pulse-period", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    manager = DeviceManager()
+    seed(manager, args.devices)
+    ids = list(manager.devices)
+    samples = make_samples(ids, args.samples, np.random.default_rng(args.seed))
+    bodies = {
+        "ndjson": (NDJSON_TYPE, ndjson_body(ids, samples)),
+        "binary": (BINARY_TYPE, binary_body(ids, samples, args.batch)),
+    }
+    result = {
+        "config": {k: getattr(args, k) for k in ("devices", "samples", "batch", "chunk", "pulse_period")},
+        "formats": {
+            name: run(manager, content_type, body, args.batch, args.chunk, args.pulse_period)
+            for name, (content_type, body) in bodies.items()
+        },
+    }
+    json.dump(result, sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+from devices import DeviceManager
+
+
+def test_bulk_shutdown_updates_whole_fleet_in_one_change():
+    manager = DeviceManager()
+    manager.seed_sample()
+    version = manager.version
+    loads = {d.id: d.load for d in manager.devices.values()}
+    results = manager.bulk_command("shutdown", note="test")
+    assert len(results) == len(loads)
+    assert manager.version == version + 1
+    for d in manager.devices.values():
+        assert d.status == "OFFLINE"
+        assert d.load == max(0.0, loads[d.id] - 30.0)
+        assert d.extra["shutdown_note"] == "test"
@@ -0,0 +1,21 @@
+import threading
+
+from commands import CommandQueue
+from devices import DeviceManager
+
+
+def test_coalesced_command_moves_behind_later_commands():
+    manager = DeviceManager()
+    manager.seed_sample()
+    queue = CommandQueue(manager)
+    # applier зайнятий: команди накопичуються в черзі
+    release = threading.Event()
+    queue.submit("blocker", fn=lambda: release.wait(5) and {"status": "ok"})
+    queue.submit("isolate", "pp-1")
+    queue.submit("restart", "pp-1")
+    command_id, _ = queue.submit("isolate", "pp-1")
+    release.set()
+    queue.close()
+    assert queue.get(command_id).status == "done"
+    # остання команда оператора — isolate
+    assert manager.get("pp-1").status == "DEGRADED"
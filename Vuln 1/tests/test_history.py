@@ -0,0 +1,16 @@
+from devices import Device, DeviceManager
+from history import TelemetryHistory
+
+
+def test_swap_remove_from_row_beyond_capacity_clears_history():
+    manager = DeviceManager(history=TelemetryHistory(retention=8, capacity=2))
+    manager.add(Device("a", "power", "A", "L", "R"))
+    manager.add(Device("b", "power", "B", "L", "R"))
+    manager.telemetry_tick()
+    assert manager.history_of("a")[0].size == 1
+    # рядок 2 — поза capacity історії: тіку після додавання ще не було
+    manager.add(Device("c", "power", "C", "L", "R"))
+    manager.remove("a")
+    # c переїхав у рядок 0 і не успадковує історію видаленого a
+    assert manager.get("c")._row == 0
+    assert manager.history_of("c")[0].size == 0
@@ -0,0 +1,30 @@
+from devices import Device, DeviceManager
+from rules import Rule
+
+
+def _manager():
+    manager = DeviceManager()
+    manager.add(Device("pp-1", "power", "PP 1", "L", "R"))
+    manager.set_rules([Rule("hot", "power_level", ">", 100, "DEGRADED")])
+    return manager
+
+
+def test_rule_clearing_reverts_its_own_status():
+    manager = _manager()
+    manager.adjust_power("pp-1", 150)
+    manager.telemetry_tick()
+    assert manager.get("pp-1").status == "DEGRADED"
+    manager.adjust_power("pp-1", 50)
+    manager.telemetry_tick()
+    assert manager.get("pp-1").status == "OK"
+
+
+def test_operator_isolate_survives_rule_clearing():
+    manager = _manager()
+    manager.adjust_power("pp-1", 150)
+    manager.telemetry_tick()
+    manager.isolate_device("pp-1")
+    manager.adjust_power("pp-1", 50)
+    manager.telemetry_tick()
+    # правило знялось, але ізоляцію виставив оператор, а не рушій
+    assert manager.get("pp-1").status == "DEGRADED"
@@ -0,0 +1,20 @@
+import logging
+
+import snapshot
+
+
+def test_load_missing_file_is_cold_start(tmp_path):
+    assert snapshot.load(str(tmp_path / "missing.snap")) is None
+
+
+def test_load_unreadable_path_is_cold_start(tmp_path, caplog):
+    # каталог замість файлу: IsADirectoryError, як і PermissionError, — холодний старт
+    with caplog.at_level(logging.WARNING, logger="snapshot"):
+        assert snapshot.load(str(tmp_path)) is None
+    assert "не відкрито" in caplog.text
+
+
+def test_load_empty_file_is_cold_start(tmp_path):
+    path = tmp_path / "empty.snap"
+    path.write_bytes(b"")
+    assert snapshot.load(str(path)) is None
@@ -0,0 +1,17 @@
+import numpy as np
+
+from store import ColumnarStore
+
+
+def test_tick_values_leave_store_untouched_until_applied():
+    store = ColumnarStore()
+    for _ in range(100):
+        store.append()
+    before = {name: store.column(name).copy() for name in ("load", "temperature", "status")}
+    values = store.tick_values(np.random.default_rng(1), dt=200.0)
+    for name, column in before.items():
+        assert np.array_equal(store.column(name), column)
+    store.apply_tick(values, now=123.0)
+    for name, column in values.items():
+        assert np.array_equal(store.column(name), column)
+    assert (store.column("last_seen") == 123.0).all()
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import List, Optional, Tuple
+
+from app.database.database import DatabaseManager
+from config.settings import settings
+
+
+class AsyncDatabaseManager:
+    """
+    Асинхронный доступ к DatabaseManager для async-маршрутов.
+
+    Запросы SQLite выполняются в отдельном пуле потоков, а не в event loop,
+    поэтому медленный запрос не останавливает остальные запросы воркера.
+    Каждый поток пула берёт соединение из пула DatabaseManager; при workers не больше
+    размера пула соединений у каждого потока фактически своё соединение.
+    workers=0 — синхронный вызов прямо в event loop, как было раньше.
+    Пул потоков создаётся при первом запросе и заново после close(), поэтому общий
+    менеджер (get_database) переживает несколько запусков приложения в одном процессе.
+    """
+
+    def __init__(self, db: DatabaseManager, workers: int = settings.DB_EXECUTOR_WORKERS):
+        self.db = db
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="db")
+            return self._executor
+
+    async def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        executor = self._executor or self._get_executor()
+        return await asyncio.get_running_loop().run_in_executor(executor, partial(fn, *args))
+
+    def close(self):
+        """Дожидается запросов в потоках и закрывает их пул и свободные соединения; менеджер остаётся рабочим"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self.db.pool.close()
+
+    async def get_all_stations(self) -> List[Tuple]:
+        return await self._run(self.db.get_all_stations)
+
+    async def get_all_consumption(self) -> List[Tuple]:
+        return await self._run(self.db.get_all_consumption)
+
+    async def get_all_alerts(self) -> List[Tuple]:
+        return await self._run(self.db.get_all_alerts)
+
+    async def search_stations_vulnerable(self, query: str) -> List[Tuple]:
+        return await self._run(self.db.search_stations_vulnerable, query)
+
+    async def search_with_sql_injection(self, query: str) -> List[Tuple]:
+        return await self._run(self.db.search_with_sql_injection, query)
+
+    async def search_stations(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Tuple], bool, bool]:
+        return await self._run(self.db.search_stations, query, limit, offset)
+
+    async def get_system_flag(self, flag_name: str) -> Optional[str]:
+        return await self._run(self.db.get_system_flag, flag_name)
+
+    async def get_database_schema(self) -> dict:
+        return await self._run(self.db.get_database_schema)
+
+    async def get_system_statistics(self) -> dict:
+        return await self._run(self.db.get_system_statistics)
+
+
+@lru_cache(maxsize=None)
+def get_database() -> AsyncDatabaseManager:
+    """Общий менеджер базы settings.get_database_path() для всех маршрутов: одна миграция и один пул на процесс"""
+    return AsyncDatabaseManager(DatabaseManager(settings.get_database_path()))
@@ -1,7 +1,201 @@
 import sqlite3
 import os
+import re
+import time
+from contextlib import contextmanager
+from html import escape
 from typing import List, Tuple, Optional
 from app.models.energy_models import PowerStation, EnergyConsumption, SystemAlert
+from app.database.pool import ConnectionPool
+from app.metrics import DB_BUCKETS, REGISTRY, Counter, Histogram
+from config.settings import settings
+
+DB_CONNECT_SECONDS = REGISTRY.register(Histogram(
+    "energy_db_connect_seconds", "Время открытия соединения SQLite", (), DB_BUCKETS))
+DB_QUERY_SECONDS = REGISTRY.register(Histogram(
+    "energy_db_query_seconds", "Время выполнения SQL-запроса (execute)", ("statement",), DB_BUCKETS))
+DB_QUERY_ERRORS = REGISTRY.register(Counter(
+    "energy_db_query_errors_total", "SQL-запросы, завершившиеся ошибкой", ("statement",)))
+
+# метка statement — только первое ключевое слово, чтобы произвольный SQL не раздувал число серий
+_STATEMENTS = {"SELECT", "INSERT", "UPDATE", "DELETE", "CREATE", "PRAGMA"}
+
+
+def _statement(sql: str) -> str:
+    word = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    return word if word in _STATEMENTS else "OTHER"
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Курсор, замеряющий время каждого execute для /metrics"""
+
+    def execute(self, sql, parameters=()):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        except Exception:
+            DB_QUERY_ERRORS.inc(_statement(sql))
+            raise
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - t0, _statement(sql))
+
+
+class TimedConnection(sqlite3.Connection):
+    """Соединение, по умолчанию выдающее TimedCursor"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+# Триггеры, поддерживающие system_stats: каждое изменение станций, потребления
+# и уведомлений сразу поправляет счётчики и суммы в той же транзакции
+STATS_TRIGGERS = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS stats_stations_insert AFTER INSERT ON power_stations BEGIN
+        UPDATE system_stats SET
+            total_stations = total_stations + 1,
+            active_stations = active_stations + (NEW.status = 'Active'),
+            total_capacity = total_capacity + NEW.capacity_mw
+        WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS stats_stations_delete AFTER DELETE ON power_stations BEGIN
+        UPDATE system_stats SET
+            total_stations = total_stations - 1,
+            active_stations = active_stations - (OLD.status = 'Active'),
+            total_capacity = total_capacity - OLD.capacity_mw
+        WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS stats_stations_update AFTER UPDATE OF status, capacity_mw ON power_stations BEGIN
+        UPDATE system_stats SET
+            active_stations = active_stations + (NEW.status = 'Active') - (OLD.status = 'Active'),
+            total_capacity = total_capacity + NEW.capacity_mw - OLD.capacity_mw
+        WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS stats_consumption_insert AFTER INSERT ON energy_consumption BEGIN
+        UPDATE system_stats SET total_consumption = total_consumption + NEW.consumption_mwh WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS stats_consumption_delete AFTER DELETE ON energy_consumption BEGIN
+        UPDATE system_stats SET total_consumption = total_consumption - OLD.consumption_mwh WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS stats_consumption_update AFTER UPDATE OF consumption_mwh ON energy_consumption BEGIN
+        UPDATE system_stats SET total_consumption = total_consumption + NEW.consumption_mwh - OLD.consumption_mwh
+        WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS stats_alerts_insert AFTER INSERT ON system_alerts BEGIN
+        UPDATE system_stats SET total_alerts = total_alerts + 1 WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS stats_alerts_delete AFTER DELETE ON system_alerts BEGIN
+        UPDATE system_stats SET total_alerts = total_alerts - 1 WHERE id = 1;
+    END
+    ''',
+)
+
+# Полнотекстовый поиск: FTS5-индекс над name, location и operator станций (external content —
+# текст хранится только в power_stations), синхронизируется триггерами
+SEARCH_TRIGGERS = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS power_stations_fts_insert AFTER INSERT ON power_stations BEGIN
+        INSERT INTO power_stations_fts (rowid, name, location, operator)
+        VALUES (NEW.id, NEW.name, NEW.location, NEW.operator);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS power_stations_fts_delete AFTER DELETE ON power_stations BEGIN
+        INSERT INTO power_stations_fts (power_stations_fts, rowid, name, location, operator)
+        VALUES ('delete', OLD.id, OLD.name, OLD.location, OLD.operator);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS power_stations_fts_update AFTER UPDATE OF name, location, operator ON power_stations
+    BEGIN
+        INSERT INTO power_stations_fts (power_stations_fts, rowid, name, location, operator)
+        VALUES ('delete', OLD.id, OLD.name, OLD.location, OLD.operator);
+        INSERT INTO power_stations_fts (rowid, name, location, operator)
+        VALUES (NEW.id, NEW.name, NEW.location, NEW.operator);
+    END
+    ''',
+)
+
+# Маркеры подсветки совпадений в результатах search_stations (см. highlight_html)
+HIGHLIGHT_OPEN = "\x02"
+HIGHLIGHT_CLOSE = "\x03"
+# Веса bm25: совпадение в названии важнее, чем в местоположении, а то — чем в операторе
+SEARCH_SQL = f'''
+    SELECT s.id, s.name, s.location, s.capacity_mw, s.status, s.operator, s.created_at,
+           highlight(power_stations_fts, 0, '{HIGHLIGHT_OPEN}', '{HIGHLIGHT_CLOSE}'),
+           highlight(power_stations_fts, 1, '{HIGHLIGHT_OPEN}', '{HIGHLIGHT_CLOSE}'),
+           highlight(power_stations_fts, 2, '{HIGHLIGHT_OPEN}', '{HIGHLIGHT_CLOSE}'),
+           bm25(power_stations_fts, 10.0, 5.0, 1.0) AS rank
+    FROM power_stations_fts
+    JOIN power_stations s ON s.id = power_stations_fts.rowid
+    WHERE power_stations_fts MATCH ? AND power_stations_fts.rowid >= ?
+    ORDER BY rank
+    LIMIT ? OFFSET ?
+'''
+# граница окна ранжирования: rowid совпадения, следующего за window самыми новыми (нет строки — окно не нужно)
+SEARCH_WINDOW_SQL = '''
+    SELECT rowid FROM power_stations_fts WHERE power_stations_fts MATCH ?
+    ORDER BY rowid DESC LIMIT 1 OFFSET ?
+'''
+SEARCH_MAX_TERMS = 8
+
+
+def fts_query(text: str) -> str:
+    """Пользовательский ввод -> выражение MATCH: каждое слово — префикс в кавычках, слова через AND"""
+    terms = re.findall(r"\w+", text)[:SEARCH_MAX_TERMS]
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def highlight_html(text: str) -> str:
+    """Подсвеченное поле результата поиска -> HTML: текст экранирован, совпадения в <mark>"""
+    return escape(text or "").replace(HIGHLIGHT_OPEN, "<mark>").replace(HIGHLIGHT_CLOSE, "</mark>")
+
+# Тестовые данные, добавляемые один раз при создании базы
+# Estonian Power Stations
+TEST_STATIONS = [
+    ("Eesti Energia Narva Power Plants", "Narva", 1800.0, "Active", "Eesti Energia"),
+    ("Iru Power Plant", "Tallinn", 1200.0, "Active", "Eesti Energia"),
+    ("Auvere Power Plant", "Narva", 300.0, "Active", "Eesti Energia"),
+    ("Balti Power Plant", "Narva", 1500.0, "Active", "Eesti Energia"),
+    ("Keila-Joa Hydroelectric Plant", "Keila-Joa", 1.2, "Active", "Eesti Energia"),
+    ("Kunda Cement Plant", "Kunda", 50.0, "Active", "Kunda Nordic Tsement"),
+    ("Tallinn Combined Heat and Power", "Tallinn", 200.0, "Active", "Tallinna Küte"),
+    ("Tartu District Heating", "Tartu", 150.0, "Active", "Tartu Energia")
+]
+
+# Estonian Energy Consumption by Counties
+TEST_CONSUMPTION = [
+    ("Harju County", 2500.5),
+    ("Tartu County", 1800.3),
+    ("Ida-Viru County", 2200.7),
+    ("Pärnu County", 1200.2),
+    ("Lääne-Viru County", 900.1),
+    ("Viljandi County", 800.8),
+    ("Saare County", 600.4),
+    ("Võru County", 500.9)
+]
+
+# Estonian System Alerts
+TEST_ALERTS = [
+    ("Warning", "High network load in Harju County", "Medium"),
+    ("Information", "Scheduled maintenance on 330kV line Tallinn-Narva", "Low"),
+    ("Critical", "Emergency shutdown of substation #15 in Tartu", "High"),
+    ("Information", "Completion of scheduled maintenance at Iru Power Plant", "Low"),
+    ("Warning", "Increased consumption during peak hours in Tallinn", "Medium")
+]
 
 def read_flag():
     """Читает флаг из файла"""
@@ -23,18 +217,48 @@ def read_flag():
 class DatabaseManager:
     """Менеджер базы данных для системы управления энергосистемой"""
     
-    def __init__(self, db_path: str = "energy_system.db"):
+    def __init__(self, db_path: str = "energy_system.db", pool_size: int = settings.DB_POOL_SIZE,
+                 pool_timeout: float = settings.DB_POOL_TIMEOUT):
         self.db_path = db_path
+        self.pool = ConnectionPool(self.get_connection, size=pool_size, timeout=pool_timeout)
         self.init_database()
     
     def get_connection(self):
-        """Получить соединение с базой данных"""
-        return sqlite3.connect(self.db_path)
+        """Открыть новое соединение с базой данных (методы менеджера берут соединения из пула, см. connection)"""
+        t0 = time.perf_counter()
+        # соединение переходит между потоками пула, но в каждый момент принадлежит одному
+        conn = sqlite3.connect(self.db_path, factory=TimedConnection, check_same_thread=False,
+                               cached_statements=256)
+        DB_CONNECT_SECONDS.observe(time.perf_counter() - t0)
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        """Соединение из пула на время блока: commit при успехе, rollback при исключении"""
+        with self.pool.connection() as conn:
+            yield conn
     
     def init_database(self):
-        """Инициализация базы данных и создание таблиц"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """
+        Миграция базы до последней версии схемы (len(MIGRATIONS)). На актуальной базе это
+        одно чтение PRAGMA user_version, поэтому запуск не зависит от объёма данных.
+        """
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA user_version")
+            if cursor.fetchone()[0] >= len(self.MIGRATIONS):
+                return
+            # BEGIN IMMEDIATE: одновременно стартующие процессы мигрируют по очереди,
+            # версия перечитывается уже под блокировкой записи
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("PRAGMA user_version")
+            version = cursor.fetchone()[0]
+            for number, migrate in enumerate(self.MIGRATIONS[version:], version + 1):
+                migrate(self, cursor)
+                cursor.execute(f"PRAGMA user_version = {number}")
+    
+    def _create_tables(self, cursor):
+        """Миграция 1: создание таблиц и тестовых данных"""
         
         # Создание таблиц
         cursor.execute('''
@@ -78,116 +302,135 @@ class DatabaseManager:
             )
         ''')
         
-        # Добавление тестовых данных
-        self._insert_test_data(cursor)
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM power_stations)")
+        if cursor.fetchone()[0]:
+            # база, созданная до версионирования: тестовые данные уже есть, убираем их повторы
+            self._dedupe_test_data(cursor)
+            self._insert_flag(cursor)
+        else:
+            # Добавление тестовых данных
+            self._insert_test_data(cursor)
+    
+    def _create_statistics(self, cursor):
+        """Миграция 2: таблица system_stats (одна строка) и триггеры, поддерживающие её при изменении данных"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS system_stats (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                total_stations INTEGER NOT NULL DEFAULT 0,
+                active_stations INTEGER NOT NULL DEFAULT 0,
+                total_capacity REAL NOT NULL DEFAULT 0,
+                total_consumption REAL NOT NULL DEFAULT 0,
+                total_alerts INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
         
-        conn.commit()
-        conn.close()
+        # Начальные значения — полным пересчётом, один раз при миграции
+        cursor.execute('''
+            INSERT OR IGNORE INTO system_stats
+                (id, total_stations, active_stations, total_capacity, total_consumption, total_alerts)
+            SELECT 1,
+                (SELECT COUNT(*) FROM power_stations),
+                (SELECT COUNT(*) FROM power_stations WHERE status = 'Active'),
+                (SELECT COALESCE(SUM(capacity_mw), 0) FROM power_stations),
+                (SELECT COALESCE(SUM(consumption_mwh), 0) FROM energy_consumption),
+                (SELECT COUNT(*) FROM system_alerts)
+        ''')
+        
+        for trigger in STATS_TRIGGERS:
+            cursor.execute(trigger)
+    
+    def _create_search_index(self, cursor):
+        """Миграция 3: FTS5-индекс станций для search_stations и триггеры синхронизации"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'power_stations_fts'")
+        exists = cursor.fetchone() is not None
+        # prefix — отдельные индексы 2-4-символьных префиксов: запрос "нар*" не сливает списки всех слов на "нар"
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS power_stations_fts USING fts5(
+                name, location, operator,
+                content='power_stations', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+            )
+        ''')
+        if not exists:
+            # база уже со станциями: индексируем их один раз
+            cursor.execute("INSERT INTO power_stations_fts (power_stations_fts) VALUES ('rebuild')")
+        for trigger in SEARCH_TRIGGERS:
+            cursor.execute(trigger)
     
     def _insert_test_data(self, cursor):
         """Добавление тестовых данных"""
-        # Estonian Power Stations
-        stations = [
-            ("Eesti Energia Narva Power Plants", "Narva", 1800.0, "Active", "Eesti Energia"),
-            ("Iru Power Plant", "Tallinn", 1200.0, "Active", "Eesti Energia"),
-            ("Auvere Power Plant", "Narva", 300.0, "Active", "Eesti Energia"),
-            ("Balti Power Plant", "Narva", 1500.0, "Active", "Eesti Energia"),
-            ("Keila-Joa Hydroelectric Plant", "Keila-Joa", 1.2, "Active", "Eesti Energia"),
-            ("Kunda Cement Plant", "Kunda", 50.0, "Active", "Kunda Nordic Tsement"),
-            ("Tallinn Combined Heat and Power", "Tallinn", 200.0, "Active", "Tallinna Küte"),
-            ("Tartu District Heating", "Tartu", 150.0, "Active", "Tartu Energia")
-        ]
-        
-        for station in stations:
-            cursor.execute('''
-                INSERT OR IGNORE INTO power_stations (name, location, capacity_mw, status, operator)
-                VALUES (?, ?, ?, ?, ?)
-            ''', station)
-        
-        # Estonian Energy Consumption by Counties
-        consumption_data = [
-            ("Harju County", 2500.5),
-            ("Tartu County", 1800.3),
-            ("Ida-Viru County", 2200.7),
-            ("Pärnu County", 1200.2),
-            ("Lääne-Viru County", 900.1),
-            ("Viljandi County", 800.8),
-            ("Saare County", 600.4),
-            ("Võru County", 500.9)
-        ]
-        
-        for data in consumption_data:
-            cursor.execute('''
-                INSERT OR IGNORE INTO energy_consumption (region, consumption_mwh)
-                VALUES (?, ?)
-            ''', data)
-        
-        # Estonian System Alerts
-        alerts = [
-            ("Warning", "High network load in Harju County", "Medium"),
-            ("Information", "Scheduled maintenance on 330kV line Tallinn-Narva", "Low"),
-            ("Critical", "Emergency shutdown of substation #15 in Tartu", "High"),
-            ("Information", "Completion of scheduled maintenance at Iru Power Plant", "Low"),
-            ("Warning", "Increased consumption during peak hours in Tallinn", "Medium")
-        ]
-        
-        for alert in alerts:
-            cursor.execute('''
-                INSERT OR IGNORE INTO system_alerts (alert_type, message, severity)
-                VALUES (?, ?, ?)
-            ''', alert)
-        
-        # System Flag
+        cursor.executemany('''
+            INSERT INTO power_stations (name, location, capacity_mw, status, operator)
+            VALUES (?, ?, ?, ?, ?)
+        ''', TEST_STATIONS)
+        cursor.executemany('''
+            INSERT INTO energy_consumption (region, consumption_mwh)
+            VALUES (?, ?)
+        ''', TEST_CONSUMPTION)
+        cursor.executemany('''
+            INSERT INTO system_alerts (alert_type, message, severity)
+            VALUES (?, ?, ?)
+        ''', TEST_ALERTS)
+        self._insert_flag(cursor)
+    
+    def _insert_flag(self, cursor):
+        """Системный флаг"""
         system_flag = read_flag()
         cursor.execute('''
             INSERT OR IGNORE INTO system_flags (flag_name, flag_value, description)
             VALUES (?, ?, ?)
         ''', ("TASK_COMPLETED", system_flag, "Estonian Energy System Management Task Completion Flag"))
     
+    def _dedupe_test_data(self, cursor):
+        """Удаление копий тестовых данных, которые до версионирования добавлялись при каждом запуске"""
+        for table, columns, rows in (
+            ("power_stations", ("name", "location", "capacity_mw", "status", "operator"), TEST_STATIONS),
+            ("energy_consumption", ("region", "consumption_mwh"), TEST_CONSUMPTION),
+            ("system_alerts", ("alert_type", "message", "severity"), TEST_ALERTS),
+        ):
+            where = " AND ".join(f"{column} = ?" for column in columns)
+            cursor.executemany(
+                f"DELETE FROM {table} WHERE {where} AND id > (SELECT MIN(id) FROM {table} WHERE {where})",
+                [row + row for row in rows])
+    
+    # Миграции схемы: MIGRATIONS[i] переводит базу с PRAGMA user_version = i на i + 1.
+    # Изменения схемы добавляются только новой функцией в конец
+    MIGRATIONS = (_create_tables, _create_statistics, _create_search_index)
+    
     def get_all_stations(self) -> List[Tuple]:
         """Получить все электростанции"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM power_stations ORDER BY name")
-        results = cursor.fetchall()
-        conn.close()
-        return results
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM power_stations ORDER BY name")
+            return cursor.fetchall()
     
     def get_all_consumption(self) -> List[Tuple]:
         """Получить все данные потребления"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM energy_consumption ORDER BY consumption_mwh DESC")
-        results = cursor.fetchall()
-        conn.close()
-        return results
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM energy_consumption ORDER BY consumption_mwh DESC")
+            return cursor.fetchall()
     
     def get_all_alerts(self) -> List[Tuple]:
         """Получить все уведомления"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM system_alerts ORDER BY timestamp DESC")
-        results = cursor.fetchall()
-        conn.close()
-        return results
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM system_alerts ORDER BY timestamp DESC")
+            return cursor.fetchall()
     
     def search_stations_vulnerable(self, query: str) -> List[Tuple]:
         """
         УЯЗВИМЫЙ МЕТОД: Поиск станций с SQL injection уязвимостью
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         # УЯЗВИМОСТЬ: Прямая подстановка без экранирования
         sql_query = f"SELECT * FROM power_stations WHERE name LIKE '%{query}%' OR location LIKE '%{query}%'"
         
         try:
-            cursor.execute(sql_query)
-            results = cursor.fetchall()
-            conn.close()
-            return results
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql_query)
+                return cursor.fetchall()
         except Exception as e:
-            conn.close()
             # Возвращаем информативную ошибку для SQL injection
             error_msg = str(e)
             if "UNION" in error_msg and "columns" in error_msg:
@@ -206,77 +449,78 @@ class DatabaseManager:
         """
         УЯЗВИМЫЙ МЕТОД: Поиск с SQL injection для получения флага
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         # УЯЗВИМОСТЬ: Прямая подстановка без экранирования
         sql_query = f"SELECT * FROM power_stations WHERE name LIKE '%{query}%' OR location LIKE '%{query}%'"
         
-        try:
+        with self.connection() as conn:
+            cursor = conn.cursor()
             cursor.execute(sql_query)
-            results = cursor.fetchall()
-            conn.close()
-            return results
-        except Exception as e:
-            conn.close()
-            raise e
+            return cursor.fetchall()
+    
+    def search_stations(self, query: str, limit: int = 20, offset: int = 0,
+                        window: int = settings.SEARCH_RANK_WINDOW) -> Tuple[List[Tuple], bool, bool]:
+        """
+        Безопасный поиск станций по FTS5-индексу: параметризованный запрос, слова ищутся
+        как префиксы, результаты ранжированы по bm25. Строка результата — поля станции,
+        подсвеченные name, location, operator (маркеры HIGHLIGHT_*) и rank.
+        Ранжирование стоит порядка числа совпадений, поэтому при больше чем window совпадениях
+        ранжируются (и листаются) только window самых новых из них — более старая, но более
+        релевантная станция тогда не попадёт в выдачу, о чём говорит флаг truncated; window=0 — все.
+        Возвращает (строки страницы, есть ли следующая страница, truncated).
+        """
+        match = fts_query(query)
+        if not match:
+            return [], False, False
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            floor = 0
+            if window > 0:
+                cursor.execute(SEARCH_WINDOW_SQL, (match, window))
+                row = cursor.fetchone()
+                floor = row[0] + 1 if row else 0
+            cursor.execute(SEARCH_SQL, (match, floor, limit + 1, offset))
+            rows = cursor.fetchall()
+        return rows[:limit], len(rows) > limit, floor > 0
     
     def get_system_flag(self, flag_name: str) -> Optional[str]:
         """Получить системный флаг"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT flag_value FROM system_flags WHERE flag_name = ?", (flag_name,))
-        result = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT flag_value FROM system_flags WHERE flag_name = ?", (flag_name,))
+            result = cursor.fetchone()
         return result[0] if result else None
     
     def get_database_schema(self) -> dict:
         """Получить схему базы данных для SQL injection"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Получаем информацию о таблицах
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = [row[0] for row in cursor.fetchall()]
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            # Получаем информацию о таблицах
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            tables = [row[0] for row in cursor.fetchall()]
+            
+            schema = {}
+            for table in tables:
+                cursor.execute(f"PRAGMA table_info({table})")
+                columns = cursor.fetchall()
+                schema[table] = [col[1] for col in columns]
         
-        schema = {}
-        for table in tables:
-            cursor.execute(f"PRAGMA table_info({table})")
-            columns = cursor.fetchall()
-            schema[table] = [col[1] for col in columns]
-        
-        conn.close()
         return schema
     
     def get_system_statistics(self) -> dict:
-        """Получить статистику системы"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Статистика станций
-        cursor.execute("SELECT COUNT(*) FROM power_stations")
-        total_stations = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM power_stations WHERE status = 'Active'")
-        active_stations = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT SUM(capacity_mw) FROM power_stations")
-        total_capacity = cursor.fetchone()[0] or 0
-        
-        # Статистика потребления
-        cursor.execute("SELECT SUM(consumption_mwh) FROM energy_consumption")
-        total_consumption = cursor.fetchone()[0] or 0
-        
-        # Статистика уведомлений
-        cursor.execute("SELECT COUNT(*) FROM system_alerts")
-        total_alerts = cursor.fetchone()[0]
-        
-        conn.close()
+        """Получить статистику системы (одна строка system_stats, не зависит от размера таблиц)"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT total_stations, active_stations, total_capacity, total_consumption, total_alerts
+                FROM system_stats WHERE id = 1
+            ''')
+            row = cursor.fetchone()
         
         return {
-            "total_stations": total_stations,
-            "active_stations": active_stations,
-            "total_capacity": total_capacity,
-            "total_consumption": total_consumption,
-            "total_alerts": total_alerts
+            "total_stations": row[0],
+            "active_stations": row[1],
+            "total_capacity": row[2],
+            "total_consumption": row[3],
+            "total_alerts": row[4]
         }
@@ -0,0 +1,140 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List
+
+from app.metrics import DB_BUCKETS, REGISTRY, Histogram
+
+DB_POOL_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "energy_db_pool_wait_seconds", "Ожидание свободного соединения в пуле SQLite", (), DB_BUCKETS))
+
+
+class PoolTimeout(Exception):
+    """Все соединения пула заняты дольше timeout"""
+
+
+class ConnectionPool:
+    """
+    Ограниченный пул соединений SQLite.
+
+    Не больше size соединений на процесс; поток, которому не хватило, ждёт до timeout.
+    Соединение переживает запрос, поэтому вместе с ним переживает и его кэш
+    подготовленных выражений (cached_statements): повторный SQL не разбирается заново.
+    Поток, уже держащий соединение, при вложенном connection() получает его же.
+    Простаивавшее дольше check_after соединение перед выдачей проверяется SELECT 1,
+    сломанное — закрывается и заменяется новым. size=0 — без пула: соединение на каждый блок.
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection], size: int = 8, timeout: float = 5.0,
+                 check_after: float = 30.0):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.check_after = check_after
+        self._cond = threading.Condition()
+        # свободные соединения и время их возврата; последний вернувшийся выдаётся первым
+        self._idle: List[tuple] = []
+        self._open = 0
+        self._local = threading.local()
+        self.stats = {"created": 0, "reused": 0, "discarded": 0, "waits": 0, "timeouts": 0}
+
+    @contextmanager
+    def connection(self):
+        """Соединение на время блока: commit при успехе, rollback при исключении"""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            # вложенный вызов в том же потоке — транзакцией управляет внешний блок
+            yield held
+            return
+        conn = self._acquire()
+        self._local.conn = conn
+        healthy = True
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            healthy = self._rollback(conn)
+            raise
+        finally:
+            self._local.conn = None
+            self._release(conn, healthy)
+
+    def close(self):
+        """Закрывает свободные соединения; пул остаётся рабочим и при следующем запросе откроет новые"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn, _ in idle:
+            conn.close()
+
+    def _acquire(self) -> sqlite3.Connection:
+        if self.size <= 0:
+            with self._cond:
+                self.stats["created"] += 1
+            return self._connect()
+        t0 = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while not self._idle and self._open >= self.size:
+                self.stats["waits"] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if not self._idle and self._open >= self.size:
+                        self.stats["timeouts"] += 1
+                        raise PoolTimeout(f"Нет свободного соединения SQLite за {self.timeout} с")
+            if self._idle:
+                conn, returned = self._idle.pop()
+            else:
+                conn, returned = None, None
+                # место в пуле занимаем сразу, соединение открываем уже без блокировки
+                self._open += 1
+        DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - t0)
+        if conn is not None:
+            healthy = time.monotonic() - returned < self.check_after or self._healthy(conn)
+            with self._cond:
+                self.stats["reused" if healthy else "discarded"] += 1
+            if healthy:
+                return conn
+            conn.close()
+        try:
+            conn = self._connect()
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.stats["created"] += 1
+        return conn
+
+    def _release(self, conn: sqlite3.Connection, healthy: bool):
+        if self.size <= 0:
+            conn.close()
+            return
+        with self._cond:
+            if healthy and self._open <= self.size:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            else:
+                self._open -= 1
+                self.stats["discarded"] += 1
+            self._cond.notify()
+        if conn is not None:
+            conn.close()
+
+    @staticmethod
+    def _rollback(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.rollback()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _healthy(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
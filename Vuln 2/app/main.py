@@ -1,4 +1,5 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import os
@@ -12,15 +13,31 @@ from config.settings import settings
 
 # Імпорт маршрутів
 from app.routes import main_routes, search_routes, api_routes
+from app.metrics import CONTENT_TYPE, REGISTRY, Histogram, MetricsMiddleware
+from app.database.async_database import get_database
+
+# Час обробки запитів для /metrics (час SQLite реєструє app.database.database)
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "energy_http_request_duration_seconds", "Час обробки запиту до заголовків відповіді",
+    ("method", "route", "status")))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # спільний менеджер бази: дочекатися запитів у потоках і закрити з'єднання пулу
+    get_database().close()
 
 # Створення FastAPI додатку
 app = FastAPI(
     title=settings.APP_NAME,
     description="Демонстраційний проект з навчальними уразливостями",
     version=settings.APP_VERSION,
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    lifespan=lifespan
 )
 
+app.add_middleware(MetricsMiddleware, histogram=REQUEST_LATENCY)
+
 # Підключення статичних файлів
 static_path = os.path.join(os.path.dirname(__file__), "static")
 if os.path.exists(static_path):
@@ -36,5 +53,10 @@ async def health_check():
     """Проверка здоровья системы"""
     return {"status": "healthy", "service": "energy_system"}
 
+@app.get("/metrics")
+async def metrics():
+    """Метрики у текстовому форматі Prometheus"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
     uvicorn.run(app, host=settings.HOST, port=settings.PORT)
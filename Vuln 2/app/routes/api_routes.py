@@ -1,42 +1,66 @@
-from fastapi import APIRouter
-from app.database.database import DatabaseManager
+from fastapi import APIRouter, Query
+from app.database.async_database import get_database
+from app.database.database import highlight_html
+from config.settings import settings
 
 router = APIRouter()
-db = DatabaseManager()
+db = get_database()
 
 @router.get("/api/stations")
 async def api_stations():
     """API endpoint для получения списка станций"""
-    stations = db.get_all_stations()
+    stations = await db.get_all_stations()
     return {"stations": stations}
 
 @router.get("/api/consumption")
 async def api_consumption():
     """API endpoint для получения данных потребления"""
-    consumption = db.get_all_consumption()
+    consumption = await db.get_all_consumption()
     return {"consumption": consumption}
 
 @router.get("/api/alerts")
 async def api_alerts():
     """API endpoint для получения уведомлений"""
-    alerts = db.get_all_alerts()
+    alerts = await db.get_all_alerts()
     return {"alerts": alerts}
 
 @router.get("/api/statistics")
 async def api_statistics():
     """API endpoint для получения статистики системы"""
-    stats = db.get_system_statistics()
+    stats = await db.get_system_statistics()
     return {"statistics": stats}
 
+@router.get("/api/search")
+async def api_search(q: str = Query(..., min_length=1), limit: int = Query(settings.SEARCH_PAGE_SIZE, ge=1, le=100),
+                     offset: int = Query(0, ge=0)):
+    """
+    API endpoint полнотекстового поиска станций (FTS5, ранжирование bm25, подсветка в <mark>).
+    truncated=true — совпадений больше SEARCH_RANK_WINDOW и ранжированы только самые новые из них
+    """
+    rows, has_more, truncated = await db.search_stations(q, limit=limit, offset=offset)
+    results = [{
+        "id": row[0],
+        "name": row[1],
+        "location": row[2],
+        "capacity_mw": row[3],
+        "status": row[4],
+        "operator": row[5],
+        "created_at": row[6],
+        "highlight": {"name": highlight_html(row[7]), "location": highlight_html(row[8]),
+                      "operator": highlight_html(row[9])},
+        "rank": row[10]
+    } for row in rows]
+    return {"results": results, "next_offset": offset + limit if has_more else None, "truncated": truncated}
+
 @router.get("/api/schema")
 async def api_schema():
     """API endpoint для получения схемы базы данных"""
-    schema = db.get_database_schema()
+    schema = await db.get_database_schema()
     return {"schema": schema}
 
 @router.get("/api/tables")
 async def api_tables():
     """API endpoint для получения списка таблиц"""
-    schema = db.get_database_schema()
+    schema = await db.get_database_schema()
     return {"tables": list(schema.keys())}
 
@@ -1,16 +1,17 @@
+import asyncio
 from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-from app.database.database import DatabaseManager
+from app.database.async_database import get_database
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
-db = DatabaseManager()
+db = get_database()
 
 @router.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Главная страница системы управления энергосистемой"""
-    stats = db.get_system_statistics()
+    stats = await db.get_system_statistics()
     return templates.TemplateResponse("index.html", {
         "request": request,
         "stats": stats
@@ -19,8 +20,7 @@ async def home(request: Request):
 @router.get("/stations", response_class=HTMLResponse)
 async def stations_page(request: Request):
     """Страница с информацией об электростанциях"""
-    stations = db.get_all_stations()
-    stats = db.get_system_statistics()
+    stations, stats = await asyncio.gather(db.get_all_stations(), db.get_system_statistics())
     return templates.TemplateResponse("stations.html", {
         "request": request, 
         "stations": stations,
@@ -30,8 +30,7 @@ async def stations_page(request: Request):
 @router.get("/consumption", response_class=HTMLResponse)
 async def consumption_page(request: Request):
     """Страница с данными о потреблении энергии"""
-    consumption = db.get_all_consumption()
-    stats = db.get_system_statistics()
+    consumption, stats = await asyncio.gather(db.get_all_consumption(), db.get_system_statistics())
     return templates.TemplateResponse("consumption.html", {
         "request": request, 
         "consumption": consumption,
@@ -41,7 +40,7 @@ async def consumption_page(request: Request):
 @router.get("/alerts", response_class=HTMLResponse)
 async def alerts_page(request: Request):
     """Страница с системными уведомлениями"""
-    alerts = db.get_all_alerts()
+    alerts = await db.get_all_alerts()
     return templates.TemplateResponse("alerts.html", {
         "request": request, 
         "alerts": alerts
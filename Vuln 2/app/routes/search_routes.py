@@ -1,17 +1,39 @@
-from fastapi import APIRouter, Request, Form
+from typing import Optional
+from fastapi import APIRouter, Request, Form, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from app.database.database import DatabaseManager, read_flag
+from app.database.async_database import get_database
+from app.database.database import highlight_html, read_flag
+from config.settings import settings
+from markupsafe import Markup
 import os
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
-db = DatabaseManager()
+db = get_database()
 
 @router.get("/search", response_class=HTMLResponse)
-async def search_form(request: Request):
-    """Форма поиска электростанций"""
-    return templates.TemplateResponse("search.html", {"request": request})
+async def search_form(request: Request, q: Optional[str] = None, page: int = Query(1, ge=1)):
+    """Форма поиска электростанций; с параметром q — ранжированный полнотекстовый поиск (FTS5)"""
+    if not q:
+        return templates.TemplateResponse("search.html", {"request": request})
+    size = settings.SEARCH_PAGE_SIZE
+    rows, has_more, truncated = await db.search_stations(q, limit=size, offset=(page - 1) * size)
+    # та же таблица результатов: название, местоположение и оператор — с подсветкой совпадений
+    results = [(row[0], Markup(highlight_html(row[7])), Markup(highlight_html(row[8])), row[3], row[4],
+                Markup(highlight_html(row[9])), row[6]) for row in rows]
+    return templates.TemplateResponse("search_results.html", {
+        "request": request,
+        "results": results,
+        "query": q,
+        "flag_found": False,
+        "flag_value": None,
+        "error": None,
+        "page": page,
+        "has_more": has_more,
+        "truncated": truncated,
+        "rank_window": settings.SEARCH_RANK_WINDOW
+    })
 
 @router.post("/search")
 async def search_stations(
@@ -26,7 +48,7 @@ async def search_stations(
     - ' UNION SELECT 1,2,3,4,5,6,7 --
     """
     try:
-        results = db.search_stations_vulnerable(query)
+        results = await db.search_stations_vulnerable(query)
         
         # Проверяем, содержит ли результат флаг
         flag_found = False
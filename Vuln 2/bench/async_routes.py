@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк конкурентных клиентов: запросы SQLite в event loop против пула потоков.
+
+C клиентов в одном event loop непрерывно запрашивают /api/statistics (медленный
+агрегатный запрос на большой таблице), а отдельный клиент тем временем опрашивает
+/health, которому база не нужна. "blocking" — DB_EXECUTOR_WORKERS=0 (запрос прямо
+в event loop, как было раньше), "executor" — пул потоков AsyncDatabaseManager.
+Результат — запросы в секунду и задержка /health на каждом уровне конкурентности.
+
+    python bench/async_routes.py --stations 200000 --clients 1,4,16,64 --seconds 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    a = sorted(x * 1000.0 for x in samples)
+    pick = lambda q: round(a[min(len(a) - 1, int(q * len(a)))], 3)  # noqa: E731
+    return {"count": len(a), "p50_ms": pick(0.5), "p99_ms": pick(0.99), "max_ms": round(a[-1], 3)}
+
+
+async def run_level(client, clients: int, seconds: float) -> dict:
+    stop = time.perf_counter() + seconds
+    done = [0]
+    health = []
+
+    async def worker():
+        while time.perf_counter() < stop:
+            r = await client.get("/api/statistics")
+            r.raise_for_status()
+            done[0] += 1
+
+    async def probe():
+        # задержка — от момента, когда запрос должен был уйти (каждые 10 мс), до ответа:
+        # так видно и ожидание самого event loop, а не только обработку
+        due = time.perf_counter()
+        while time.perf_counter() < stop:
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            await client.get("/health")
+            health.append(time.perf_counter() - due)
+            due = max(due + 0.01, time.perf_counter() - 0.01)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(probe(), *(worker() for _ in range(clients)))
+    elapsed = time.perf_counter() - t0
+    return {"rps": round(done[0] / elapsed, 1), "health": percentiles(health)}
+
+
+async def run_mode(app, api_routes, path: str, workers: int, args) -> dict:
+    import httpx
+    from app.database.async_database import AsyncDatabaseManager
+    from app.database.database import DatabaseManager
+
+    api_routes.db = AsyncDatabaseManager(DatabaseManager(path, pool_size=max(workers, 1)), workers=workers)
+    result = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for clients in args.clients:
+            result[str(clients)] = await run_level(client, clients, args.seconds)
+    api_routes.db.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stations", type=int, default=200000, help="сколько станций добавить к тестовым")
+    parser.add_argument("--clients", type=lambda v: [int(x) for x in v.split(",")], default=[1, 4, 16, 64])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # маршруты открывают energy_system.db в текущем каталоге — пусть это будет временный
+        os.chdir(tmp)
+        from app.main import app
+        from app.routes import api_routes
+        from app.database.database import DatabaseManager
+        from db_pool import fill
+
+        path = os.path.join(tmp, "bench.db")
+        fill(DatabaseManager(path, pool_size=1), args.stations)
+        result = {
+            "config": dict(vars(args), cpus=os.cpu_count()),
+            "blocking": asyncio.run(run_mode(app, api_routes, path, 0, args)),
+            "executor": asyncio.run(run_mode(app, api_routes, path, args.workers, args)),
+        }
+        os.chdir(ROOT)
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
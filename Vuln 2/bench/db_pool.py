@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк пула соединений SQLite: запросы в секунду без пула и с пулом.
+
+T потоков в цикле выполняют работу маршрутов /api/statistics, /api/stations и /stations
+(get_system_statistics, get_all_stations) над временной базой. Фаза "before" — пул
+размера 0, то есть новое соединение на каждый запрос, как было раньше; "after" — пул
+DB_POOL_SIZE соединений. Результат — JSON в stdout.
+
+    python bench/db_pool.py --threads 8 --seconds 3 --stations 1000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import DatabaseManager  # noqa: E402
+from config.settings import settings  # noqa: E402
+
+ROUTES = {
+    "/api/statistics": lambda db: db.get_system_statistics(),
+    "/api/stations": lambda db: db.get_all_stations(),
+    "/stations": lambda db: (db.get_all_stations(), db.get_system_statistics()),
+}
+
+
+def fill(db: DatabaseManager, stations: int):
+    rng = random.Random(1)
+    with db.connection() as conn:
+        conn.executemany(
+            "INSERT INTO power_stations (name, location, capacity_mw, status, operator) VALUES (?, ?, ?, ?, ?)",
+            [(f"Station {i}", f"Region {i % 50}", round(rng.uniform(1, 2000), 1),
+              "Active" if i % 7 else "Maintenance", f"Operator {i % 20}") for i in range(stations)])
+
+
+def run_phase(path: str, pool_size: int, args) -> dict:
+    db = DatabaseManager(path, pool_size=pool_size)
+    stop = threading.Event()
+    counts = {route: [0] * args.threads for route in ROUTES}
+    routes = list(ROUTES)
+
+    def worker(idx):
+        i = idx
+        while not stop.is_set():
+            route = routes[i % len(routes)]
+            ROUTES[route](db)
+            counts[route][idx] += 1
+            i += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    db.pool.close()
+    result = {route: round(sum(c) / elapsed) for route, c in counts.items()}
+    result["total_rps"] = round(sum(sum(c) for c in counts.values()) / elapsed)
+    result["pool"] = dict(db.pool.stats, size=pool_size)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--stations", type=int, default=0, help="сколько станций добавить к тестовым")
+    parser.add_argument("--pool-size", type=int, default=settings.DB_POOL_SIZE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "energy_system.db")
+        fill(DatabaseManager(path, pool_size=1), args.stations)
+        before = run_phase(path, 0, args)
+        after = run_phase(path, args.pool_size, args)
+    result = {
+        "config": {k: getattr(args, k) for k in ("threads", "seconds", "stations", "pool_size")},
+        "before": before,
+        "after": after,
+        "speedup": round(after["total_rps"] / max(1, before["total_rps"]), 2),
+    }
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк поиска станций: LIKE '%…%' против FTS5-индекса (search_stations).
+
+Заполняет временную базу N станциями с названиями из словаря слов и сравнивает
+скан LIKE по name/location (форма уязвимого запроса, но параметризованный) с
+ранжированным поиском FTS5: точное слово, префикс, два слова, страница 5, частое
+слово и частый префикс (больше SEARCH_RANK_WINDOW совпадений).
+Результат — задержки в JSON в stdout.
+
+    python bench/db_search.py --stations 1000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import DatabaseManager  # noqa: E402
+from async_routes import percentiles  # noqa: E402
+
+LIKE_SQL = "SELECT * FROM power_stations WHERE name LIKE ? OR location LIKE ? LIMIT ?"
+SYLLABLES = ("ka", "la", "ra", "va", "nu", "ti", "ko", "se", "mä", "jõ", "pa", "ru", "li", "de", "so", "hu")
+KINDS = ("Power Plant", "Hydroelectric Plant", "Wind Farm", "Solar Park", "District Heating", "Substation")
+
+
+def word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def fill(db: DatabaseManager, stations: int) -> float:
+    rng = random.Random(1)
+    places = [word(rng) for _ in range(2000)]
+    names = [word(rng) for _ in range(20000)]
+    operators = [f"{word(rng)} Energia" for _ in range(200)]
+    t0 = time.perf_counter()
+    batch = 50000
+    for start in range(0, stations, batch):
+        with db.connection() as conn:
+            conn.executemany(
+                "INSERT INTO power_stations (name, location, capacity_mw, status, operator) VALUES (?, ?, ?, ?, ?)",
+                [(f"{rng.choice(names)} {rng.choice(KINDS)}", rng.choice(places), round(rng.uniform(1, 2000), 1),
+                  "Active" if i % 7 else "Maintenance", rng.choice(operators))
+                 for i in range(start, min(stations, start + batch))])
+    return time.perf_counter() - t0
+
+
+def timed(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stations", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "energy_system.db"))
+        fill_s = fill(db, args.stations)
+        with db.connection() as conn:
+            name, location = conn.execute(
+                "SELECT name, location FROM power_stations ORDER BY id DESC LIMIT 1").fetchone()
+        term = name.split()[0]
+        queries = {
+            "word": term,
+            "prefix": term[:3],
+            "two_words": f"{term} {location}",
+            "common_word": "Farm",
+            "common_prefix": "Pa",
+        }
+
+        def like(text):
+            with db.connection() as conn:
+                return conn.execute(LIKE_SQL, (f"%{text}%", f"%{text}%", args.limit)).fetchall()
+
+        result = {"config": dict(vars(args), fill_s=round(fill_s, 1)), "queries": queries, "like": {}, "fts": {}}
+        for label, text in queries.items():
+            result["like"][label] = timed(lambda: like(text), args.repeat)
+            rows, _, truncated = db.search_stations(text, args.limit)
+            result["fts"][label] = dict(timed(lambda: db.search_stations(text, args.limit), args.repeat),
+                                        hits=len(rows), truncated=truncated)
+        result["fts"]["word_page5"] = timed(
+            lambda: db.search_stations(queries["word"], args.limit, 4 * args.limit), args.repeat)
+    json.dump(result, sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
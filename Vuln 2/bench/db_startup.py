@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк запуска: открытие DatabaseManager на базах разного размера.
+
+Для каждого размера таблицы станций замеряет открытие базы актуальной версии
+(одно чтение PRAGMA user_version) и открытие той же базы со сброшенным user_version —
+все миграции заново, как раньше init_database работал при каждом запуске
+(создание таблиц, пересчёт system_stats, тестовые данные). Результат — JSON в stdout.
+
+    python bench/db_startup.py --sizes 1000,100000,1000000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import DatabaseManager  # noqa: E402
+from async_routes import percentiles  # noqa: E402
+from db_stats import grow  # noqa: E402
+
+
+def open_db(path: str, reset: bool) -> float:
+    if reset:
+        db = DatabaseManager(path, pool_size=1)
+        with db.connection() as conn:
+            conn.execute("PRAGMA user_version = 0")
+        db.pool.close()
+    t0 = time.perf_counter()
+    DatabaseManager(path, pool_size=1).pool.close()
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=lambda v: [int(x) for x in v.split(",")], default=[1000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    result = {"config": vars(args), "sizes": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "energy_system.db")
+        rows = 0
+        for size in sorted(args.sizes):
+            grow(DatabaseManager(path, pool_size=1), size, rows)
+            rows = size
+            result["sizes"][str(size)] = {
+                "versioned": percentiles([open_db(path, False) for _ in range(args.repeat)]),
+                "all_migrations": percentiles([open_db(path, True) for _ in range(args.repeat)]),
+            }
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
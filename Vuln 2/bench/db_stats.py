@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк статистики системы: агрегатные запросы против материализованной system_stats.
+
+Для каждого размера таблицы станций (и стольких же строк потребления) сравнивает
+пять агрегатных запросов, которые раньше выполнял get_system_statistics, с чтением
+одной строки system_stats, и замеряет цену триггеров на вставку. Результат — JSON в stdout.
+
+    python bench/db_stats.py --sizes 1000,100000,1000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import DatabaseManager  # noqa: E402
+from async_routes import percentiles  # noqa: E402
+
+AGGREGATES = (
+    "SELECT COUNT(*) FROM power_stations",
+    "SELECT COUNT(*) FROM power_stations WHERE status = 'Active'",
+    "SELECT SUM(capacity_mw) FROM power_stations",
+    "SELECT SUM(consumption_mwh) FROM energy_consumption",
+    "SELECT COUNT(*) FROM system_alerts",
+)
+
+
+def grow(db: DatabaseManager, rows: int, start: int) -> float:
+    # дописывает станции и потребление до rows строк; возвращает секунды на вставку
+    rng = random.Random(start)
+    t0 = time.perf_counter()
+    with db.connection() as conn:
+        conn.executemany(
+            "INSERT INTO power_stations (name, location, capacity_mw, status, operator) VALUES (?, ?, ?, ?, ?)",
+            [(f"Station {i}", f"Region {i % 50}", round(rng.uniform(1, 2000), 1),
+              "Active" if i % 7 else "Maintenance", f"Operator {i % 20}") for i in range(start, rows)])
+        conn.executemany("INSERT INTO energy_consumption (region, consumption_mwh) VALUES (?, ?)",
+                         [(f"Region {i % 50}", round(rng.uniform(1, 500), 1)) for i in range(start, rows)])
+    return time.perf_counter() - t0
+
+
+def timed(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=lambda v: [int(x) for x in v.split(",")], default=[1000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    result = {"config": vars(args), "sizes": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "energy_system.db"))
+
+        def aggregates():
+            with db.connection() as conn:
+                return [conn.execute(sql).fetchone()[0] for sql in AGGREGATES]
+
+        rows = 0
+        for size in sorted(args.sizes):
+            insert_s = grow(db, size, rows)
+            inserted = size - rows
+            rows = size
+            result["sizes"][str(size)] = {
+                "aggregates": timed(aggregates, args.repeat),
+                "materialized": timed(db.get_system_statistics, args.repeat),
+                "insert_us_per_row": round(insert_s / max(1, inserted) / 2 * 1e6, 2),
+            }
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,16 @@ class Settings:
     
     # Налаштування бази даних
     DATABASE_URL: str = os.getenv("DATABASE_URL", "energy_system.db")
+    # пул з'єднань SQLite: скільки з'єднань на процес (0 — нове з'єднання на кожен запит)
+    # і скільки секунд чекати на вільне
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "8"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "5.0"))
+    # потоки, у яких async-маршрути виконують запити SQLite (0 — прямо в event loop)
+    DB_EXECUTOR_WORKERS: int = int(os.getenv("DB_EXECUTOR_WORKERS", "8"))
+    # результатів на сторінці повнотекстового пошуку (GET /search?q=, /api/search)
+    SEARCH_PAGE_SIZE: int = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+    # скільки найновіших збігів ранжувати, якщо їх більше (0 — усі; вартість ранжування росте зі збігами)
+    SEARCH_RANK_WINDOW: int = int(os.getenv("SEARCH_RANK_WINDOW", "2000"))
     
     # Налаштування безпеки
     SECRET_KEY: str = os.getenv("SECRET_KEY", "ukr_energy_system_2024_secret_key")